@@ -5,33 +5,117 @@ This module provides the application factory pattern for creating Flask app inst
 Routes are organized in separate blueprint modules in the routes package.
 """
 
+import threading
+
 from flask import Flask
-from database import init_database, add_sample_data
+from database import init_database, add_sample_data, start_circulation_writer, set_storage_profile
+from repositories import create_repository, set_repository
 from routes import register_blueprints
+from routes.throttling import DEFAULT_CLIENT_RATE_LIMITS, DEFAULT_RATE_LIMITS, register_rate_limits
+from commands import register_commands
+from services.search_index import build_search_indexes
+from services.library_service import warm_patron_status_cache
+from services.maintenance import start_maintenance_scheduler
+from services.backup_service import start_backup_scheduler
 
 
-def create_app():
+def create_app(config=None):
     """
     Application factory function to create and configure Flask app.
     
+    Settings can be overridden with FLASK_-prefixed environment variables
+    (e.g. FLASK_CIRCULATION_GROUP_COMMIT=true) or the `config` mapping.
+    
+    Args:
+        config: Optional mapping of settings applied last
+    
     Returns:
         Flask: Configured Flask application instance
     """
     app = Flask(__name__)
     app.secret_key = "super secret key"
     
+    app.config.update(
+        # Apply circulation writes through one group-committing writer thread
+        CIRCULATION_GROUP_COMMIT=False,
+        GROUP_COMMIT_MAX_BATCH=64,
+        GROUP_COMMIT_MAX_WAIT=0.0,
+        # Preload patron status reports in the background after startup;
+        # opt-in (the server entry point below turns it on)
+        STATUS_CACHE_WARMUP=False,
+        # Per-client token buckets on hot endpoints, plus per-patron ones
+        # where the request names a patron (CLIENT_RATE_LIMITS overrides the
+        # client bucket there); set RATE_LIMIT_STORE to a SQLite file (e.g.
+        # under /dev/shm) to share the buckets between worker processes
+        RATE_LIMIT_ENABLED=True,
+        RATE_LIMITS=dict(DEFAULT_RATE_LIMITS),
+        CLIENT_RATE_LIMITS=dict(DEFAULT_CLIENT_RATE_LIMITS),
+        RATE_LIMIT_STORE=None,
+        # Storage behind the library services: 'sqlite', 'memory' (an
+        # isolated in-process store with the sample data, for tests and
+        # benchmarking service logic) or 'snapshot' (read-only catalog from
+        # CATALOG_SNAPSHOT, reloaded when a new export appears; for search
+        # nodes). Holds, stats and jobs stay on SQLite
+        REPOSITORY='sqlite',
+        CATALOG_SNAPSHOT='catalog.snap',
+        CATALOG_SNAPSHOT_CHECK_INTERVAL=5.0,
+        # PRAGMAs applied when connections open: a name from
+        # database.STORAGE_PROFILES or a mapping of PRAGMA -> value
+        STORAGE_PROFILE='tuned',
+        # ANALYZE, incremental vacuum and WAL checkpoints once a day, off-peak;
+        # opt-in (the server entry point below turns it on), and never run on
+        # snapshot nodes, which do not own library.db
+        MAINTENANCE_SCHEDULER=False,
+        MAINTENANCE_WINDOW='02:00-05:00',
+        # Daily online backup to BACKUP_DIR, keeping the newest BACKUP_KEEP
+        BACKUP_SCHEDULER=False,
+        BACKUP_DIR='backups',
+        BACKUP_KEEP=7,
+        BACKUP_WINDOW='01:00-02:00',
+    )
+    app.config.from_prefixed_env()
+    if config:
+        app.config.update(config)
+    
     # Initialize the database
+    set_storage_profile(app.config['STORAGE_PROFILE'])
     init_database()
     
     # Add sample data for testing and demonstration
     add_sample_data()
     
+    if app.config['CIRCULATION_GROUP_COMMIT']:
+        start_circulation_writer(app.config['GROUP_COMMIT_MAX_BATCH'], app.config['GROUP_COMMIT_MAX_WAIT'])
+    
+    options = {}
+    if app.config['REPOSITORY'] == 'snapshot':
+        options = {'path': app.config['CATALOG_SNAPSHOT'],
+                   'check_interval': app.config['CATALOG_SNAPSHOT_CHECK_INTERVAL']}
+    repository = set_repository(create_repository(app.config['REPOSITORY'], **options))
+    if app.config['REPOSITORY'] == 'memory':
+        repository.add_sample_data()
+    
+    # Load the in-memory search indexes used for typeahead suggestions
+    build_search_indexes()
+    
+    if app.config['STATUS_CACHE_WARMUP']:
+        threading.Thread(target=warm_patron_status_cache, name='status-cache-warmup', daemon=True).start()
+    
+    if app.config['MAINTENANCE_SCHEDULER'] and app.config['REPOSITORY'] != 'snapshot':
+        start_maintenance_scheduler(app.config['MAINTENANCE_WINDOW'])
+    if app.config['BACKUP_SCHEDULER']:
+        start_backup_scheduler(app.config['BACKUP_DIR'], app.config['BACKUP_KEEP'], app.config['BACKUP_WINDOW'])
+    
     # Register all route blueprints
     register_blueprints(app)
+    register_rate_limits(app)
+    
+    # Register CLI commands for scheduled jobs
+    register_commands(app)
     
     return app
 
 
 if __name__ == '__main__':
-    app = create_app()
+    app = create_app({'MAINTENANCE_SCHEDULER': True, 'STATUS_CACHE_WARMUP': True})
     app.run(debug=True, host='0.0.0.0', port=5001)
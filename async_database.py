@@ -0,0 +1,114 @@
+"""
+Async database module for Library Management System
+Asyncio access to the active repository's reads for the async JSON API;
+with the SQLite backend they run on pooled connections
+"""
+
+import asyncio
+import contextvars
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+import database
+import repositories
+from repositories import SQLiteRepository
+
+# Upper bound on concurrent SQLite connections used by async callers
+MAX_ASYNC_CONNECTIONS = 8
+
+
+class AsyncConnectionPool:
+    """
+    Bounded set of SQLite connections driven from asyncio.
+
+    Each executor thread keeps one connection open, so at most
+    `max_connections` queries run at once and connections are reused
+    across requests instead of being opened per call.
+    """
+
+    def __init__(self, max_connections: int = MAX_ASYNC_CONNECTIONS):
+        self.max_connections = max_connections
+        self._executor = ThreadPoolExecutor(max_workers=max_connections,
+                                            thread_name_prefix='sqlite-async')
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        """This thread's connection, reopened if the database path changed."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.path != database.DATABASE:
+            if conn is not None:
+                conn.close()
+            conn = database.get_db_connection()
+            self._local.conn = conn
+            self._local.path = database.DATABASE
+        return conn
+
+    def _call(self, function: Callable, args: tuple, kwargs: dict) -> Any:
+        # Other backends never touch library.db, so they get no connection
+        if isinstance(repositories.get_repository(), SQLiteRepository):
+            kwargs = dict(kwargs, conn=self._connection())
+        return function(*args, **kwargs)
+
+    async def run(self, function: Callable, *args, **kwargs) -> Any:
+        """
+        Await `function(*args, **kwargs)` on the pool, in the caller's context
+        (so use_repository applies), adding conn=<pooled connection> when the
+        active repository is SQLite.
+        """
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(self._executor, context.run, self._call, function, args, kwargs)
+
+    def close(self) -> None:
+        """Stop the executor; its threads' connections close with them."""
+        self._executor.shutdown(wait=True)
+
+
+_pool: Optional[AsyncConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_async_pool() -> AsyncConnectionPool:
+    """Get the shared connection pool, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = AsyncConnectionPool()
+        return _pool
+
+
+def close_async_pool() -> None:
+    """Shut down the shared connection pool."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+# Async mirrors of the repository reads
+
+async def get_all_books() -> List[Dict]:
+    """Get all books from the active repository."""
+    return await get_async_pool().run(repositories.get_all_books)
+
+async def get_book_by_id(book_id: int) -> Optional[Dict]:
+    """Get a specific book by ID."""
+    return await get_async_pool().run(repositories.get_book_by_id, book_id)
+
+async def get_book_by_isbn(isbn: str) -> Optional[Dict]:
+    """Get a specific book by ISBN."""
+    return await get_async_pool().run(repositories.get_book_by_isbn, isbn)
+
+async def get_patron_borrowed_books(patron_id: str) -> List[Dict]:
+    """Get currently borrowed books for a patron."""
+    return await get_async_pool().run(repositories.get_patron_borrowed_books, patron_id)
+
+async def get_patron_borrow_count(patron_id: str) -> int:
+    """Get the number of books currently borrowed by a patron."""
+    return await get_async_pool().run(repositories.get_patron_borrow_count, patron_id)
+
+async def run_query(function: Callable, *args, **kwargs) -> Any:
+    """Run any function accepting a `conn` keyword (a repository read) on the pool."""
+    return await get_async_pool().run(function, *args, **kwargs)
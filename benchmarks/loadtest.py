@@ -0,0 +1,430 @@
+"""
+Load test harness - drive the real Flask routes under concurrency
+
+Runs a weighted mix of catalog views, searches, borrows, returns, late
+fee lookups and late fee payments from many threads (optionally across processes), either through
+Flask's test client or over HTTP against create_app() served on a local
+port. Reports per-operation p50/p95/p99 latency, requests per second and
+errors (including "database is locked"), and saves the run as JSON so
+runs can be compared with --compare.
+
+Usage:
+    python benchmarks/loadtest.py --threads 16 --duration 30
+    python benchmarks/loadtest.py --mode http --processes 4 --threads 8 \
+        --mix catalog=2,search=4,borrow=2,return=2,fee=2 --group-commit
+    python benchmarks/loadtest.py --mix search=4,fee=2,pay=2 --emulate-gateway \
+        --gateway-latency lognormal:0.08,0.5 --gateway-error-rate 0.02
+    python benchmarks/loadtest.py --compare benchmarks/results/<earlier>.json
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import database  # noqa: E402
+from database import init_database, add_sample_data, get_db_connection  # noqa: E402
+from gateway_emulator import EmulatorConfig, GatewayEmulator  # noqa: E402
+from services.payment_service import GATEWAY_URL_ENV  # noqa: E402
+
+OPERATIONS = ('catalog', 'search', 'borrow', 'return', 'fee', 'pay')
+DEFAULT_MIX = 'catalog=2,search=4,borrow=2,return=2,fee=2'
+SEARCH_TERMS = ('gatsby', 'mockingbird', '1984', 'load', 'title 1', 'title 4', 'title 9')
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+
+def parse_mix(spec: str) -> Dict[str, int]:
+    """Parse 'catalog=2,search=4,...' into operation weights."""
+    mix = {}
+    for part in spec.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f'unknown operation {name!r}; choose from {", ".join(OPERATIONS)}')
+        try:
+            mix[name] = int(weight)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f'weight for {name!r} must be an integer')
+    if not any(mix.values()):
+        raise argparse.ArgumentTypeError('at least one operation needs a positive weight')
+    return mix
+
+
+def payer_id(worker_number: int) -> str:
+    """Patron whose seeded overdue loans a worker pays off."""
+    return f'{800000 + worker_number:06d}'
+
+
+def seed_database(path: str, books: int, payers: int = 0, loans_per_payer: int = 50) -> None:
+    """
+    Create a sample database with `books` extra well-stocked titles, and
+    `payers` patrons each owing late fees on `loans_per_payer` of them.
+    """
+    database.DATABASE = path
+    init_database()
+    add_sample_data()
+    conn = get_db_connection()
+    conn.executemany(
+        'INSERT OR IGNORE INTO books (title, author, isbn, total_copies, available_copies) VALUES (?, ?, ?, ?, ?)',
+        ((f'Load Title {i}', f'Load Author {i % 50}', f'{9990000000000 + i}', 50, 50) for i in range(books))
+    )
+    load_books = [row['id'] for row in conn.execute(
+        "SELECT id FROM books WHERE title LIKE 'Load Title %' ORDER BY id LIMIT ?", (loans_per_payer,))]
+    borrowed, due = datetime.now() - timedelta(days=24), datetime.now() - timedelta(days=10)
+    conn.executemany(
+        'INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date) VALUES (?, ?, ?, ?)',
+        ((payer_id(worker), book_id, borrowed.isoformat(), due.isoformat())
+         for worker in range(payers) for book_id in load_books)
+    )
+    conn.commit()
+    conn.close()
+
+
+# Transports: each returns (status, body) for one request
+
+class ClientTransport:
+    """In-process requests through Flask's test client."""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method: str, path: str, payload: Optional[Dict] = None, headers: Optional[Dict] = None):
+        response = self.client.open(path, method=method, json=payload, headers=headers)
+        return response.status_code, response.get_data(as_text=True)
+
+
+class HttpTransport:
+    """Requests over HTTP to a running server."""
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url
+
+    def request(self, method: str, path: str, payload: Optional[Dict] = None, headers: Optional[Dict] = None):
+        data = json.dumps(payload).encode() if payload is not None else None
+        headers = dict(headers or {})
+        if data:
+            headers['Content-Type'] = 'application/json'
+        req = urllib.request.Request(self.base_url + path, data=data, method=method, headers=headers)
+        try:
+            with urllib.request.urlopen(req, timeout=30) as response:
+                return response.status, response.read().decode()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read().decode()
+
+
+class Worker:
+    """One simulated patron issuing a random mix of requests."""
+
+    def __init__(self, transport, patron_id: str, book_ids: List[int], mix: Dict[str, int], seed: int,
+                 payer_id: str = '', owed_book_ids: Optional[List[int]] = None):
+        self.transport = transport
+        self.patron_id = patron_id
+        self.book_ids = book_ids
+        self.borrowed: List[int] = []
+        self.payer_id = payer_id
+        self.owed = list(owed_book_ids or [])
+        self.payments = 0
+        self.random = random.Random(seed)
+        self.operations = [name for name in mix if mix[name] > 0]
+        self.weights = [mix[name] for name in self.operations]
+
+    def step(self):
+        operation = self.random.choices(self.operations, self.weights)[0]
+        if operation == 'return' and not self.borrowed:
+            operation = 'borrow'
+        # Stay under the five-book borrowing limit
+        if operation == 'borrow' and len(self.borrowed) >= 4:
+            operation = 'return'
+        if operation == 'pay' and not self.owed:
+            operation = 'fee'
+
+        if operation == 'pay':
+            book_id = self.owed.pop()
+            self.payments += 1
+            return operation, self.transport.request(
+                'POST', '/api/payments', {'patron_id': self.payer_id, 'book_id': book_id},
+                {'Idempotency-Key': f'load-{self.payer_id}-{book_id}-{self.payments}'}
+            )
+
+        if operation == 'catalog':
+            return operation, self.transport.request('GET', '/catalog')
+        if operation == 'search':
+            term = self.random.choice(SEARCH_TERMS)
+            return operation, self.transport.request('GET', f'/api/search?q={term.replace(" ", "+")}&type=title')
+        if operation == 'fee':
+            book_id = self.borrowed[0] if self.borrowed else self.random.choice(self.book_ids)
+            return operation, self.transport.request('GET', f'/api/late_fee/{self.patron_id}/{book_id}')
+        if operation == 'borrow':
+            book_id = self.random.choice(self.book_ids)
+            status, body = self.transport.request('POST', '/api/circulation/borrow',
+                                                  {'patron_id': self.patron_id, 'book_ids': [book_id]})
+            if status == 200 and '"success":true' in body.replace(' ', ''):
+                self.borrowed.append(book_id)
+            return operation, (status, body)
+
+        book_id = self.borrowed.pop(self.random.randrange(len(self.borrowed)))
+        return operation, self.transport.request('POST', '/api/circulation/return',
+                                                 {'patron_id': self.patron_id, 'book_ids': [book_id]})
+
+
+def classify(status: int, body: str) -> Optional[str]:
+    """Name the error a response represents, or None for a served request."""
+    if 'database is locked' in body:
+        return 'database is locked'
+    if status >= 500:
+        return f'HTTP {status}'
+    if 'Database error' in body:
+        return 'database error (write failed)'
+    if 'processing error' in body:
+        return 'payment gateway error'
+    return None
+
+
+def run_workers(config: Dict, process_index: int) -> Dict:
+    """Run this process's threads and return raw latencies and error counts."""
+    if config['mode'] == 'client':
+        from app import create_app
+        database.DATABASE = config['db']
+        app = create_app({'CIRCULATION_GROUP_COMMIT': config['group_commit'], 'STATUS_CACHE_WARMUP': False,
+                          'RATE_LIMIT_ENABLED': False, 'PROPAGATE_EXCEPTIONS': True})
+        make_transport = lambda: ClientTransport(app)  # noqa: E731
+    else:
+        make_transport = lambda: HttpTransport(config['base_url'])  # noqa: E731
+
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    rejected = defaultdict(int)
+    lock = threading.Lock()
+    deadline = time.perf_counter() + config['duration']
+    per_thread = config['requests'] // (config['threads'] * config['processes']) if config['requests'] else None
+
+    def thread_main(thread_index: int):
+        worker_number = process_index * config['threads'] + thread_index
+        worker = Worker(make_transport(), f'{700000 + worker_number:06d}', config['book_ids'],
+                        config['mix'], seed=config['seed'] + worker_number,
+                        payer_id=payer_id(worker_number), owed_book_ids=config['owed_book_ids'])
+        local_latencies = defaultdict(list)
+        local_errors = defaultdict(int)
+        local_rejected = defaultdict(int)
+        done = 0
+        while (per_thread is None and time.perf_counter() < deadline) or (per_thread is not None and done < per_thread):
+            start = time.perf_counter()
+            try:
+                operation, (status, body) = worker.step()
+                error = classify(status, body)
+            except Exception as e:
+                operation, status, error = 'exception', 0, f'{type(e).__name__}: {e}'[:120]
+            local_latencies[operation].append(time.perf_counter() - start)
+            if error:
+                local_errors[f'{operation}: {error}'] += 1
+            elif status >= 400:
+                local_rejected[operation] += 1
+            done += 1
+        with lock:
+            for name, values in local_latencies.items():
+                latencies[name].extend(values)
+            for name, count in local_errors.items():
+                errors[name] += count
+            for name, count in local_rejected.items():
+                rejected[name] += count
+
+    threads = [threading.Thread(target=thread_main, args=(i,)) for i in range(config['threads'])]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if config['mode'] == 'client' and config['group_commit']:
+        database.stop_circulation_writer()
+    return {'latencies': dict(latencies), 'errors': dict(errors), 'rejected': dict(rejected)}
+
+
+def _process_entry(args) -> Dict:
+    return run_workers(*args)
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(parts: List[Dict], elapsed: float) -> Dict:
+    """Merge per-process results into per-operation latency percentiles."""
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    rejected = defaultdict(int)
+    for part in parts:
+        for name, values in part['latencies'].items():
+            latencies[name].extend(values)
+        for name, count in part['errors'].items():
+            errors[name] += count
+        for name, count in part['rejected'].items():
+            rejected[name] += count
+
+    operations = {}
+    everything = []
+    for name, values in sorted(latencies.items()):
+        values.sort()
+        everything.extend(values)
+        operations[name] = {
+            'requests': len(values),
+            'rps': round(len(values) / elapsed, 1),
+            'p50_ms': round(percentile(values, 50) * 1000, 2),
+            'p95_ms': round(percentile(values, 95) * 1000, 2),
+            'p99_ms': round(percentile(values, 99) * 1000, 2),
+            'rejected': rejected.get(name, 0)
+        }
+    everything.sort()
+    return {
+        'elapsed_s': round(elapsed, 2),
+        'requests': len(everything),
+        'rps': round(len(everything) / elapsed, 1),
+        'p50_ms': round(percentile(everything, 50) * 1000, 2),
+        'p95_ms': round(percentile(everything, 95) * 1000, 2),
+        'p99_ms': round(percentile(everything, 99) * 1000, 2),
+        'errors': dict(errors),
+        'error_count': sum(errors.values()),
+        'operations': operations
+    }
+
+
+def print_report(summary: Dict, baseline: Optional[Dict] = None) -> None:
+    print(f'{"operation":<12}{"requests":>10}{"rps":>10}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}{"rejected":>10}')
+    for name, row in summary['operations'].items():
+        print(f'{name:<12}{row["requests"]:>10}{row["rps"]:>10}{row["p50_ms"]:>10}'
+              f'{row["p95_ms"]:>10}{row["p99_ms"]:>10}{row["rejected"]:>10}')
+    print(f'{"all":<12}{summary["requests"]:>10}{summary["rps"]:>10}{summary["p50_ms"]:>10}'
+          f'{summary["p95_ms"]:>10}{summary["p99_ms"]:>10}')
+    print(f'errors: {summary["error_count"]}')
+    for name, count in sorted(summary['errors'].items(), key=lambda item: -item[1]):
+        print(f'  {count:>8}  {name}')
+
+    if baseline:
+        print('\nchange vs baseline:')
+        for key in ('rps', 'p50_ms', 'p95_ms', 'p99_ms', 'error_count'):
+            old, new = baseline['summary'][key], summary[key]
+            change = f'{(new - old) / old * 100:+.1f}%' if old else 'n/a'
+            print(f'  {key:<12}{old:>10} -> {new:<10}{change}')
+
+
+def start_http_server(group_commit: bool, port: int):
+    """Serve create_app() on a background thread; returns the server."""
+    from werkzeug.serving import make_server
+    from app import create_app
+    app = create_app({'CIRCULATION_GROUP_COMMIT': group_commit, 'STATUS_CACHE_WARMUP': False,
+                      'RATE_LIMIT_ENABLED': False})
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    server = make_server('127.0.0.1', port, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Load test the library routes.')
+    parser.add_argument('--mode', choices=('client', 'http'), default='client',
+                        help='test client in each process, or HTTP to a local server')
+    parser.add_argument('--base-url', help='target an already running server instead of starting one '
+                                           '(http mode; book IDs are read from --db)')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--threads', type=int, default=8, help='threads per process')
+    parser.add_argument('--processes', type=int, default=1)
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds to run')
+    parser.add_argument('--requests', type=int, default=0, help='total requests instead of a duration')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix(DEFAULT_MIX))
+    parser.add_argument('--books', type=int, default=200, help='extra titles seeded into a fresh database')
+    parser.add_argument('--db', help='use this database file instead of a fresh temporary one')
+    parser.add_argument('--group-commit', action='store_true', help='enable the group-commit writer')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--emulate-gateway', action='store_true',
+                        help='serve the payment gateway emulator locally and send payments to it')
+    parser.add_argument('--gateway-latency', default='lognormal:0.05,0.5', help='emulator latency spec')
+    parser.add_argument('--gateway-error-rate', type=float, default=0.0)
+    parser.add_argument('--gateway-timeout-rate', type=float, default=0.0)
+    parser.add_argument('--gateway-rate-limit', type=float, default=0.0, help='emulator requests per second')
+    parser.add_argument('--output', help=f'results file (default: {RESULTS_DIR}/loadtest-<time>.json)')
+    parser.add_argument('--compare', help='earlier results file to compare against')
+    args = parser.parse_args()
+
+    tmp = None
+    if args.db:
+        database.DATABASE = args.db
+    elif not args.base_url:
+        tmp = tempfile.TemporaryDirectory()
+        seed_database(os.path.join(tmp.name, 'library.db'), args.books, args.threads * args.processes)
+
+    gateway = None
+    if args.emulate_gateway:
+        gateway = GatewayEmulator(EmulatorConfig(
+            latency=args.gateway_latency, error_rate=args.gateway_error_rate,
+            timeout_rate=args.gateway_timeout_rate, hang_seconds=10.0, rate_limit=args.gateway_rate_limit
+        ))
+        # Read by PaymentGateway in this process and any forked workers
+        os.environ[GATEWAY_URL_ENV] = gateway.start()
+
+    server = None
+    base_url = args.base_url
+    if args.mode == 'http' and not base_url:
+        server = start_http_server(args.group_commit, args.port)
+        base_url = f'http://127.0.0.1:{args.port}'
+
+    conn = get_db_connection()
+    book_ids = [row['id'] for row in conn.execute('SELECT id FROM books')]
+    owed_book_ids = [row['book_id'] for row in conn.execute(
+        'SELECT book_id FROM borrow_records WHERE patron_id = ? AND return_date IS NULL', (payer_id(0),))]
+    conn.close()
+
+    config = {
+        'mode': args.mode, 'base_url': base_url, 'db': database.DATABASE, 'threads': args.threads,
+        'processes': args.processes, 'duration': args.duration, 'requests': args.requests,
+        'mix': args.mix, 'group_commit': args.group_commit, 'seed': args.seed, 'book_ids': book_ids,
+        'owed_book_ids': owed_book_ids, 'gateway': args.gateway_latency if gateway else 'simulated'
+    }
+
+    start = time.perf_counter()
+    if args.processes > 1:
+        with multiprocessing.Pool(args.processes) as pool:
+            parts = pool.map(_process_entry, [(config, i) for i in range(args.processes)])
+    else:
+        parts = [run_workers(config, 0)]
+    elapsed = time.perf_counter() - start
+
+    if server:
+        server.shutdown()
+    if gateway:
+        gateway.stop()
+    if tmp:
+        tmp.cleanup()
+
+    summary = summarize(parts, elapsed)
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as handle:
+            baseline = json.load(handle)
+    print_report(summary, baseline)
+
+    output = args.output or os.path.join(RESULTS_DIR, f'loadtest-{datetime.now():%Y%m%d-%H%M%S}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    settings = {key: value for key, value in config.items() if key not in ('book_ids', 'owed_book_ids', 'db')}
+    with open(output, 'w', encoding='utf-8') as handle:
+        json.dump({'run_at': datetime.now().isoformat(), 'settings': settings, 'summary': summary}, handle, indent=2)
+    print(f'\nsaved {output}')
+
+
+if __name__ == '__main__':
+    main()
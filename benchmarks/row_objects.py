@@ -0,0 +1,86 @@
+"""
+Row object benchmark - memory and throughput of catalog scans
+
+Compares materialising a full books scan as dict(sqlite3.Row) per row (the
+old data layer) against slotted Book records built by a row factory.
+
+Usage:
+    python benchmarks/row_objects.py [--rows 1000000]
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from models import BOOK_COLUMNS, book_factory  # noqa: E402
+
+
+def build_catalog(path: str, rows: int) -> None:
+    conn = sqlite3.connect(path)
+    conn.execute('''
+        CREATE TABLE books (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            author TEXT NOT NULL,
+            isbn TEXT UNIQUE NOT NULL,
+            total_copies INTEGER NOT NULL,
+            available_copies INTEGER NOT NULL
+        )
+    ''')
+    conn.executemany(
+        'INSERT INTO books (title, author, isbn, total_copies, available_copies) VALUES (?, ?, ?, ?, ?)',
+        ((f'Title {i}', f'Author {i % 5000}', f'{i:013d}', 3, i % 4) for i in range(rows))
+    )
+    conn.commit()
+    conn.close()
+
+
+def scan_dicts(conn: sqlite3.Connection) -> list:
+    conn.row_factory = sqlite3.Row
+    return [dict(row) for row in conn.execute('SELECT * FROM books')]
+
+
+def scan_records(conn: sqlite3.Connection) -> list:
+    cursor = conn.cursor()
+    cursor.row_factory = book_factory
+    return cursor.execute(f'SELECT {BOOK_COLUMNS} FROM books').fetchall()
+
+
+def measure(path: str, scan) -> tuple:
+    """Return (seconds, peak MiB) for one full scan held in memory."""
+    conn = sqlite3.connect(path)
+    tracemalloc.start()
+    start = time.perf_counter()
+    rows = scan(conn)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    conn.close()
+    del rows
+    return elapsed, peak / (1024 * 1024)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'catalog.db')
+        build_catalog(path, args.rows)
+
+        print(f'{args.rows:,} rows')
+        print(f'{"strategy":<14}{"seconds":>10}{"rows/s":>14}{"peak MiB":>12}')
+        for name, scan in (('dict(row)', scan_dicts), ('Book records', scan_records)):
+            elapsed, peak = measure(path, scan)
+            print(f'{name:<14}{elapsed:>10.2f}{args.rows / elapsed:>14,.0f}{peak:>12.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Service logic benchmark - circulation cycles on each repository backend
+
+Runs borrow -> status report -> late-fee lookup -> return cycles through
+library_service against a fresh SQLite database and the in-memory store,
+showing how much of each cycle is storage and how much is service logic.
+
+Usage:
+    python benchmarks/service_logic.py [--cycles 2000] [--books 200]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import database  # noqa: E402
+from repositories import InMemoryRepository, SQLiteRepository, use_repository  # noqa: E402
+from services.library_service import (  # noqa: E402
+    borrow_book_by_patron, return_book_by_patron, calculate_late_fee_for_book, get_patron_status_report
+)
+
+
+def seed(repository, books: int) -> list:
+    for i in range(books):
+        repository.insert_book(f'Benchmark Title {i:05d}', f'Author {i % 50}', f'{9790000000000 + i}', 5, 5)
+    return [book.id for book in repository.get_all_books() if book.title.startswith('Benchmark')]
+
+
+def run_cycles(book_ids: list, cycles: int) -> float:
+    """Return the seconds taken by `cycles` borrow/report/fee/return cycles."""
+    start = time.perf_counter()
+    for i in range(cycles):
+        patron_id = f'{500000 + i % 100:06d}'
+        book_id = book_ids[i % len(book_ids)]
+        borrow_book_by_patron(patron_id, book_id)
+        get_patron_status_report(patron_id)
+        calculate_late_fee_for_book(patron_id, book_id)
+        return_book_by_patron(patron_id, book_id)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--cycles', type=int, default=2000)
+    parser.add_argument('--books', type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DATABASE = os.path.join(tmp, 'library.db')
+        database.init_database()
+        backends = (('sqlite', SQLiteRepository()), ('memory', InMemoryRepository()))
+
+        print(f'{args.cycles:,} cycles over {args.books} titles')
+        print(f'{"backend":<10}{"seconds":>10}{"cycles/s":>12}')
+        for name, repository in backends:
+            with use_repository(repository):
+                book_ids = seed(repository, args.books)
+                elapsed = run_cycles(book_ids, args.cycles)
+            print(f'{name:<10}{elapsed:>10.2f}{args.cycles / elapsed:>12,.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,22 @@
+"""
+Commands Package - Initialize all CLI command groups
+Run with `flask --app app <group> <command>`
+"""
+
+from .hold_commands import holds_cli
+from .notice_commands import notices_cli
+from .fee_commands import fees_cli
+from .payment_commands import payments_cli
+from .maintenance_commands import maintenance_cli
+from .backup_commands import backups_cli
+from .catalog_commands import catalog_cli
+
+def register_commands(app):
+    """Register all CLI command groups with the Flask app."""
+    app.cli.add_command(holds_cli)
+    app.cli.add_command(notices_cli)
+    app.cli.add_command(fees_cli)
+    app.cli.add_command(payments_cli)
+    app.cli.add_command(maintenance_cli)
+    app.cli.add_command(backups_cli)
+    app.cli.add_command(catalog_cli)
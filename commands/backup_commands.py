@@ -0,0 +1,39 @@
+"""
+Backup Commands - Online database backups
+"""
+
+import os
+
+import click
+from flask.cli import AppGroup
+from services.backup_service import (
+    create_backup, list_backups, verify_backup, DEFAULT_BACKUP_DIR, DEFAULT_KEEP, PAGES_PER_STEP, STEP_PAUSE
+)
+
+backups_cli = AppGroup('backups', help='Online database backups.')
+
+@backups_cli.command('create')
+@click.option('--dir', 'backup_dir', default=DEFAULT_BACKUP_DIR, show_default=True, help='Backup directory.')
+@click.option('--keep', default=DEFAULT_KEEP, show_default=True, help='Backups to retain.')
+@click.option('--pages', default=PAGES_PER_STEP, show_default=True, help='Pages copied per step.')
+@click.option('--pause', default=STEP_PAUSE, show_default=True, help='Seconds to pause between steps.')
+def create(backup_dir, keep, pages, pause):
+    """Back up the live database, verify the copy and rotate old backups."""
+    result = create_backup(backup_dir, keep, pages, pause)
+    if result['status'] != 'Completed':
+        raise click.ClickException(result['status'])
+    click.echo(f"Wrote {result['path']} ({result['pages']} pages) in {result['seconds']:.3f}s; "
+               f"removed {len(result['removed'])} old backup(s).")
+
+@backups_cli.command('verify')
+@click.option('--dir', 'backup_dir', default=DEFAULT_BACKUP_DIR, show_default=True, help='Backup directory.')
+def verify(backup_dir):
+    """Integrity-check every retained backup."""
+    names = list_backups(backup_dir)
+    failed = 0
+    for name in names:
+        integrity = verify_backup(os.path.join(backup_dir, name))
+        failed += integrity != 'ok'
+        click.echo(f"{name}: {integrity}")
+    if failed:
+        raise click.ClickException(f"{failed} of {len(names)} backup(s) failed the integrity check")
@@ -0,0 +1,32 @@
+"""
+Catalog Commands - Snapshots for read-only search nodes
+"""
+
+import click
+from flask.cli import AppGroup
+from repositories.snapshot import CatalogSnapshot, SnapshotError
+from services.catalog_snapshot import export_catalog_snapshot, DEFAULT_SNAPSHOT_PATH
+
+catalog_cli = AppGroup('catalog', help='Catalog snapshots for read-only nodes.')
+
+@catalog_cli.command('export-snapshot')
+@click.argument('path', default=DEFAULT_SNAPSHOT_PATH)
+def export_snapshot(path):
+    """Write the catalog to a memory-mappable snapshot file."""
+    result = export_catalog_snapshot(path)
+    if result['status'] != 'Completed':
+        raise click.ClickException(result['status'])
+    click.echo(f"Wrote {result['path']}: {result['books']} books at change {result['version']} "
+               f"({result['bytes']} bytes) in {result['seconds']:.3f}s.")
+
+@catalog_cli.command('snapshot-info')
+@click.argument('path', default=DEFAULT_SNAPSHOT_PATH)
+def snapshot_info(path):
+    """Verify a snapshot file and show what it holds."""
+    try:
+        snapshot = CatalogSnapshot(path, verify=True)
+    except (OSError, ValueError, SnapshotError) as e:
+        raise click.ClickException(str(e))
+    click.echo(f"{path}: {snapshot.book_count} books at change {snapshot.version}, "
+               f"written {snapshot.created_at.isoformat(timespec='seconds')}.")
+    snapshot.close()
@@ -0,0 +1,18 @@
+"""
+Fee Commands - Daily late-fee accrual
+"""
+
+import click
+from flask.cli import AppGroup
+from services.fee_ledger_service import accrue_late_fees
+
+fees_cli = AppGroup('fees', help='Maintain the late-fee ledger.')
+
+@fees_cli.command('accrue')
+def accrue_fees():
+    """Accrue late fees on loans that became or stayed overdue."""
+    result = accrue_late_fees()
+    if result['status'] != 'Completed':
+        raise click.ClickException(result['status'])
+    click.echo(f"Examined {result['loans_examined']} loans; wrote {result['entries']} accrual entries "
+               f"totalling ${result['amount_accrued']:.2f}.")
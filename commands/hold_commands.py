@@ -0,0 +1,18 @@
+"""
+Hold Commands - Periodic maintenance of the hold queues
+"""
+
+import click
+from flask.cli import AppGroup
+from services.hold_service import sweep_expired_holds
+
+holds_cli = AppGroup('holds', help='Manage hold queues.')
+
+@holds_cli.command('sweep')
+def sweep_holds():
+    """Expire lapsed holds and pass reserved copies down the queue."""
+    result = sweep_expired_holds()
+    if result['status'] != 'Completed':
+        raise click.ClickException(result['status'])
+    click.echo(f"Expired {result['expired_waiting']} waiting and {result['expired_ready']} ready holds; "
+               f"reallocated {result['reallocated']} copies.")
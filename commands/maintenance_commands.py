@@ -0,0 +1,33 @@
+"""
+Maintenance Commands - Run database upkeep on demand (e.g. from cron)
+"""
+
+import click
+from flask.cli import AppGroup
+from services.availability_reconciliation import reconcile_availability, DEFAULT_REPAIR_BATCH
+from services.maintenance import run_maintenance, MAINTENANCE_TASKS
+
+maintenance_cli = AppGroup('maintenance', help='Database upkeep.')
+
+@maintenance_cli.command('run')
+@click.option('--task', 'tasks', multiple=True, type=click.Choice(MAINTENANCE_TASKS),
+              help='Task to run (repeatable; default: all, in order).')
+def run(tasks):
+    """Prune the change log, reconcile availability, optimize, analyze, vacuum and checkpoint now."""
+    for step in run_maintenance(tasks or MAINTENANCE_TASKS):
+        click.echo(f"{step['task']}: {step['result']} ({step['seconds']:.3f}s)")
+
+@maintenance_cli.command('reconcile-availability')
+@click.option('--repair', is_flag=True, help='Correct drifted counts (default: report only).')
+@click.option('--full', is_flag=True, help='Check every book, not just those active since the last repair.')
+@click.option('--batch-size', default=DEFAULT_REPAIR_BATCH, show_default=True, help='Books repaired per transaction.')
+def reconcile(repair, full, batch_size):
+    """Compare available copies with open loans and ready holds."""
+    result = reconcile_availability(repair=repair, full=full, batch_size=batch_size)
+    if result['status'] != 'Completed':
+        raise click.ClickException(result['status'])
+    for book in result['drift']:
+        click.echo(f"Book {book['book_id']} ({book['title']}): available {book['available_copies']}, "
+                   f"expected {book['expected_copies']} ({book['open_loans']} on loan, "
+                   f"{book['ready_holds']} held, {book['total_copies']} total)")
+    click.echo(f"{len(result['drift'])} drifted books ({result['scope']} check); repaired {result['repaired']}.")
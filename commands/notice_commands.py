@@ -0,0 +1,22 @@
+"""
+Notice Commands - Nightly overdue and due-soon notice run
+"""
+
+import click
+from flask.cli import AppGroup
+from services.notice_service import generate_overdue_notices
+
+notices_cli = AppGroup('notices', help='Generate patron notices.')
+
+@notices_cli.command('run')
+@click.option('--output-dir', default='notices', show_default=True, help='Spool and checkpoint directory.')
+@click.option('--workers', default=4, show_default=True, help='Rendering processes (0 for none).')
+@click.option('--batch-size', default=500, show_default=True, help='Notices per spool file.')
+@click.option('--chunk-size', default=1000, show_default=True, help='Loans read per query.')
+def run_notices(output_dir, workers, batch_size, chunk_size):
+    """Render today's notices, resuming an interrupted run if there is one."""
+    result = generate_overdue_notices(output_dir, workers=workers, batch_size=batch_size, chunk_size=chunk_size)
+    if result['status'] != 'Completed':
+        raise click.ClickException(result['status'])
+    resumed = ' (resumed)' if result['resumed'] else ''
+    click.echo(f"Wrote {result['notices']} notices to {result['files']} files in {output_dir}{resumed}.")
@@ -0,0 +1,36 @@
+"""
+Payment Commands - Reconcile recorded payments with the payment gateway
+"""
+
+from datetime import datetime, timedelta
+
+import click
+from flask.cli import AppGroup
+from services.payment_reconciliation import (
+    reconcile_payments, DEFAULT_WORKERS, GATEWAY_RATE_LIMIT, GATEWAY_BURST
+)
+
+payments_cli = AppGroup('payments', help='Late-fee payment maintenance.')
+
+@payments_cli.command('reconcile')
+@click.option('--since', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+              help='Start of the period (default: 30 days ago).')
+@click.option('--until', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+              help='End of the period, exclusive (default: tomorrow).')
+@click.option('--output-dir', default='reconciliation', show_default=True, help='Report and checkpoint directory.')
+@click.option('--workers', default=DEFAULT_WORKERS, show_default=True, help='Concurrent gateway checks.')
+@click.option('--rate', default=GATEWAY_RATE_LIMIT, show_default=True, help='Gateway calls per second.')
+@click.option('--burst', default=GATEWAY_BURST, show_default=True, help='Gateway calls allowed in a burst.')
+@click.option('--chunk-size', default=200, show_default=True, help='Payments verified between checkpoints.')
+def reconcile(since, until, output_dir, workers, rate, burst, chunk_size):
+    """Verify recorded payments with the gateway, resuming an interrupted run."""
+    today = datetime.combine(datetime.now().date(), datetime.min.time())
+    since = since or today - timedelta(days=30)
+    until = until or today + timedelta(days=1)
+    result = reconcile_payments(output_dir, since, until, workers=workers, rate=rate, burst=burst,
+                                chunk_size=chunk_size)
+    if result['status'] != 'Completed':
+        raise click.ClickException(result['status'])
+    resumed = ' (resumed)' if result['resumed'] else ''
+    click.echo(f"Verified {result['verified']} payments; {result['mismatches']} mismatches "
+               f"in {len(result['reports'])} report files in {output_dir}{resumed}.")
@@ -3,23 +3,71 @@ Database module for Library Management System
 Handles all database operations and connections
 """
 
+import json
+import queue
 import sqlite3
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from models import BOOK_COLUMNS, Book, Loan, book_factory
 
 # Database configuration
 DATABASE = 'library.db'
 
+# Callbacks notified with the new book row after insert_book commits
+_book_insert_listeners: List[Callable[[Dict], None]] = []
+
+# Storage profiles: PRAGMAs applied when the database is opened.
+# journal_mode and auto_vacuum are stored in the database file and set by
+# init_database; the rest apply to each connection.
+STORAGE_PROFILES: Dict[str, Dict[str, Any]] = {
+    # SQLite's own defaults: rollback journal, 2 MB cache, no mmap
+    'default': {},
+    'tuned': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',      # durable at checkpoints; safe with WAL
+        'cache_size': -32000,         # negative: KiB, so 32 MB per connection
+        'mmap_size': 268435456,
+        'temp_store': 'MEMORY',
+        'busy_timeout': 5000,         # ms
+        'auto_vacuum': 'INCREMENTAL', # takes effect on newly created databases
+    },
+}
+_PERSISTENT_PRAGMAS = ('auto_vacuum', 'journal_mode')
+
+STORAGE_PROFILE: Dict[str, Any] = STORAGE_PROFILES['tuned']
+
+def set_storage_profile(profile: Any) -> Dict[str, Any]:
+    """Select a storage profile by name, or give the PRAGMAs directly."""
+    global STORAGE_PROFILE
+    if isinstance(profile, str):
+        if profile not in STORAGE_PROFILES:
+            raise ValueError(f"Unknown storage profile: {profile}")
+        profile = STORAGE_PROFILES[profile]
+    STORAGE_PROFILE = dict(profile)
+    return STORAGE_PROFILE
+
 def get_db_connection():
     """Get a database connection."""
     conn = sqlite3.connect(DATABASE)
     conn.row_factory = sqlite3.Row  # This enables column access by name
+    for pragma, value in STORAGE_PROFILE.items():
+        if pragma not in _PERSISTENT_PRAGMAS:
+            conn.execute(f'PRAGMA {pragma} = {value}')
     return conn
 
 def init_database():
     """Initialize the database with required tables."""
     conn = get_db_connection()
     
+    # auto_vacuum must be chosen before the first table is created
+    for pragma in _PERSISTENT_PRAGMAS:
+        if pragma in STORAGE_PROFILE:
+            conn.execute(f'PRAGMA {pragma} = {STORAGE_PROFILE[pragma]}')
+    
     # Create books table
     conn.execute('''
         CREATE TABLE IF NOT EXISTS books (
@@ -45,9 +93,310 @@ def init_database():
         )
     ''')
     
+    # Create holds table (per-book queues ordered by priority, then arrival)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS holds (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            patron_id TEXT NOT NULL,
+            book_id INTEGER NOT NULL,
+            priority INTEGER NOT NULL DEFAULT 0,
+            status TEXT NOT NULL DEFAULT 'waiting',
+            created_at TEXT NOT NULL,
+            ready_at TEXT,
+            expires_at TEXT,
+            FOREIGN KEY (book_id) REFERENCES books (id)
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_holds_queue ON holds (book_id, status, priority DESC, id)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_holds_expiry ON holds (status, expires_at)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_holds_patron ON holds (patron_id, book_id, status)')
+    # One active hold per patron and book; waiting duplicates placed before
+    # this index existed are cancelled so it can be built
+    conn.execute('''
+        UPDATE holds SET status = 'cancelled'
+        WHERE status = 'waiting' AND EXISTS (
+            SELECT 1 FROM holds h
+            WHERE h.patron_id = holds.patron_id AND h.book_id = holds.book_id
+              AND (h.status = 'ready' OR (h.status = 'waiting' AND h.id < holds.id))
+        )
+    ''')
+    conn.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_holds_active_patron ON holds (patron_id, book_id)
+        WHERE status IN ('waiting', 'ready')
+    ''')
+    
+    # Open loans by patron (partial index; returned loans are never scanned)
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_borrow_records_open_patron
+        ON borrow_records (patron_id) WHERE return_date IS NULL
+    ''')
+    
+    # Late-fee ledger: accruals (+), payments (-) and refunds (+) per loan
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS fee_ledger (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            patron_id TEXT NOT NULL,
+            borrow_record_id INTEGER,
+            book_id INTEGER,
+            entry_type TEXT NOT NULL,
+            amount REAL NOT NULL,
+            transaction_id TEXT,
+            created_at TEXT NOT NULL,
+            FOREIGN KEY (borrow_record_id) REFERENCES borrow_records (id)
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_fee_ledger_loan ON fee_ledger (borrow_record_id, entry_type)')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_fee_ledger_transaction
+        ON fee_ledger (transaction_id) WHERE transaction_id IS NOT NULL
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_fee_ledger_payments
+        ON fee_ledger (created_at, id) WHERE entry_type = 'payment'
+    ''')
+    
+    # How much of each overdue loan's fee has been accrued to the ledger
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS loan_fee_accruals (
+            borrow_record_id INTEGER PRIMARY KEY,
+            patron_id TEXT NOT NULL,
+            accrued_amount REAL NOT NULL,
+            accrued_through TEXT NOT NULL,
+            settled INTEGER NOT NULL DEFAULT 0,
+            FOREIGN KEY (borrow_record_id) REFERENCES borrow_records (id)
+        )
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_loan_fee_accruals_open
+        ON loan_fee_accruals (borrow_record_id) WHERE settled = 0
+    ''')
+    
+    # Running balance per patron, kept current by a trigger on the ledger
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS patron_balances (
+            patron_id TEXT PRIMARY KEY,
+            balance REAL NOT NULL,
+            updated_at TEXT NOT NULL
+        )
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_fee_ledger_balance
+        AFTER INSERT ON fee_ledger
+        BEGIN
+            INSERT INTO patron_balances (patron_id, balance, updated_at)
+            VALUES (NEW.patron_id, NEW.amount, NEW.created_at)
+            ON CONFLICT (patron_id) DO UPDATE
+            SET balance = ROUND(balance + NEW.amount, 2), updated_at = NEW.created_at;
+        END
+    ''')
+    
+    # Per-patron counter bumped by triggers whenever loans or fees change
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS patron_loan_versions (
+            patron_id TEXT PRIMARY KEY,
+            version INTEGER NOT NULL
+        )
+    ''')
+    for trigger, event in (('trg_borrow_records_insert_version', 'AFTER INSERT ON borrow_records'),
+                           ('trg_borrow_records_return_version', 'AFTER UPDATE OF return_date ON borrow_records'),
+                           ('trg_fee_ledger_version', 'AFTER INSERT ON fee_ledger')):
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {trigger}
+            {event}
+            BEGIN
+                INSERT INTO patron_loan_versions (patron_id, version) VALUES (NEW.patron_id, 1)
+                ON CONFLICT (patron_id) DO UPDATE SET version = version + 1;
+            END
+        ''')
+    
+    # Circulation rollups for the stats API, kept current by triggers so
+    # reporting never scans borrow_records
+    rollups_exist = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'circulation_daily'"
+    ).fetchone() is not None
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS circulation_daily (
+            day TEXT PRIMARY KEY,
+            checkouts INTEGER NOT NULL DEFAULT 0,
+            returns INTEGER NOT NULL DEFAULT 0,
+            late_returns INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS book_circulation (
+            book_id INTEGER PRIMARY KEY,
+            checkouts INTEGER NOT NULL DEFAULT 0,
+            returns INTEGER NOT NULL DEFAULT 0,
+            late_returns INTEGER NOT NULL DEFAULT 0,
+            open_loans INTEGER NOT NULL DEFAULT 0,
+            FOREIGN KEY (book_id) REFERENCES books (id)
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_book_circulation_checkouts ON book_circulation (checkouts DESC)')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS patron_circulation (
+            patron_id TEXT PRIMARY KEY,
+            checkouts INTEGER NOT NULL DEFAULT 0,
+            returns INTEGER NOT NULL DEFAULT 0,
+            late_returns INTEGER NOT NULL DEFAULT 0,
+            open_loans INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    # Open loans per due day; the overdue count is a sum over past days
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS open_loans_by_due_day (
+            day TEXT PRIMARY KEY,
+            open_loans INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_borrow_records_insert_rollups
+        AFTER INSERT ON borrow_records
+        BEGIN
+            INSERT INTO circulation_daily (day, checkouts) VALUES (substr(NEW.borrow_date, 1, 10), 1)
+            ON CONFLICT (day) DO UPDATE SET checkouts = checkouts + 1;
+            INSERT INTO book_circulation (book_id, checkouts, open_loans) VALUES (NEW.book_id, 1, 1)
+            ON CONFLICT (book_id) DO UPDATE SET checkouts = checkouts + 1, open_loans = open_loans + 1;
+            INSERT INTO patron_circulation (patron_id, checkouts, open_loans) VALUES (NEW.patron_id, 1, 1)
+            ON CONFLICT (patron_id) DO UPDATE SET checkouts = checkouts + 1, open_loans = open_loans + 1;
+            INSERT INTO open_loans_by_due_day (day, open_loans) VALUES (substr(NEW.due_date, 1, 10), 1)
+            ON CONFLICT (day) DO UPDATE SET open_loans = open_loans + 1;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_borrow_records_return_rollups
+        AFTER UPDATE OF return_date ON borrow_records
+        WHEN OLD.return_date IS NULL AND NEW.return_date IS NOT NULL
+        BEGIN
+            INSERT INTO circulation_daily (day, returns, late_returns)
+            VALUES (substr(NEW.return_date, 1, 10), 1, NEW.return_date > NEW.due_date)
+            ON CONFLICT (day) DO UPDATE
+            SET returns = returns + 1, late_returns = late_returns + (NEW.return_date > NEW.due_date);
+            UPDATE book_circulation
+            SET returns = returns + 1, open_loans = open_loans - 1,
+                late_returns = late_returns + (NEW.return_date > NEW.due_date)
+            WHERE book_id = NEW.book_id;
+            UPDATE patron_circulation
+            SET returns = returns + 1, open_loans = open_loans - 1,
+                late_returns = late_returns + (NEW.return_date > NEW.due_date)
+            WHERE patron_id = NEW.patron_id;
+            UPDATE open_loans_by_due_day SET open_loans = open_loans - 1
+            WHERE day = substr(NEW.due_date, 1, 10);
+        END
+    ''')
+    if not rollups_exist:
+        _backfill_circulation_rollups(conn)
+
+    # Payment and refund outcomes by client-supplied idempotency key
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS idempotency_keys (
+            action TEXT NOT NULL,
+            idempotency_key TEXT NOT NULL,
+            request_hash TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'in_flight',
+            response TEXT,
+            created_at TEXT NOT NULL,
+            completed_at TEXT,
+            PRIMARY KEY (action, idempotency_key)
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_idempotency_keys_created ON idempotency_keys (created_at)')
+    
+    # Named values remembered between job runs (e.g. last fee accrual)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS job_state (
+            name TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        )
+    ''')
+    
+    # Lookups for the accrual job: open loans by due date, returns by date
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_borrow_records_open_due
+        ON borrow_records (due_date) WHERE return_date IS NULL
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_borrow_records_return_date ON borrow_records (return_date)')
+    
+    # Lookups for availability reconciliation: open loans per book, loans by start
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_borrow_records_open_book
+        ON borrow_records (book_id) WHERE return_date IS NULL
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_borrow_records_borrow_date ON borrow_records (borrow_date)')
+    
+    # Indexes for keyset-paginated search (ordered by title, id) and author prefixes
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_books_title_id ON books (title, id)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_books_author_nocase ON books (author COLLATE NOCASE)')
+    
+    # Append-only catalog change feed, written by triggers so every path
+    # that touches books (circulation, holds, admin edits) is captured
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS catalog_changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            book_id INTEGER NOT NULL,
+            change_type TEXT NOT NULL,
+            changed_at TEXT NOT NULL
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_catalog_changes_changed_at ON catalog_changes (changed_at)')
+    for trigger, event, row in (('trg_books_insert_change', 'AFTER INSERT ON books', 'NEW'),
+                                ('trg_books_update_change', 'AFTER UPDATE ON books', 'NEW'),
+                                ('trg_books_delete_change', 'AFTER DELETE ON books', 'OLD')):
+        change_type = event.split()[1].lower()
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {trigger}
+            {event}
+            BEGIN
+                INSERT INTO catalog_changes (book_id, change_type, changed_at)
+                VALUES ({row}.id, '{change_type}', strftime('%Y-%m-%dT%H:%M:%S', 'now', 'localtime'));
+            END
+        ''')
+    
     conn.commit()
     conn.close()
 
+def _backfill_circulation_rollups(conn: sqlite3.Connection) -> None:
+    """One-off full aggregation for databases that predate the rollup tables."""
+    conn.execute('''
+        INSERT INTO circulation_daily (day, checkouts, returns, late_returns)
+        SELECT day, SUM(checkouts), SUM(returns), SUM(late_returns) FROM (
+            SELECT substr(borrow_date, 1, 10) AS day, 1 AS checkouts, 0 AS returns, 0 AS late_returns
+            FROM borrow_records
+            UNION ALL
+            SELECT substr(return_date, 1, 10), 0, 1, return_date > due_date
+            FROM borrow_records WHERE return_date IS NOT NULL
+        ) GROUP BY day
+    ''')
+    for table, key in (('book_circulation', 'book_id'), ('patron_circulation', 'patron_id')):
+        conn.execute(f'''
+            INSERT INTO {table} ({key}, checkouts, returns, late_returns, open_loans)
+            SELECT {key}, COUNT(*), COUNT(return_date),
+                   SUM(return_date IS NOT NULL AND return_date > due_date), SUM(return_date IS NULL)
+            FROM borrow_records GROUP BY {key}
+        ''')
+    conn.execute('''
+        INSERT INTO open_loans_by_due_day (day, open_loans)
+        SELECT substr(due_date, 1, 10), COUNT(*) FROM borrow_records
+        WHERE return_date IS NULL GROUP BY substr(due_date, 1, 10)
+    ''')
+
+# Sample catalog: (title, author, isbn, copies)
+SAMPLE_BOOKS = [
+    ('The Great Gatsby', 'F. Scott Fitzgerald', '9780743273565', 3),
+    ('To Kill a Mockingbird', 'Harper Lee', '9780061120084', 2),
+    ('1984', 'George Orwell', '9780451524935', 1)
+]
+
+def sample_loans(now: datetime) -> List[Tuple[str, int, datetime, datetime]]:
+    """Sample open loans as (patron_id, book_id, borrow_date, due_date)."""
+    return [
+        # Makes 1984 unavailable
+        ('123456', 3, now - timedelta(days=5), now + timedelta(days=9)),
+        ('345453', 2, now - timedelta(days=19), now - timedelta(days=5)),  # 5 days overdue
+        ('298734', 2, now - timedelta(days=24), now - timedelta(days=10)),  # 10 days overdue
+        ('298745', 2, now - timedelta(days=49), now - timedelta(days=35)),  # 35 days overdue
+    ]
+
 def add_sample_data():
     """Add sample data to the database if it's empty."""
     conn = get_db_connection()
@@ -56,159 +405,1181 @@ def add_sample_data():
     
     if book_count == 0:
         # Add sample books
-        sample_books = [
-            ('The Great Gatsby', 'F. Scott Fitzgerald', '9780743273565', 3),
-            ('To Kill a Mockingbird', 'Harper Lee', '9780061120084', 2),
-            ('1984', 'George Orwell', '9780451524935', 1)
-        ]
-        
-        for title, author, isbn, copies in sample_books:
+        for title, author, isbn, copies in SAMPLE_BOOKS:
             conn.execute('''
                 INSERT INTO books (title, author, isbn, total_copies, available_copies)
                 VALUES (?, ?, ?, ?, ?)
             ''', (title, author, isbn, copies, copies))
         
-        # Make 1984 unavailable by adding a borrow record
-        conn.execute('''
-            INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date)
-            VALUES (?, ?, ?, ?)
-        ''', ('123456', 3, 
-              (datetime.now() - timedelta(days=5)).isoformat(),
-              (datetime.now() + timedelta(days=9)).isoformat()))
-        
-        # Update available copies for 1984
-        conn.execute('UPDATE books SET available_copies = 0 WHERE id = 3')
-        overdue_samples = [
-            ('345453', 2, now - timedelta(days=19), now - timedelta(days=5)),  # 5 days overdue
-            ('298734', 2, now - timedelta(days=24), now - timedelta(days=10)),  # 10 days overdue
-            ('298745', 2, now - timedelta(days=49), now - timedelta(days=35)),  # 35 days overdue
-        ]
-
-        for patron, book, borrow, due in overdue_samples:
+        for patron, book, borrow, due in sample_loans(now):
             conn.execute('''
                 INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date)
                 VALUES (?, ?, ?, ?)
             ''', (patron, book, borrow.isoformat(), due.isoformat()))
-
+        
+        # Update available copies for 1984
+        conn.execute('UPDATE books SET available_copies = 0 WHERE id = 3')
         
         conn.commit()
     
     conn.close()
 
+def register_book_insert_listener(listener: Callable[[Dict], None]) -> None:
+    """Register a callback that receives each newly inserted book as a dict."""
+    if listener not in _book_insert_listeners:
+        _book_insert_listeners.append(listener)
+
+def notify_book_inserted(book: Dict) -> None:
+    """Pass a newly inserted book to the registered listeners."""
+    for listener in _book_insert_listeners:
+        listener(book)
+
 # Helper Functions for Database Operations
 
-def get_all_books() -> List[Dict]:
-    """Get all books from the database."""
+@contextmanager
+def _reading(conn: Optional[sqlite3.Connection] = None):
+    """Use the caller's connection if given, otherwise open and close one."""
+    if conn is not None:
+        yield conn
+        return
     conn = get_db_connection()
-    books = conn.execute('SELECT * FROM books ORDER BY title').fetchall()
-    conn.close()
-    return [dict(book) for book in books]
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+def _select_books(conn: sqlite3.Connection, query: str, params: Any = ()) -> sqlite3.Cursor:
+    """Run a query selecting BOOK_COLUMNS, yielding Book records."""
+    cursor = conn.cursor()
+    cursor.row_factory = book_factory
+    return cursor.execute(query, params)
+
+def _loan_from_row(row: tuple, now: datetime) -> Loan:
+    """Build a Loan from (id, patron_id, book_id, borrow_date, due_date, title, author)."""
+    due_date = datetime.fromisoformat(row[4])
+    return Loan(row[0], row[1], row[2], row[5], row[6],
+                datetime.fromisoformat(row[3]), due_date, now > due_date)
+
+def get_all_books(conn: Optional[sqlite3.Connection] = None) -> List[Book]:
+    """Get all books from the database."""
+    with _reading(conn) as conn:
+        return _select_books(conn, f'SELECT {BOOK_COLUMNS} FROM books ORDER BY title').fetchall()
+
+def iter_books(chunk_size: int = 500) -> Iterator[Book]:
+    """
+    Stream every book ordered by title, `chunk_size` rows per keyset query
+    (served by idx_books_title_id), for pages that render the whole catalog.
+    """
+    last_title, last_id = '', 0
+    while True:
+        conn = get_db_connection()
+        books = _select_books(conn, f'''
+            SELECT {BOOK_COLUMNS} FROM books
+            WHERE (title, id) > (?, ?)
+            ORDER BY title, id
+            LIMIT ?
+        ''', (last_title, last_id, chunk_size)).fetchall()
+        conn.close()
+        yield from books
+        if len(books) < chunk_size:
+            return
+        last_title, last_id = books[-1].title, books[-1].id
 
-def get_book_by_id(book_id: int) -> Optional[Dict]:
+def get_book_by_id(book_id: int, conn: Optional[sqlite3.Connection] = None) -> Optional[Book]:
     """Get a specific book by ID."""
-    conn = get_db_connection()
-    book = conn.execute('SELECT * FROM books WHERE id = ?', (book_id,)).fetchone()
-    conn.close()
-    return dict(book) if book else None
+    with _reading(conn) as conn:
+        return _select_books(conn, f'SELECT {BOOK_COLUMNS} FROM books WHERE id = ?', (book_id,)).fetchone()
 
-def get_book_by_isbn(isbn: str) -> Optional[Dict]:
+def get_book_by_isbn(isbn: str, conn: Optional[sqlite3.Connection] = None) -> Optional[Book]:
     """Get a specific book by ISBN."""
+    with _reading(conn) as conn:
+        return _select_books(conn, f'SELECT {BOOK_COLUMNS} FROM books WHERE isbn = ?', (isbn,)).fetchone()
+
+def search_books_by_field(search_type: str, term: str) -> List[Book]:
+    """Get books by exact ISBN, or by partial title or author (case-insensitive), by title."""
+    if search_type == 'isbn':
+        query = f'SELECT {BOOK_COLUMNS} FROM books WHERE isbn = ? ORDER BY title'
+        params = (term,)
+    elif search_type in ('title', 'author'):
+        query = f'SELECT {BOOK_COLUMNS} FROM books WHERE LOWER({search_type}) LIKE ? ORDER BY title'
+        params = (f'%{term.lower()}%',)
+    else:
+        return []
     conn = get_db_connection()
-    book = conn.execute('SELECT * FROM books WHERE isbn = ?', (isbn,)).fetchone()
+    books = _select_books(conn, query, params).fetchall()
     conn.close()
-    return dict(book) if book else None
+    return books
+
+def _escape_like(term: str) -> str:
+    """Escape LIKE wildcards so user input is matched literally."""
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+def _compile_search_filters(title: Optional[str], author: Optional[str], author_prefix: Optional[str],
+                            isbn: Optional[str], available_only: bool) -> Tuple[List[str], List]:
+    """Turn search filters into AND-ed SQL conditions and their parameters."""
+    conditions = []
+    params = []
+
+    if isbn:
+        conditions.append('isbn = ?')
+        params.append(isbn)
+    if title:
+        conditions.append("title LIKE ? ESCAPE '\\'")
+        params.append(f'%{_escape_like(title)}%')
+    if author:
+        conditions.append("author LIKE ? ESCAPE '\\'")
+        params.append(f'%{_escape_like(author)}%')
+    if author_prefix:
+        # A half-open range can use the NOCASE author index, unlike LIKE 'x%'
+        lower = author_prefix.lower()
+        upper = lower[:-1] + chr(ord(lower[-1]) + 1)
+        conditions.append('author >= ? COLLATE NOCASE AND author < ? COLLATE NOCASE')
+        params.extend([lower, upper])
+    if available_only:
+        conditions.append('available_copies > 0')
+
+    return conditions, params
 
-def get_patron_borrowed_books(patron_id: str) -> List[Dict]:
+def search_books_page(title: Optional[str], author: Optional[str], author_prefix: Optional[str],
+                      isbn: Optional[str], available_only: bool, after: Optional[Tuple[str, int]],
+                      limit: int, count_cap: int,
+                      conn: Optional[sqlite3.Connection] = None) -> Tuple[List[Book], int]:
+    """
+    Get up to `limit` books matching all the given filters, ordered by
+    (title, id) and starting after the keyset `after`, with the number of
+    matches counted up to `count_cap` in the same statement.
+    """
+    conditions, params = _compile_search_filters(title, author, author_prefix, isbn, available_only)
+    where = ' AND '.join(conditions)
+
+    page_conditions = list(conditions)
+    page_params = list(params)
+    if after:
+        page_conditions.append('(title, id) > (?, ?)')
+        page_params.extend(after)
+
+    query = f'''
+        SELECT {BOOK_COLUMNS},
+               (SELECT COUNT(*) FROM (SELECT 1 FROM books WHERE {where} LIMIT ?)) AS total_estimate
+        FROM books
+        WHERE {' AND '.join(page_conditions)}
+        ORDER BY title, id
+        LIMIT ?
+    '''
+
+    with _reading(conn) as conn:
+        rows = conn.execute(query, params + [count_cap] + page_params + [limit]).fetchall()
+        if rows:
+            total = rows[0]['total_estimate']
+        else:
+            total = conn.execute(
+                f'SELECT COUNT(*) FROM (SELECT 1 FROM books WHERE {where} LIMIT ?)',
+                params + [count_cap]
+            ).fetchone()[0]
+    return [Book(*row[:-1]) for row in rows], total
+
+def get_patron_borrowed_books(patron_id: str, conn: Optional[sqlite3.Connection] = None) -> List[Loan]:
     """Get currently borrowed books for a patron."""
-    conn = get_db_connection()
-    records = conn.execute('''
-        SELECT br.*, b.title, b.author 
-        FROM borrow_records br 
-        JOIN books b ON br.book_id = b.id 
-        WHERE br.patron_id = ? AND br.return_date IS NULL
-        ORDER BY br.borrow_date
-    ''', (patron_id,)).fetchall()
-    conn.close()
-    
-    borrowed_books = []
-    for record in records:
-        borrowed_books.append({
-            'book_id': record['book_id'],
-            'title': record['title'],
-            'author': record['author'],
-            'borrow_date': datetime.fromisoformat(record['borrow_date']),
-            'due_date': datetime.fromisoformat(record['due_date']),
-            'is_overdue': datetime.now() > datetime.fromisoformat(record['due_date'])
-        })
+    with _reading(conn) as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        records = cursor.execute('''
+            SELECT br.id, br.patron_id, br.book_id, br.borrow_date, br.due_date, b.title, b.author
+            FROM borrow_records br 
+            JOIN books b ON br.book_id = b.id 
+            WHERE br.patron_id = ? AND br.return_date IS NULL
+            ORDER BY br.borrow_date
+        ''', (patron_id,)).fetchall()
     
-    return borrowed_books
+    now = datetime.now()
+    return [_loan_from_row(record, now) for record in records]
 
-def get_patron_borrow_count(patron_id: str) -> int:
+def get_patron_borrow_count(patron_id: str, conn: Optional[sqlite3.Connection] = None) -> int:
     """Get the number of books currently borrowed by a patron."""
+    with _reading(conn) as conn:
+        count = conn.execute('''
+            SELECT COUNT(*) as count FROM borrow_records 
+            WHERE patron_id = ? AND return_date IS NULL
+        ''', (patron_id,)).fetchone()['count']
+    return count
+
+def iter_open_loans(after_patron_id: str = '', chunk_size: int = 1000) -> Iterator[Tuple[Loan, float]]:
+    """
+    Stream every open loan ordered by patron ID, paired with the net amount
+    paid on it (payments less refunds in the fee ledger).
+    Rows are fetched `chunk_size` at a time with a keyset query per chunk,
+    so no read transaction is held open between chunks.
+    
+    Args:
+        after_patron_id: only loans of patrons sorting after this ID
+        chunk_size: rows fetched per query
+    """
+    last_patron_id, last_id = after_patron_id, 0
+    if after_patron_id:
+        # Skip the whole patron, not just the rows seen so far
+        last_id = 2 ** 63 - 1
+    while True:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        rows = cursor.execute('''
+            SELECT br.id, br.patron_id, br.book_id, br.borrow_date, br.due_date, b.title, b.author,
+                   COALESCE((SELECT -SUM(fl.amount) FROM fee_ledger fl
+                             WHERE fl.borrow_record_id = br.id AND fl.entry_type IN ('payment', 'refund')), 0)
+            FROM borrow_records br
+            JOIN books b ON br.book_id = b.id
+            WHERE br.return_date IS NULL AND (br.patron_id, br.id) > (?, ?)
+            ORDER BY br.patron_id, br.id
+            LIMIT ?
+        ''', (last_patron_id, last_id, chunk_size)).fetchall()
+        conn.close()
+        now = datetime.now()
+        for row in rows:
+            yield _loan_from_row(row, now), round(row[7], 2)
+        if len(rows) < chunk_size:
+            return
+        last_patron_id, last_id = rows[-1][1], rows[-1][0]
+
+def get_patron_loan_version(patron_id: str) -> int:
+    """Get the counter that changes whenever a patron's loans or fees change."""
     conn = get_db_connection()
-    count = conn.execute('''
-        SELECT COUNT(*) as count FROM borrow_records 
-        WHERE patron_id = ? AND return_date IS NULL
-    ''', (patron_id,)).fetchone()['count']
+    row = conn.execute('SELECT version FROM patron_loan_versions WHERE patron_id = ?', (patron_id,)).fetchone()
     conn.close()
-    return count
+    return row['version'] if row else 0
+
+def get_patrons_with_open_loans(limit: Optional[int] = None) -> List[str]:
+    """Get the IDs of patrons with at least one open loan."""
+    conn = get_db_connection()
+    rows = conn.execute('''
+        SELECT DISTINCT patron_id FROM borrow_records
+        WHERE return_date IS NULL
+        ORDER BY patron_id
+        LIMIT ?
+    ''', (-1 if limit is None else limit,)).fetchall()
+    conn.close()
+    return [row['patron_id'] for row in rows]
 
 def insert_book(title: str, author: str, isbn: str, total_copies: int, available_copies: int) -> bool:
     """Insert a new book into the database."""
     conn = get_db_connection()
     try:
-        conn.execute('''
+        cursor = conn.execute('''
             INSERT INTO books (title, author, isbn, total_copies, available_copies)
             VALUES (?, ?, ?, ?, ?)
         ''', (title, author, isbn, total_copies, available_copies))
         conn.commit()
         conn.close()
-        return True
     except Exception as e:
         conn.close()
         return False
 
-def insert_borrow_record(patron_id: str, book_id: int, borrow_date: datetime, due_date: datetime) -> bool:
-    """Insert a new borrow record into the database."""
+    book = {
+        'id': cursor.lastrowid,
+        'title': title,
+        'author': author,
+        'isbn': isbn,
+        'total_copies': total_copies,
+        'available_copies': available_copies
+    }
+    notify_book_inserted(book)
+    return True
+
+# Circulation writes
+# Each write is an operation taking a connection. It runs in its own
+# transaction, or through the group-commit writer when one is running.
+
+WriteOperation = Callable[[sqlite3.Connection], Any]
+
+_SHUTDOWN = object()
+
+class GroupCommitWriter:
+    """
+    Single writer thread that applies queued write operations in shared
+    transactions, so many operations cost one commit (and one fsync).
+
+    Each operation runs inside its own SAVEPOINT: a failing operation is
+    rolled back alone and its future gets the exception, while the rest of
+    the group still commits. Futures resolve only after the commit.
+    """
+
+    def __init__(self, max_batch: int = 64, max_wait: float = 0.0):
+        """
+        Args:
+            max_batch: most operations applied per transaction
+            max_wait: seconds to wait for more operations before committing
+                      a partial batch (0 commits whatever is already queued)
+        """
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.batches = 0
+        self.operations = 0
+        self._queue = queue.Queue()
+        self._thread = None
+
+    def start(self) -> None:
+        """Start the writer thread."""
+        if self.is_running():
+            return
+        self._thread = threading.Thread(target=self._run, name='circulation-writer', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Apply everything already queued, then stop the writer thread."""
+        if not self.is_running():
+            return
+        self._queue.put(_SHUTDOWN)
+        self._thread.join(timeout)
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def submit(self, operation: WriteOperation) -> Future:
+        """Queue a write operation; the future resolves to its return value."""
+        future = Future()
+        self._queue.put((operation, future))
+        return future
+
+    def _collect_batch(self, first) -> Tuple[List, bool]:
+        """Gather up to max_batch queued operations after `first`."""
+        batch = [first]
+        stopping = False
+        while len(batch) < self.max_batch:
+            try:
+                if self.max_wait > 0:
+                    item = self._queue.get(timeout=self.max_wait)
+                else:
+                    item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _SHUTDOWN:
+                stopping = True
+                break
+            batch.append(item)
+        return batch, stopping
+
+    def _apply_batch(self, conn: sqlite3.Connection, batch: List) -> None:
+        """Run a batch in one transaction and resolve its futures."""
+        outcomes = []
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            for operation, future in batch:
+                conn.execute('SAVEPOINT circulation_op')
+                try:
+                    result = operation(conn)
+                    conn.execute('RELEASE SAVEPOINT circulation_op')
+                    outcomes.append((future, result, None))
+                except Exception as e:
+                    conn.execute('ROLLBACK TO SAVEPOINT circulation_op')
+                    conn.execute('RELEASE SAVEPOINT circulation_op')
+                    outcomes.append((future, None, e))
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.operations += len(batch)
+        for future, result, error in outcomes:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def _run(self) -> None:
+        conn = get_db_connection()
+        try:
+            while True:
+                item = self._queue.get()
+                if item is _SHUTDOWN:
+                    break
+                batch, stopping = self._collect_batch(item)
+                self._apply_batch(conn, batch)
+                if stopping:
+                    break
+        finally:
+            conn.close()
+
+_circulation_writer: Optional[GroupCommitWriter] = None
+
+def start_circulation_writer(max_batch: int = 64, max_wait: float = 0.0) -> GroupCommitWriter:
+    """Route circulation writes through a group-commit writer thread."""
+    global _circulation_writer
+    if _circulation_writer is None or not _circulation_writer.is_running():
+        _circulation_writer = GroupCommitWriter(max_batch, max_wait)
+        _circulation_writer.start()
+    return _circulation_writer
+
+def stop_circulation_writer() -> None:
+    """Drain and stop the group-commit writer; writes go direct again."""
+    global _circulation_writer
+    if _circulation_writer is not None:
+        _circulation_writer.stop()
+        _circulation_writer = None
+
+def submit_write(operation: WriteOperation) -> Future:
+    """
+    Apply a write operation and return a future for its result.
+    Goes through the group-commit writer when one is running, otherwise
+    runs immediately in its own transaction.
+    """
+    writer = _circulation_writer
+    if writer is not None and writer.is_running():
+        return writer.submit(operation)
+
+    future = Future()
     conn = get_db_connection()
     try:
+        conn.execute('BEGIN IMMEDIATE')
+        result = operation(conn)
+        conn.commit()
+        future.set_result(result)
+    except Exception as e:
+        conn.rollback()
+        future.set_exception(e)
+    finally:
+        conn.close()
+    return future
+
+def _run_write(operation: WriteOperation) -> Any:
+    """Apply a write operation and wait for its result (raises on failure)."""
+    return submit_write(operation).result()
+
+def _fulfil_waiting_hold(conn, patron_id: str, book_id: int) -> None:
+    """A patron who takes a shelf copy no longer needs their place in the queue."""
+    conn.execute('''
+        UPDATE holds SET status = 'fulfilled' WHERE patron_id = ? AND book_id = ? AND status = 'waiting'
+    ''', (patron_id, book_id))
+
+def insert_borrow_record(patron_id: str, book_id: int, borrow_date: datetime, due_date: datetime) -> bool:
+    """
+    Insert a new borrow record into the database, fulfilling the patron's
+    waiting hold on the book (if any) in the same transaction.
+    """
+    def operation(conn):
         conn.execute('''
             INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date)
             VALUES (?, ?, ?, ?)
         ''', (patron_id, book_id, borrow_date.isoformat(), due_date.isoformat()))
-        conn.commit()
-        conn.close()
+        _fulfil_waiting_hold(conn, patron_id, book_id)
+    try:
+        _run_write(operation)
         return True
     except Exception as e:
-        conn.close()
         return False
 
 def update_book_availability(book_id: int, change: int) -> bool:
     """Update the available copies of a book by a given amount (+1 for return, -1 for borrow)."""
-    conn = get_db_connection()
-    try:
+    def operation(conn):
         conn.execute('''
             UPDATE books SET available_copies = available_copies + ? WHERE id = ?
         ''', (change, book_id))
-        conn.commit()
-        conn.close()
+    try:
+        _run_write(operation)
         return True
     except Exception as e:
-        conn.close()
         return False
 
 def update_borrow_record_return_date(patron_id: str, book_id: int, return_date: datetime) -> bool:
     """Update the return date for a borrow record."""
+    def operation(conn):
+        conn.execute('''
+            UPDATE borrow_records 
+            SET return_date = ? 
+            WHERE patron_id = ? AND book_id = ? AND return_date IS NULL
+        ''', (return_date.isoformat(), patron_id, book_id))
+    try:
+        _run_write(operation)
+        return True
+    except Exception as e:
+        return False
+
+def get_books_by_ids(book_ids: List[int]) -> Dict[int, Book]:
+    """Get several books in one query, keyed by book ID."""
+    if not book_ids:
+        return {}
     conn = get_db_connection()
+    placeholders = ', '.join('?' for _ in book_ids)
+    books = _select_books(conn, f'SELECT {BOOK_COLUMNS} FROM books WHERE id IN ({placeholders})',
+                          list(book_ids)).fetchall()
+    conn.close()
+    return {book.id: book for book in books}
+
+def insert_borrow_records_batch(patron_id: str, book_ids: List[int], borrow_date: datetime, due_date: datetime,
+                                ready_holds: Optional[Dict[int, int]] = None) -> Optional[List[int]]:
+    """
+    Borrow several books for one patron in a single transaction.
+    A book in `ready_holds` (book ID -> hold ID) is lent from the copy set
+    aside for that hold, which is marked fulfilled; otherwise a copy is only
+    taken if one is still available when the write lock is held, and the
+    patron's waiting hold on it is fulfilled.
+    
+    Returns:
+        list of book IDs that were borrowed, or None if the transaction failed
+    """
+    ready_holds = ready_holds or {}
+    def operation(conn):
+        borrowed = []
+        for book_id in book_ids:
+            taken = book_id in ready_holds and conn.execute('''
+                UPDATE holds SET status = 'fulfilled' WHERE id = ? AND status = 'ready'
+            ''', (ready_holds[book_id],)).rowcount
+            if not taken:
+                taken = conn.execute('''
+                    UPDATE books SET available_copies = available_copies - 1
+                    WHERE id = ? AND available_copies > 0
+                ''', (book_id,)).rowcount
+                if taken:
+                    _fulfil_waiting_hold(conn, patron_id, book_id)
+            if not taken:
+                continue
+            conn.execute('''
+                INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date)
+                VALUES (?, ?, ?, ?)
+            ''', (patron_id, book_id, borrow_date.isoformat(), due_date.isoformat()))
+            borrowed.append(book_id)
+        return borrowed
+    try:
+        return _run_write(operation)
+    except Exception as e:
+        return None
+
+def update_borrow_records_return_batch(patron_id: str, book_ids: List[int], return_date: datetime,
+                                       pickup_until: datetime) -> Optional[Dict]:
+    """
+    Return several books for one patron in a single transaction, handing
+    each copy to the next hold on its book (or the shelf) as
+    return_book_and_allocate does.
+    
+    Returns:
+        dict: {'returned': list of book IDs returned, 'holds': {book_id: allocated hold}},
+              or None if the transaction failed
+    """
+    def operation(conn):
+        returned = []
+        holds = {}
+        for book_id in book_ids:
+            closed = conn.execute('''
+                UPDATE borrow_records 
+                SET return_date = ? 
+                WHERE patron_id = ? AND book_id = ? AND return_date IS NULL
+            ''', (return_date.isoformat(), patron_id, book_id)).rowcount
+            if not closed:
+                continue
+            hold = _allocate_copy(conn, book_id, return_date, pickup_until)
+            if hold:
+                holds[book_id] = hold
+            returned.append(book_id)
+        return {'returned': returned, 'holds': holds}
+    try:
+        return _run_write(operation)
+    except Exception as e:
+        return None
+
+# Hold queue operations
+# Hold status moves waiting -> ready (copy set aside) -> fulfilled, or to
+# cancelled/expired. A ready hold owns a copy that is not counted in
+# available_copies.
+
+def insert_hold(patron_id: str, book_id: int, priority: int, created_at: datetime,
+                expires_at: Optional[datetime]) -> Optional[Union[int, str]]:
+    """
+    Insert a waiting hold. In the same transaction, check that the book has
+    no copy on the shelf and that the patron neither has it on loan nor
+    already holds it.
+    
+    Returns:
+        the new hold's ID; 'available', 'borrowed' or 'held' if the hold
+        was refused; or None if the transaction failed
+    """
+    def operation(conn):
+        book = conn.execute('SELECT available_copies FROM books WHERE id = ?', (book_id,)).fetchone()
+        if book and book['available_copies'] > 0:
+            return 'available'
+        if conn.execute('''
+            SELECT 1 FROM borrow_records WHERE patron_id = ? AND book_id = ? AND return_date IS NULL
+        ''', (patron_id, book_id)).fetchone():
+            return 'borrowed'
+        try:
+            return conn.execute('''
+                INSERT INTO holds (patron_id, book_id, priority, status, created_at, expires_at)
+                VALUES (?, ?, ?, 'waiting', ?, ?)
+            ''', (patron_id, book_id, priority, created_at.isoformat(),
+                  expires_at.isoformat() if expires_at else None)).lastrowid
+        except sqlite3.IntegrityError:
+            # idx_holds_active_patron: the patron already has an active hold
+            return 'held'
     try:
+        return _run_write(operation)
+    except Exception as e:
+        return None
+
+def get_active_hold(patron_id: str, book_id: int) -> Optional[Dict]:
+    """Get a patron's waiting or ready hold on a book."""
+    conn = get_db_connection()
+    hold = conn.execute('''
+        SELECT * FROM holds
+        WHERE patron_id = ? AND book_id = ? AND status IN ('waiting', 'ready')
+        ORDER BY id LIMIT 1
+    ''', (patron_id, book_id)).fetchone()
+    conn.close()
+    return dict(hold) if hold else None
+
+def get_hold_queue_position(hold: Dict) -> int:
+    """Get the 1-based position of a waiting hold in its book's queue."""
+    conn = get_db_connection()
+    ahead = conn.execute('''
+        SELECT COUNT(*) AS count FROM holds
+        WHERE book_id = ? AND status = 'waiting'
+          AND (priority > ? OR (priority = ? AND id < ?))
+    ''', (hold['book_id'], hold['priority'], hold['priority'], hold['id'])).fetchone()['count']
+    conn.close()
+    return ahead + 1
+
+def _allocate_copy(conn, book_id: int, ready_at: datetime, pickup_until: datetime) -> Optional[Dict]:
+    """Give a freed copy to the next waiting hold, or put it back on the shelf."""
+    hold = conn.execute('''
+        SELECT * FROM holds
+        WHERE book_id = ? AND status = 'waiting'
+        ORDER BY priority DESC, id
+        LIMIT 1
+    ''', (book_id,)).fetchone()
+    if hold is None:
         conn.execute('''
+            UPDATE books SET available_copies = available_copies + 1 WHERE id = ?
+        ''', (book_id,))
+        return None
+    conn.execute('''
+        UPDATE holds SET status = 'ready', ready_at = ?, expires_at = ? WHERE id = ?
+    ''', (ready_at.isoformat(), pickup_until.isoformat(), hold['id']))
+    return dict(hold)
+
+def return_book_and_allocate(patron_id: str, book_id: int, return_date: datetime, pickup_until: datetime) -> Optional[Dict]:
+    """
+    Record a return and hand the copy to the next hold in one transaction.
+    
+    Returns:
+        dict: {'returned': bool, 'hold': allocated hold dict or None},
+              or None if the transaction failed
+    """
+    def operation(conn):
+        closed = conn.execute('''
             UPDATE borrow_records 
             SET return_date = ? 
             WHERE patron_id = ? AND book_id = ? AND return_date IS NULL
-        ''', (return_date.isoformat(), patron_id, book_id))
-        conn.commit()
-        conn.close()
+        ''', (return_date.isoformat(), patron_id, book_id)).rowcount
+        hold = None
+        if closed:
+            hold = _allocate_copy(conn, book_id, return_date, pickup_until)
+        return {'returned': bool(closed), 'hold': hold}
+    try:
+        return _run_write(operation)
+    except Exception as e:
+        return None
+
+def insert_borrow_record_for_hold(hold_id: int, patron_id: str, book_id: int, borrow_date: datetime, due_date: datetime) -> bool:
+    """Lend the copy set aside for a ready hold and mark the hold fulfilled."""
+    def operation(conn):
+        fulfilled = conn.execute('''
+            UPDATE holds SET status = 'fulfilled' WHERE id = ? AND status = 'ready'
+        ''', (hold_id,)).rowcount
+        if not fulfilled:
+            return False
+        conn.execute('''
+            INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date)
+            VALUES (?, ?, ?, ?)
+        ''', (patron_id, book_id, borrow_date.isoformat(), due_date.isoformat()))
+        return True
+    try:
+        return _run_write(operation)
+    except Exception as e:
+        return False
+
+def cancel_hold_and_release(hold_id: int, now: datetime, pickup_until: datetime) -> bool:
+    """Cancel a hold; a copy it was holding moves on to the next hold or the shelf."""
+    def operation(conn):
+        hold = conn.execute('''
+            SELECT * FROM holds WHERE id = ? AND status IN ('waiting', 'ready')
+        ''', (hold_id,)).fetchone()
+        if hold is None:
+            return False
+        conn.execute("UPDATE holds SET status = 'cancelled' WHERE id = ?", (hold_id,))
+        if hold['status'] == 'ready':
+            _allocate_copy(conn, hold['book_id'], now, pickup_until)
         return True
+    try:
+        return _run_write(operation)
+    except Exception as e:
+        return False
+
+def expire_holds(now: datetime, pickup_until: datetime) -> Optional[Dict]:
+    """
+    Expire holds past their expires_at in one transaction.
+    Copies held by expired ready holds are passed down the queue.
+    
+    Returns:
+        dict: {'expired_waiting': int, 'expired_ready': int, 'reallocated': int},
+              or None if the transaction failed
+    """
+    def operation(conn):
+        expired_waiting = conn.execute('''
+            UPDATE holds SET status = 'expired'
+            WHERE status = 'waiting' AND expires_at IS NOT NULL AND expires_at < ?
+        ''', (now.isoformat(),)).rowcount
+        lapsed = conn.execute('''
+            SELECT id, book_id FROM holds
+            WHERE status = 'ready' AND expires_at < ?
+        ''', (now.isoformat(),)).fetchall()
+        reallocated = 0
+        for hold in lapsed:
+            conn.execute("UPDATE holds SET status = 'expired' WHERE id = ?", (hold['id'],))
+            if _allocate_copy(conn, hold['book_id'], now, pickup_until):
+                reallocated += 1
+        return {'expired_waiting': expired_waiting, 'expired_ready': len(lapsed), 'reallocated': reallocated}
+    try:
+        return _run_write(operation)
     except Exception as e:
+        return None
+
+# Late-fee ledger operations
+# Amounts are signed: accruals and refunds add to what a patron owes,
+# payments subtract. patron_balances is maintained by a trigger.
+
+def get_job_state(name: str, conn: Optional[sqlite3.Connection] = None) -> Optional[str]:
+    """Get a value saved by a previous job run."""
+    with _reading(conn) as conn:
+        row = conn.execute('SELECT value FROM job_state WHERE name = ?', (name,)).fetchone()
+    return row['value'] if row else None
+
+def _set_job_state(conn, name: str, value: str) -> None:
+    conn.execute('''
+        INSERT INTO job_state (name, value) VALUES (?, ?)
+        ON CONFLICT (name) DO UPDATE SET value = excluded.value
+    ''', (name, value))
+
+def claim_job_run(name: str, now: datetime, not_since: datetime) -> bool:
+    """
+    Record a run of job `name` at `now` unless one was recorded after
+    `not_since`. Returns True if this caller should run the job.
+    """
+    def operation(conn):
+        row = conn.execute('SELECT value FROM job_state WHERE name = ?', (name,)).fetchone()
+        if row and row['value'] > not_since.isoformat():
+            return False
+        _set_job_state(conn, name, now.isoformat())
+        return True
+    try:
+        return _run_write(operation)
+    except Exception as e:
+        return False
+
+def insert_fee_entry(patron_id: str, entry_type: str, amount: float, created_at: datetime,
+                     borrow_record_id: Optional[int] = None, book_id: Optional[int] = None,
+                     transaction_id: Optional[str] = None) -> bool:
+    """Append an entry to the fee ledger."""
+    def operation(conn):
+        conn.execute('''
+            INSERT INTO fee_ledger (patron_id, borrow_record_id, book_id, entry_type, amount, transaction_id, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (patron_id, borrow_record_id, book_id, entry_type, round(amount, 2), transaction_id,
+              created_at.isoformat()))
+    try:
+        _run_write(operation)
+        return True
+    except Exception as e:
+        return False
+
+def get_patron_balance(patron_id: str, conn: Optional[sqlite3.Connection] = None) -> float:
+    """Get a patron's ledger balance (one primary-key read)."""
+    with _reading(conn) as conn:
+        row = conn.execute('SELECT balance FROM patron_balances WHERE patron_id = ?', (patron_id,)).fetchone()
+    return row['balance'] if row else 0.0
+
+def get_loan_amount_paid(borrow_record_id: int, conn: Optional[sqlite3.Connection] = None) -> float:
+    """Get the net amount paid (payments less refunds) against one loan."""
+    with _reading(conn) as conn:
+        paid = conn.execute('''
+            SELECT COALESCE(-SUM(amount), 0) AS paid FROM fee_ledger
+            WHERE borrow_record_id = ? AND entry_type IN ('payment', 'refund')
+        ''', (borrow_record_id,)).fetchone()['paid']
+    return round(paid, 2)
+
+def get_open_loans_with_paid(patron_ids: List[str]) -> List[Tuple[int, str, int, str, float]]:
+    """
+    Get the open loans of several patrons with the net amount paid on each,
+    in one query. Rows are (borrow_record_id, patron_id, book_id, due_date, paid).
+    """
+    if not patron_ids:
+        return []
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    rows = cursor.execute('''
+        SELECT br.id, br.patron_id, br.book_id, br.due_date,
+               COALESCE((SELECT -SUM(fl.amount) FROM fee_ledger fl
+                         WHERE fl.borrow_record_id = br.id AND fl.entry_type IN ('payment', 'refund')), 0)
+        FROM borrow_records br
+        WHERE br.patron_id IN (SELECT value FROM json_each(?)) AND br.return_date IS NULL
+        ORDER BY br.patron_id, br.borrow_date
+    ''', (json.dumps(list(patron_ids)),)).fetchall()
+    conn.close()
+    return rows
+
+def get_fee_entry_by_transaction(transaction_id: str) -> Optional[Dict]:
+    """Get the payment entry recorded for a gateway transaction."""
+    conn = get_db_connection()
+    entry = conn.execute('''
+        SELECT * FROM fee_ledger WHERE transaction_id = ? AND entry_type = 'payment'
+    ''', (transaction_id,)).fetchone()
+    conn.close()
+    return dict(entry) if entry else None
+
+def get_fee_accrual_candidates(as_of: datetime, returned_since: str) -> List[Dict]:
+    """
+    Get the loans whose accrued fee may have grown: newly overdue open loans,
+    loans with an unsettled accrual, and late loans returned since the last run.
+    """
+    conn = get_db_connection()
+    rows = conn.execute('''
+        SELECT br.id, br.patron_id, br.book_id, br.due_date, br.return_date,
+               COALESCE(a.accrued_amount, 0) AS accrued_amount
+        FROM borrow_records br
+        LEFT JOIN loan_fee_accruals a ON a.borrow_record_id = br.id
+        WHERE br.id IN (
+            SELECT id FROM borrow_records
+            WHERE return_date IS NULL AND due_date < ?
+              AND id NOT IN (SELECT borrow_record_id FROM loan_fee_accruals)
+            UNION
+            SELECT borrow_record_id FROM loan_fee_accruals WHERE settled = 0
+            UNION
+            SELECT id FROM borrow_records WHERE return_date >= ? AND return_date > due_date
+        )
+        ORDER BY br.id
+    ''', (as_of.isoformat(), returned_since)).fetchall()
+    conn.close()
+    return [dict(row) for row in rows]
+
+def apply_fee_accruals(accruals: List[Dict], as_of: datetime, state_name: str) -> bool:
+    """
+    Write accrual ledger entries and accrual progress in one transaction,
+    then remember `as_of` as the job's last run.
+    
+    Args:
+        accruals: dicts with borrow_record_id, patron_id, book_id, delta,
+                  accrued_amount and settled
+    """
+    def operation(conn):
+        for accrual in accruals:
+            if accrual['delta'] > 0:
+                conn.execute('''
+                    INSERT INTO fee_ledger (patron_id, borrow_record_id, book_id, entry_type, amount, created_at)
+                    VALUES (?, ?, ?, 'accrual', ?, ?)
+                ''', (accrual['patron_id'], accrual['borrow_record_id'], accrual['book_id'],
+                      round(accrual['delta'], 2), as_of.isoformat()))
+            conn.execute('''
+                INSERT INTO loan_fee_accruals (borrow_record_id, patron_id, accrued_amount, accrued_through, settled)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (borrow_record_id) DO UPDATE
+                SET accrued_amount = excluded.accrued_amount,
+                    accrued_through = excluded.accrued_through,
+                    settled = excluded.settled
+            ''', (accrual['borrow_record_id'], accrual['patron_id'], accrual['accrued_amount'],
+                  as_of.isoformat(), int(accrual['settled'])))
+        _set_job_state(conn, state_name, as_of.isoformat())
+    try:
+        _run_write(operation)
+        return True
+    except Exception as e:
+        return False
+
+# Circulation rollup reads (the stats API never queries borrow_records)
+
+def get_top_borrowed_books(limit: int, conn: Optional[sqlite3.Connection] = None) -> List[Dict]:
+    """Get the most borrowed books with their lifetime circulation counts."""
+    with _reading(conn) as conn:
+        rows = conn.execute('''
+            SELECT bc.book_id, b.title, b.author, bc.checkouts, bc.returns, bc.late_returns, bc.open_loans
+            FROM book_circulation bc
+            JOIN books b ON b.id = bc.book_id
+            ORDER BY bc.checkouts DESC, bc.book_id
+            LIMIT ?
+        ''', (limit,)).fetchall()
+    return [dict(row) for row in rows]
+
+def get_daily_circulation(start_day: str, end_day: str,
+                          conn: Optional[sqlite3.Connection] = None) -> List[Dict]:
+    """Get checkouts and returns per day for days in [start_day, end_day]."""
+    with _reading(conn) as conn:
+        rows = conn.execute('''
+            SELECT day, checkouts, returns, late_returns FROM circulation_daily
+            WHERE day BETWEEN ? AND ?
+            ORDER BY day
+        ''', (start_day, end_day)).fetchall()
+    return [dict(row) for row in rows]
+
+def get_patron_circulation(patron_id: str, conn: Optional[sqlite3.Connection] = None) -> Optional[Dict]:
+    """Get a patron's lifetime circulation counts."""
+    with _reading(conn) as conn:
+        row = conn.execute('''
+            SELECT patron_id, checkouts, returns, late_returns, open_loans
+            FROM patron_circulation WHERE patron_id = ?
+        ''', (patron_id,)).fetchone()
+    return dict(row) if row else None
+
+def get_circulation_totals(today: str, conn: Optional[sqlite3.Connection] = None) -> Dict:
+    """Get library-wide totals: copies, open and overdue loans, returns."""
+    with _reading(conn) as conn:
+        copies = conn.execute('''
+            SELECT COALESCE(SUM(total_copies), 0) AS total_copies,
+                   COALESCE(SUM(available_copies), 0) AS available_copies
+            FROM books
+        ''').fetchone()
+        loans = conn.execute('''
+            SELECT COALESCE(SUM(open_loans), 0) AS open_loans,
+                   COALESCE(SUM(CASE WHEN day < ? THEN open_loans ELSE 0 END), 0) AS overdue_loans
+            FROM open_loans_by_due_day
+        ''', (today,)).fetchone()
+        returns = conn.execute('''
+            SELECT COALESCE(SUM(returns), 0) AS returns, COALESCE(SUM(late_returns), 0) AS late_returns
+            FROM circulation_daily
+        ''').fetchone()
+    return {**dict(copies), **dict(loans), **dict(returns)}
+
+def iter_recorded_payments(since: str, until: str, after: Tuple[str, int] = ('', 0),
+                           chunk_size: int = 500) -> Iterator[Dict]:
+    """
+    Stream recorded gateway payments made in [since, until), oldest first,
+    with the amount refunded against each transaction so far.
+    
+    Args:
+        after: (created_at, id) of the last payment already processed
+        chunk_size: payments read per keyset query
+    """
+    last_created, last_id = max(after, (since, 0))
+    while True:
+        conn = get_db_connection()
+        rows = conn.execute('''
+            SELECT p.id, p.patron_id, p.book_id, p.transaction_id, -p.amount AS amount, p.created_at,
+                   COALESCE((SELECT SUM(r.amount) FROM fee_ledger r
+                             WHERE r.transaction_id = p.transaction_id AND r.entry_type = 'refund'), 0) AS refunded
+            FROM fee_ledger p
+            WHERE p.entry_type = 'payment' AND p.transaction_id IS NOT NULL
+              AND (p.created_at, p.id) > (?, ?) AND p.created_at < ?
+            ORDER BY p.created_at, p.id
+            LIMIT ?
+        ''', (last_created, last_id, until, chunk_size)).fetchall()
         conn.close()
+        for row in rows:
+            yield dict(row)
+        if len(rows) < chunk_size:
+            return
+        last_created, last_id = rows[-1]['created_at'], rows[-1]['id']
+
+# Idempotency keys for payments and refunds. A key is claimed (in_flight)
+# before the gateway is called and completed with the stored outcome.
+
+def claim_idempotency_key(action: str, key: str, request_hash: str, now: datetime,
+                          stale_before: datetime) -> Optional[Dict]:
+    """
+    Claim a key for a new request.
+    
+    An in-flight claim older than `stale_before` (its request died) is
+    taken over.
+    
+    Returns:
+        None if the caller now owns the key, otherwise the existing row
+        (action, idempotency_key, request_hash, status, response)
+    """
+    def operation(conn):
+        claimed = conn.execute('''
+            INSERT INTO idempotency_keys (action, idempotency_key, request_hash, status, created_at)
+            VALUES (?, ?, ?, 'in_flight', ?)
+            ON CONFLICT (action, idempotency_key) DO UPDATE
+            SET request_hash = excluded.request_hash, created_at = excluded.created_at
+            WHERE status = 'in_flight' AND created_at < ?
+        ''', (action, key, request_hash, now.isoformat(), stale_before.isoformat())).rowcount
+        if claimed:
+            return None
+        row = conn.execute('''
+            SELECT action, idempotency_key, request_hash, status, response FROM idempotency_keys
+            WHERE action = ? AND idempotency_key = ?
+        ''', (action, key)).fetchone()
+        return dict(row)
+    return _run_write(operation)
+
+def complete_idempotency_key(action: str, key: str, response: str, now: datetime) -> bool:
+    """Store the outcome of a claimed key."""
+    def operation(conn):
+        conn.execute('''
+            UPDATE idempotency_keys SET status = 'completed', response = ?, completed_at = ?
+            WHERE action = ? AND idempotency_key = ?
+        ''', (response, now.isoformat(), action, key))
+    try:
+        _run_write(operation)
+        return True
+    except Exception as e:
         return False
+
+def release_idempotency_key(action: str, key: str) -> bool:
+    """Drop an in-flight claim so the request can be retried."""
+    def operation(conn):
+        conn.execute('''
+            DELETE FROM idempotency_keys
+            WHERE action = ? AND idempotency_key = ? AND status = 'in_flight'
+        ''', (action, key))
+    try:
+        _run_write(operation)
+        return True
+    except Exception as e:
+        return False
+
+# Catalog change feed
+
+def get_catalog_changes(since: int, limit: int) -> List[Dict]:
+    """
+    Get up to `limit` catalog changes after sequence number `since`, each
+    with the book's current row (None once the book is deleted).
+    """
+    conn = get_db_connection()
+    rows = conn.execute('''
+        SELECT c.seq, c.book_id, c.change_type, b.title, b.author, b.isbn, b.total_copies, b.available_copies
+        FROM catalog_changes c
+        LEFT JOIN books b ON b.id = c.book_id
+        WHERE c.seq > ?
+        ORDER BY c.seq
+        LIMIT ?
+    ''', (since, limit)).fetchall()
+    conn.close()
+    return [{
+        'seq': row['seq'],
+        'book_id': row['book_id'],
+        'change_type': row['change_type'],
+        'book': Book(row['book_id'], row['title'], row['author'], row['isbn'],
+                     row['total_copies'], row['available_copies']) if row['title'] is not None else None
+    } for row in rows]
+
+def get_latest_catalog_change(conn: Optional[sqlite3.Connection] = None) -> int:
+    """Get the sequence number of the newest catalog change (0 if none)."""
+    with _reading(conn) as conn:
+        # AUTOINCREMENT keeps the high-water mark even after the log is pruned
+        row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'catalog_changes'").fetchone()
+    return row[0] if row else 0
+
+def get_catalog_with_latest_change() -> Tuple[int, List[Book]]:
+    """
+    Get every book together with the newest catalog change sequence number,
+    read in one transaction so the books reflect exactly that change.
+    """
+    conn = get_db_connection()
+    try:
+        conn.execute('BEGIN')
+        latest = get_latest_catalog_change(conn)
+        books = get_all_books(conn)
+        conn.commit()
+    finally:
+        conn.close()
+    return latest, books
+
+def prune_catalog_changes(before: datetime, state_name: str) -> Optional[int]:
+    """
+    Delete catalog changes recorded before `before` and remember the last
+    pruned sequence number under `state_name`.
+    
+    Returns:
+        number of changes deleted, or None if the transaction failed
+    """
+    def operation(conn):
+        last = conn.execute('''
+            SELECT MAX(seq) FROM catalog_changes WHERE changed_at < ?
+        ''', (before.isoformat(),)).fetchone()[0]
+        if last is None:
+            return 0
+        deleted = conn.execute('DELETE FROM catalog_changes WHERE seq <= ?', (last,)).rowcount
+        _set_job_state(conn, state_name, str(last))
+        return deleted
+    try:
+        return _run_write(operation)
+    except Exception as e:
+        return None
+
+# Availability reconciliation
+# A book's shelf count should equal total_copies less its open loans and
+# the copies set aside for ready holds (never below zero).
+
+def get_books_with_activity(since: datetime, until: datetime) -> List[int]:
+    """Get books lent, returned or edited in (since, until]."""
+    conn = get_db_connection()
+    rows = conn.execute('''
+        SELECT book_id FROM borrow_records WHERE borrow_date > :since AND borrow_date <= :until
+        UNION
+        SELECT book_id FROM borrow_records WHERE return_date > :since AND return_date <= :until
+        UNION
+        SELECT book_id FROM catalog_changes WHERE changed_at > :since AND changed_at <= :until
+        ORDER BY book_id
+    ''', {'since': since.isoformat(), 'until': until.isoformat()}).fetchall()
+    conn.close()
+    return [row['book_id'] for row in rows]
+
+def get_availability_drift(book_ids: Optional[List[int]], settled_before: datetime,
+                           conn: Optional[sqlite3.Connection] = None) -> List[Dict]:
+    """
+    Compare available_copies with the open loans and ready holds of every
+    book (or only `book_ids`) in one pass, returning the books that differ.
+    Books with loans started or returned after `settled_before` are left
+    out, since their availability update may still be on its way.
+    """
+    scope = '{} IN (SELECT value FROM json_each(:book_ids))' if book_ids is not None else '{} IS NOT NULL'
+    with _reading(conn) as conn:
+        rows = conn.execute(f'''
+            WITH open_loans AS (
+                SELECT book_id, COUNT(*) AS open_loans FROM borrow_records
+                WHERE return_date IS NULL AND {scope.format('book_id')}
+                GROUP BY book_id
+            ), ready_holds AS (
+                SELECT book_id, COUNT(*) AS ready_holds FROM holds
+                WHERE status = 'ready' AND {scope.format('book_id')}
+                GROUP BY book_id
+            ), unsettled AS (
+                SELECT book_id FROM borrow_records WHERE borrow_date > :settled_before
+                UNION
+                SELECT book_id FROM borrow_records WHERE return_date > :settled_before
+            ), counts AS (
+                SELECT b.id AS book_id, b.title, b.total_copies, b.available_copies,
+                       COALESCE(l.open_loans, 0) AS open_loans, COALESCE(h.ready_holds, 0) AS ready_holds
+                FROM books b
+                LEFT JOIN open_loans l ON l.book_id = b.id
+                LEFT JOIN ready_holds h ON h.book_id = b.id
+                WHERE {scope.format('b.id')} AND b.id NOT IN (SELECT book_id FROM unsettled)
+            )
+            SELECT *, MAX(total_copies - open_loans - ready_holds, 0) AS expected_copies
+            FROM counts
+            WHERE available_copies != MAX(total_copies - open_loans - ready_holds, 0)
+            ORDER BY book_id
+        ''', {'book_ids': json.dumps(list(book_ids or [])), 'settled_before': settled_before.isoformat()}).fetchall()
+    return [dict(row) for row in rows]
+
+def repair_book_availability(repairs: List[Dict], state_name: Optional[str] = None,
+                             checked_through: Optional[datetime] = None) -> Optional[int]:
+    """
+    Set available_copies to expected_copies for each drift row in one
+    transaction. A book whose count changed since it was checked is left
+    for the next run. If `state_name` is given, `checked_through` is
+    remembered under it in the same transaction.
+    
+    Returns:
+        number of books repaired, or None if the transaction failed
+    """
+    def operation(conn):
+        repaired = 0
+        for repair in repairs:
+            repaired += conn.execute('''
+                UPDATE books SET available_copies = ? WHERE id = ? AND available_copies = ?
+            ''', (repair['expected_copies'], repair['book_id'], repair['available_copies'])).rowcount
+        if state_name is not None:
+            _set_job_state(conn, state_name, checked_through.isoformat())
+        return repaired
+    try:
+        return _run_write(operation)
+    except Exception as e:
+        return None
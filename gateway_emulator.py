@@ -0,0 +1,270 @@
+"""
+Payment gateway emulator for Library Management System
+A local HTTP stand-in for the payment gateway (charges, refunds, status)
+with injectable latency, errors, hung requests, lost replies and rate
+limiting, so the HTTP mode of PaymentGateway can be exercised with no
+outside service.
+Charges and refunds sent with an Idempotency-Key are carried out once.
+
+Usage:
+    python gateway_emulator.py --port 8099 --latency lognormal:0.08,0.5 \
+        --error-rate 0.02 --timeout-rate 0.01 --rate-limit 50
+    PAYMENT_GATEWAY_URL=http://127.0.0.1:8099 flask --app app run
+"""
+
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional, Tuple
+
+from services.rate_limit import TokenBucket
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """
+    Build a latency sampler (seconds) from a spec:
+    fixed:S | uniform:LOW,HIGH | normal:MEAN,SD | lognormal:MEDIAN,SIGMA | exp:MEAN
+    """
+    kind, _, args = spec.partition(':')
+    try:
+        values = [float(value) for value in args.split(',')] if args else []
+    except ValueError:
+        raise ValueError(f'invalid latency spec {spec!r}')
+    samplers = {
+        ('fixed', 1): lambda rng: values[0],
+        ('uniform', 2): lambda rng: rng.uniform(values[0], values[1]),
+        ('normal', 2): lambda rng: rng.gauss(values[0], values[1]),
+        ('lognormal', 2): lambda rng: rng.lognormvariate(math.log(values[0]), values[1]),
+        ('exp', 1): lambda rng: rng.expovariate(1 / values[0]),
+    }
+    sampler = samplers.get((kind, len(values)))
+    if sampler is None:
+        raise ValueError(f'invalid latency spec {spec!r}')
+    return lambda rng: max(0.0, sampler(rng))
+
+
+@dataclass
+class EmulatorConfig:
+    latency: str = 'fixed:0'
+    error_rate: float = 0.0       # share of requests answered 503
+    timeout_rate: float = 0.0     # share of requests that hang for hang_seconds
+    lost_reply_rate: float = 0.0  # share of POSTs carried out, then hung and answered 504
+    hang_seconds: float = 30.0
+    rate_limit: float = 0.0       # requests per second, 0 for unlimited
+    burst: float = 0.0            # defaults to one second of rate_limit
+    seed: Optional[int] = None
+
+
+class GatewayEmulator:
+    """In-memory gateway served over HTTP on a background thread."""
+
+    def __init__(self, config: Optional[EmulatorConfig] = None):
+        self.config = config or EmulatorConfig()
+        self._latency = parse_latency(self.config.latency)
+        self._random = random.Random(self.config.seed)
+        self._limiter = None
+        if self.config.rate_limit > 0:
+            self._limiter = TokenBucket(self.config.rate_limit, self.config.burst or self.config.rate_limit)
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self.transactions: Dict[str, Dict] = {}
+        # Replies to keyed POSTs by (path, Idempotency-Key); one keyed request runs at a time
+        self._idempotent: Dict[Tuple[str, str], Tuple[Dict, Tuple[int, Dict]]] = {}
+        self._idempotency_lock = threading.Lock()
+        self.requests = 0
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self, host: str = '127.0.0.1', port: int = 0) -> str:
+        """Start serving (port 0 picks a free port); returns the base URL."""
+        emulator = self
+
+        class Handler(_GatewayHandler):
+            gateway = emulator
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, kwargs={'poll_interval': 0.05},
+                         name='gateway-emulator', daemon=True).start()
+        return self.base_url
+
+    def stop(self) -> None:
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    # Request handling: returns (status, body)
+
+    def _fault(self) -> Optional[Tuple[int, Dict]]:
+        """Apply rate limiting, latency and injected failures to one request."""
+        with self._lock:
+            self.requests += 1
+            roll = self._random.random()
+            delay = self._latency(self._random)
+        if self._limiter and not self._limiter.try_acquire():
+            return 429, {'error': 'rate_limited', 'message': 'Too many requests'}
+        if roll < self.config.timeout_rate:
+            time.sleep(self.config.hang_seconds)
+            return 504, {'error': 'timeout', 'message': 'Gateway timed out'}
+        time.sleep(delay)
+        if roll < self.config.timeout_rate + self.config.error_rate:
+            return 503, {'error': 'unavailable', 'message': 'Service temporarily unavailable'}
+        return None
+
+    def _lose_reply(self) -> bool:
+        """After a POST was carried out, decide whether its reply is lost (hang, then 504)."""
+        if self.config.lost_reply_rate <= 0:
+            return False
+        with self._lock:
+            lost = self._random.random() < self.config.lost_reply_rate
+        if lost:
+            time.sleep(self.config.hang_seconds)
+        return lost
+
+    def post(self, path: str, body: Dict, idempotency_key: Optional[str] = None) -> Tuple[int, Dict]:
+        """Run a charge or refund once per idempotency key, replaying the first reply for a retry."""
+        handlers = {'/charges': self.charge, '/refunds': self.refund}
+        if path not in handlers:
+            return 404, {'error': 'not_found', 'message': 'Unknown endpoint'}
+        if not idempotency_key:
+            return handlers[path](body)
+        with self._idempotency_lock:
+            previous = self._idempotent.get((path, idempotency_key))
+            if previous is not None:
+                if previous[0] != body:
+                    return 400, {'error': 'idempotency_key_reused',
+                                 'message': 'Idempotency key was used for a different request'}
+                return previous[1]
+            reply = handlers[path](body)
+            self._idempotent[(path, idempotency_key)] = (body, reply)
+            return reply
+
+    def charge(self, body: Dict) -> Tuple[int, Dict]:
+        amount = body.get('amount')
+        customer_id = str(body.get('customer_id', ''))
+        if not isinstance(amount, (int, float)) or amount <= 0:
+            return 400, {'error': 'invalid_amount', 'message': 'Invalid amount: must be greater than 0'}
+        if amount > 1000:
+            return 402, {'error': 'declined', 'message': 'Payment declined: amount exceeds limit'}
+        if len(customer_id) != 6:
+            return 400, {'error': 'invalid_customer', 'message': 'Invalid patron ID format'}
+        with self._lock:
+            self._next_id += 1
+            transaction_id = f'txn_{customer_id}_{int(time.time())}_{self._next_id}'
+            self.transactions[transaction_id] = {
+                'transaction_id': transaction_id, 'status': 'completed', 'amount': round(amount, 2),
+                'refunded': 0.0, 'customer_id': customer_id, 'description': body.get('description', ''),
+                'timestamp': time.time()
+            }
+        return 200, {'id': transaction_id, 'status': 'completed', 'amount': round(amount, 2)}
+
+    def refund(self, body: Dict) -> Tuple[int, Dict]:
+        transaction_id = body.get('transaction_id')
+        amount = body.get('amount')
+        if not isinstance(amount, (int, float)) or amount <= 0:
+            return 400, {'error': 'invalid_amount', 'message': 'Invalid refund amount'}
+        with self._lock:
+            charge = self.transactions.get(transaction_id)
+            if charge is None:
+                return 404, {'error': 'not_found', 'message': 'Transaction not found'}
+            if round(charge['refunded'] + amount, 2) > charge['amount']:
+                return 400, {'error': 'invalid_amount', 'message': 'Refund exceeds the amount charged'}
+            charge['refunded'] = round(charge['refunded'] + amount, 2)
+            charge['status'] = 'refunded' if charge['refunded'] == charge['amount'] else 'partially_refunded'
+            self._next_id += 1
+            refund_id = f'refund_{transaction_id}_{self._next_id}'
+        return 200, {'id': refund_id, 'transaction_id': transaction_id, 'amount': round(amount, 2)}
+
+    def status(self, transaction_id: str) -> Tuple[int, Dict]:
+        with self._lock:
+            charge = self.transactions.get(transaction_id)
+            if charge is None:
+                return 404, {'status': 'not_found', 'message': 'Transaction not found'}
+            return 200, {key: charge[key] for key in ('transaction_id', 'status', 'amount', 'refunded', 'timestamp')}
+
+
+class _GatewayHandler(BaseHTTPRequestHandler):
+    gateway: GatewayEmulator = None
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: Dict) -> None:
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        if status == 429:
+            self.send_header('Retry-After', '1')
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _read_json(self) -> Optional[Dict]:
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            return None
+        return body if isinstance(body, dict) else None
+
+    def do_POST(self):
+        body = self._read_json()
+        fault = self.gateway._fault()
+        if fault:
+            return self._send(*fault)
+        if body is None:
+            return self._send(400, {'error': 'invalid_json', 'message': 'Body must be a JSON object'})
+        reply = self.gateway.post(self.path, body, self.headers.get('Idempotency-Key'))
+        if self.gateway._lose_reply():
+            return self._send(504, {'error': 'timeout', 'message': 'Gateway timed out'})
+        self._send(*reply)
+
+    def do_GET(self):
+        match = re.fullmatch(r'/charges/([^/]+)', self.path)
+        fault = self.gateway._fault()
+        if fault:
+            return self._send(*fault)
+        if not match:
+            return self._send(404, {'error': 'not_found', 'message': 'Unknown endpoint'})
+        self._send(*self.gateway.status(match.group(1)))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Run the local payment gateway emulator.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--latency', default='fixed:0', help='fixed:S, uniform:LO,HI, normal:MEAN,SD, '
+                                                             'lognormal:MEDIAN,SIGMA or exp:MEAN')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--timeout-rate', type=float, default=0.0)
+    parser.add_argument('--lost-reply-rate', type=float, default=0.0,
+                        help='share of charges and refunds carried out whose reply is lost')
+    parser.add_argument('--hang-seconds', type=float, default=30.0)
+    parser.add_argument('--rate-limit', type=float, default=0.0, help='requests per second (0: unlimited)')
+    parser.add_argument('--burst', type=float, default=0.0)
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+
+    emulator = GatewayEmulator(EmulatorConfig(args.latency, args.error_rate, args.timeout_rate, args.lost_reply_rate,
+                                              args.hang_seconds, args.rate_limit, args.burst, args.seed))
+    print(f'Payment gateway emulator listening on {emulator.start(args.host, args.port)}')
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        emulator.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Record types for Library Management System
+Compact, slotted rows returned by the data layer in place of per-row dicts
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Iterator, Tuple
+
+# Column order Book is built from; select books with this list, not *
+BOOK_COLUMNS = 'id, title, author, isbn, total_copies, available_copies'
+
+
+class _Record:
+    """
+    Read-only mapping access for slotted records, so code and templates
+    written against row dicts (record['title'], record.get('title'),
+    dict(record), jsonify) keep working unchanged.
+    """
+
+    __slots__ = ()
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.__slots__
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.__slots__)
+
+    def __len__(self) -> int:
+        return len(self.__slots__)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key) if key in self.__slots__ else default
+
+    def keys(self) -> Tuple[str, ...]:
+        return self.__slots__
+
+
+@dataclass(slots=True)
+class Book(_Record):
+    id: int
+    title: str
+    author: str
+    isbn: str
+    total_copies: int
+    available_copies: int
+
+
+@dataclass(slots=True)
+class Loan(_Record):
+    borrow_record_id: int
+    patron_id: str
+    book_id: int
+    title: str
+    author: str
+    borrow_date: datetime
+    due_date: datetime
+    is_overdue: bool
+
+
+def book_factory(cursor, row: tuple) -> Book:
+    """sqlite3 row factory for queries selecting BOOK_COLUMNS."""
+    return Book(*row)
@@ -0,0 +1,92 @@
+"""
+Repositories Package - Pluggable storage behind the library services
+The services call the module-level functions below, which forward to the
+active repository: SQLite by default, an in-memory store, or a read-only
+catalog snapshot for search nodes.
+create_app chooses one with the REPOSITORY setting; tests can swap in a
+private store with use_repository().
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator, Optional
+
+from .base import LibraryRepository
+from .memory import InMemoryRepository
+from .snapshot import SnapshotRepository
+from .sqlite import SQLiteRepository
+
+REPOSITORY_BACKENDS = {
+    'sqlite': SQLiteRepository,
+    'memory': InMemoryRepository,
+    'snapshot': SnapshotRepository,
+}
+
+_default_repository: LibraryRepository = SQLiteRepository()
+# Overrides the process-wide repository within one context (a test, a task)
+_context_repository: ContextVar[Optional[LibraryRepository]] = ContextVar('repository', default=None)
+
+
+def get_repository() -> LibraryRepository:
+    """The repository in effect for the caller."""
+    return _context_repository.get() or _default_repository
+
+
+def set_repository(repository: LibraryRepository) -> LibraryRepository:
+    """Make `repository` the process-wide default."""
+    global _default_repository
+    _default_repository = repository
+    return repository
+
+
+def create_repository(backend: str, **options) -> LibraryRepository:
+    """Build a repository by backend name ('sqlite', 'memory' or 'snapshot')."""
+    if backend not in REPOSITORY_BACKENDS:
+        raise ValueError(f"Unknown repository backend: {backend}")
+    return REPOSITORY_BACKENDS[backend](**options)
+
+
+@contextmanager
+def use_repository(repository: LibraryRepository) -> Iterator[LibraryRepository]:
+    """Use `repository` in the current context only (not in threads it starts)."""
+    token = _context_repository.set(repository)
+    try:
+        yield repository
+    finally:
+        _context_repository.reset(token)
+
+
+def _forward(name: str) -> Callable:
+    def operation(*args, **kwargs):
+        return getattr(get_repository(), name)(*args, **kwargs)
+    operation.__name__ = operation.__qualname__ = name
+    operation.__doc__ = f"{name} on the active repository."
+    return operation
+
+
+get_book_by_id = _forward('get_book_by_id')
+get_book_by_isbn = _forward('get_book_by_isbn')
+get_books_by_ids = _forward('get_books_by_ids')
+get_all_books = _forward('get_all_books')
+iter_books = _forward('iter_books')
+insert_book = _forward('insert_book')
+update_book_availability = _forward('update_book_availability')
+search_books_by_field = _forward('search_books_by_field')
+search_books_page = _forward('search_books_page')
+
+get_patron_borrowed_books = _forward('get_patron_borrowed_books')
+get_patron_borrow_count = _forward('get_patron_borrow_count')
+get_open_loans_with_paid = _forward('get_open_loans_with_paid')
+get_patron_loan_version = _forward('get_patron_loan_version')
+get_patrons_with_open_loans = _forward('get_patrons_with_open_loans')
+insert_borrow_record = _forward('insert_borrow_record')
+insert_borrow_records_batch = _forward('insert_borrow_records_batch')
+update_borrow_records_return_batch = _forward('update_borrow_records_return_batch')
+get_active_hold = _forward('get_active_hold')
+insert_borrow_record_for_hold = _forward('insert_borrow_record_for_hold')
+return_book_and_allocate = _forward('return_book_and_allocate')
+
+insert_fee_entry = _forward('insert_fee_entry')
+get_fee_entry_by_transaction = _forward('get_fee_entry_by_transaction')
+get_loan_amount_paid = _forward('get_loan_amount_paid')
+get_patron_balance = _forward('get_patron_balance')
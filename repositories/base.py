@@ -0,0 +1,108 @@
+"""
+Repository interface - the storage operations the library services rely on
+Every method mirrors the database.py function of the same name, including
+its return types (Book and Loan records, plain dicts for holds and ledger
+entries) and its failure values (False/None rather than exceptions).
+"""
+
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from models import Book, Loan
+
+
+class LibraryRepository(ABC):
+    """Books, loans (with the holds they release) and late-fee payments."""
+
+    # Books
+
+    @abstractmethod
+    def get_book_by_id(self, book_id: int, conn=None) -> Optional[Book]: ...
+
+    @abstractmethod
+    def get_book_by_isbn(self, isbn: str, conn=None) -> Optional[Book]: ...
+
+    @abstractmethod
+    def get_books_by_ids(self, book_ids: List[int]) -> Dict[int, Book]: ...
+
+    @abstractmethod
+    def get_all_books(self, conn=None) -> List[Book]: ...
+
+    @abstractmethod
+    def iter_books(self, chunk_size: int = 500) -> Iterator[Book]: ...
+
+    @abstractmethod
+    def insert_book(self, title: str, author: str, isbn: str, total_copies: int,
+                    available_copies: int) -> bool: ...
+
+    @abstractmethod
+    def update_book_availability(self, book_id: int, change: int) -> bool: ...
+
+    @abstractmethod
+    def register_book_insert_listener(self, listener: Callable[[Dict], None]) -> None: ...
+
+    @abstractmethod
+    def search_books_by_field(self, search_type: str, term: str) -> List[Book]: ...
+
+    @abstractmethod
+    def search_books_page(self, title: Optional[str], author: Optional[str], author_prefix: Optional[str],
+                          isbn: Optional[str], available_only: bool, after: Optional[Tuple[str, int]],
+                          limit: int, count_cap: int, conn=None) -> Tuple[List[Book], int]: ...
+
+    # Loans
+
+    @abstractmethod
+    def get_patron_borrowed_books(self, patron_id: str, conn=None) -> List[Loan]: ...
+
+    @abstractmethod
+    def get_patron_borrow_count(self, patron_id: str, conn=None) -> int: ...
+
+    @abstractmethod
+    def get_open_loans_with_paid(self, patron_ids: List[str]) -> List[Tuple[int, str, int, str, float]]: ...
+
+    @abstractmethod
+    def get_patron_loan_version(self, patron_id: str) -> int: ...
+
+    @abstractmethod
+    def get_patrons_with_open_loans(self, limit: Optional[int] = None) -> List[str]: ...
+
+    @abstractmethod
+    def insert_borrow_record(self, patron_id: str, book_id: int, borrow_date: datetime,
+                             due_date: datetime) -> bool: ...
+
+    @abstractmethod
+    def insert_borrow_records_batch(self, patron_id: str, book_ids: List[int], borrow_date: datetime,
+                                    due_date: datetime,
+                                    ready_holds: Optional[Dict[int, int]] = None) -> Optional[List[int]]: ...
+
+    @abstractmethod
+    def update_borrow_records_return_batch(self, patron_id: str, book_ids: List[int], return_date: datetime,
+                                           pickup_until: datetime) -> Optional[Dict]: ...
+
+    @abstractmethod
+    def get_active_hold(self, patron_id: str, book_id: int) -> Optional[Dict]: ...
+
+    @abstractmethod
+    def insert_borrow_record_for_hold(self, hold_id: int, patron_id: str, book_id: int,
+                                      borrow_date: datetime, due_date: datetime) -> bool: ...
+
+    @abstractmethod
+    def return_book_and_allocate(self, patron_id: str, book_id: int, return_date: datetime,
+                                 pickup_until: datetime) -> Optional[Dict]: ...
+
+    # Payments (fee ledger)
+
+    @abstractmethod
+    def insert_fee_entry(self, patron_id: str, entry_type: str, amount: float, created_at: datetime,
+                         borrow_record_id: Optional[int] = None, book_id: Optional[int] = None,
+                         transaction_id: Optional[str] = None) -> bool: ...
+
+    @abstractmethod
+    def get_fee_entry_by_transaction(self, transaction_id: str) -> Optional[Dict]: ...
+
+    @abstractmethod
+    def get_loan_amount_paid(self, borrow_record_id: int, conn=None) -> float: ...
+
+    @abstractmethod
+    def get_patron_balance(self, patron_id: str, conn=None) -> float: ...
@@ -0,0 +1,257 @@
+"""
+In-memory repository - an indexed, process-local store
+Gives each test its own isolated store and lets benchmarks measure the
+service logic alone. Nothing is persisted; the hold queue is not modelled,
+so returned copies always go back on the shelf.
+"""
+
+import itertools
+import threading
+from copy import copy
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from database import SAMPLE_BOOKS, sample_loans
+from models import Book, Loan
+from repositories.base import LibraryRepository
+
+# Shared by every store so a (patron, version) pair is never reused, even
+# across stores (the patron status cache is keyed by it)
+_versions = itertools.count(1)
+
+
+class InMemoryRepository(LibraryRepository):
+    """Dict-backed store with the same lookups indexed as the SQLite schema."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._books: Dict[int, Book] = {}
+        self._book_ids_by_isbn: Dict[str, int] = {}
+        self._loans: Dict[int, Dict] = {}
+        # patron_id -> {loan_id: loan}, open loans only
+        self._open_loans: Dict[str, Dict[int, Dict]] = {}
+        self._fee_entries: List[Dict] = []
+        self._payments_by_transaction: Dict[str, Dict] = {}
+        self._paid_by_loan: Dict[int, float] = {}
+        self._balances: Dict[str, float] = {}
+        self._versions: Dict[str, int] = {}
+        self._book_insert_listeners: List[Callable[[Dict], None]] = []
+        self._next_book_id = itertools.count(1)
+        self._next_loan_id = itertools.count(1)
+        self._next_entry_id = itertools.count(1)
+
+    def add_sample_data(self) -> None:
+        """Load the same sample catalog and loans as database.add_sample_data."""
+        with self._lock:
+            if self._books:
+                return
+            for title, author, isbn, copies in SAMPLE_BOOKS:
+                self.insert_book(title, author, isbn, copies, copies)
+            for patron_id, book_id, borrow_date, due_date in sample_loans(datetime.now()):
+                self._open_loan(patron_id, book_id, borrow_date, due_date)
+            self._books[3].available_copies = 0
+
+    def _bump_version(self, patron_id: str) -> None:
+        self._versions[patron_id] = next(_versions)
+
+    # Books
+
+    def get_book_by_id(self, book_id: int, conn=None) -> Optional[Book]:
+        with self._lock:
+            book = self._books.get(book_id)
+            return copy(book) if book else None
+
+    def get_book_by_isbn(self, isbn: str, conn=None) -> Optional[Book]:
+        with self._lock:
+            book_id = self._book_ids_by_isbn.get(isbn)
+            return copy(self._books[book_id]) if book_id is not None else None
+
+    def get_books_by_ids(self, book_ids: List[int]) -> Dict[int, Book]:
+        with self._lock:
+            return {book_id: copy(self._books[book_id]) for book_id in book_ids if book_id in self._books}
+
+    def _sorted_books(self) -> List[Book]:
+        with self._lock:
+            return sorted((copy(book) for book in self._books.values()), key=lambda book: (book.title, book.id))
+
+    def get_all_books(self, conn=None) -> List[Book]:
+        return self._sorted_books()
+
+    def iter_books(self, chunk_size: int = 500) -> Iterator[Book]:
+        return iter(self._sorted_books())
+
+    def insert_book(self, title: str, author: str, isbn: str, total_copies: int, available_copies: int) -> bool:
+        with self._lock:
+            if isbn in self._book_ids_by_isbn:
+                return False
+            book = Book(next(self._next_book_id), title, author, isbn, total_copies, available_copies)
+            self._books[book.id] = book
+            self._book_ids_by_isbn[isbn] = book.id
+        for listener in self._book_insert_listeners:
+            listener(dict(book))
+        return True
+
+    def update_book_availability(self, book_id: int, change: int) -> bool:
+        with self._lock:
+            if book_id in self._books:
+                self._books[book_id].available_copies += change
+        return True
+
+    def register_book_insert_listener(self, listener: Callable[[Dict], None]) -> None:
+        """Listeners hear about books added to this store only."""
+        if listener not in self._book_insert_listeners:
+            self._book_insert_listeners.append(listener)
+
+    def search_books_by_field(self, search_type: str, term: str) -> List[Book]:
+        if search_type == "isbn":
+            matches = lambda book: book.isbn == term  # noqa: E731
+        elif search_type in ("title", "author"):
+            matches = lambda book: term.lower() in getattr(book, search_type).lower()  # noqa: E731
+        else:
+            return []
+        return [book for book in self._sorted_books() if matches(book)]
+
+    def search_books_page(self, title: Optional[str], author: Optional[str], author_prefix: Optional[str],
+                          isbn: Optional[str], available_only: bool, after: Optional[Tuple[str, int]],
+                          limit: int, count_cap: int, conn=None) -> Tuple[List[Book], int]:
+        def matches(book: Book) -> bool:
+            return ((not isbn or book.isbn == isbn)
+                    and (not title or title.lower() in book.title.lower())
+                    and (not author or author.lower() in book.author.lower())
+                    and (not author_prefix or book.author.lower().startswith(author_prefix.lower()))
+                    and (not available_only or book.available_copies > 0))
+
+        found = [book for book in self._sorted_books() if matches(book)]
+        page = [book for book in found if not after or (book.title, book.id) > tuple(after)]
+        return page[:limit], min(len(found), count_cap)
+
+    # Loans
+
+    def _open_loan(self, patron_id: str, book_id: int, borrow_date: datetime, due_date: datetime) -> None:
+        loan = {"id": next(self._next_loan_id), "patron_id": patron_id, "book_id": book_id,
+                "borrow_date": borrow_date, "due_date": due_date, "return_date": None}
+        self._loans[loan["id"]] = loan
+        self._open_loans.setdefault(patron_id, {})[loan["id"]] = loan
+        self._bump_version(patron_id)
+
+    def _close_loans(self, patron_id: str, book_id: int, return_date: datetime) -> int:
+        """Close every open loan of the book by the patron; returns how many."""
+        open_loans = self._open_loans.get(patron_id, {})
+        closing = [loan for loan in open_loans.values() if loan["book_id"] == book_id]
+        for loan in closing:
+            loan["return_date"] = return_date
+            del open_loans[loan["id"]]
+        if closing:
+            self._bump_version(patron_id)
+        return len(closing)
+
+    def _patron_open_loans(self, patron_id: str) -> List[Dict]:
+        return sorted(self._open_loans.get(patron_id, {}).values(), key=lambda loan: loan["borrow_date"])
+
+    def get_patron_borrowed_books(self, patron_id: str, conn=None) -> List[Loan]:
+        now = datetime.now()
+        loans = []
+        with self._lock:
+            for loan in self._patron_open_loans(patron_id):
+                book = self._books.get(loan["book_id"])
+                if book is not None:
+                    loans.append(Loan(loan["id"], patron_id, loan["book_id"], book.title, book.author,
+                                      loan["borrow_date"], loan["due_date"], now > loan["due_date"]))
+        return loans
+
+    def get_patron_borrow_count(self, patron_id: str, conn=None) -> int:
+        with self._lock:
+            return len(self._open_loans.get(patron_id, {}))
+
+    def get_open_loans_with_paid(self, patron_ids: List[str]) -> List[Tuple[int, str, int, str, float]]:
+        with self._lock:
+            return [(loan["id"], patron_id, loan["book_id"], loan["due_date"].isoformat(),
+                     self._paid_by_loan.get(loan["id"], 0.0))
+                    for patron_id in sorted(set(patron_ids))
+                    for loan in self._patron_open_loans(patron_id)]
+
+    def get_patron_loan_version(self, patron_id: str) -> int:
+        with self._lock:
+            return self._versions.get(patron_id, 0)
+
+    def get_patrons_with_open_loans(self, limit: Optional[int] = None) -> List[str]:
+        with self._lock:
+            patron_ids = sorted(patron_id for patron_id, loans in self._open_loans.items() if loans)
+        return patron_ids if limit is None else patron_ids[:limit]
+
+    def insert_borrow_record(self, patron_id: str, book_id: int, borrow_date: datetime, due_date: datetime) -> bool:
+        with self._lock:
+            self._open_loan(patron_id, book_id, borrow_date, due_date)
+        return True
+
+    def insert_borrow_records_batch(self, patron_id: str, book_ids: List[int], borrow_date: datetime,
+                                    due_date: datetime,
+                                    ready_holds: Optional[Dict[int, int]] = None) -> Optional[List[int]]:
+        borrowed = []
+        with self._lock:
+            for book_id in book_ids:
+                book = self._books.get(book_id)
+                if book is None or book.available_copies <= 0:
+                    continue
+                book.available_copies -= 1
+                self._open_loan(patron_id, book_id, borrow_date, due_date)
+                borrowed.append(book_id)
+        return borrowed
+
+    def update_borrow_records_return_batch(self, patron_id: str, book_ids: List[int], return_date: datetime,
+                                           pickup_until: datetime) -> Optional[Dict]:
+        returned = []
+        with self._lock:
+            for book_id in book_ids:
+                if not self._close_loans(patron_id, book_id, return_date):
+                    continue
+                self.update_book_availability(book_id, 1)
+                returned.append(book_id)
+        return {"returned": returned, "holds": {}}
+
+    def get_active_hold(self, patron_id: str, book_id: int) -> Optional[Dict]:
+        return None
+
+    def insert_borrow_record_for_hold(self, hold_id: int, patron_id: str, book_id: int,
+                                      borrow_date: datetime, due_date: datetime) -> bool:
+        return False
+
+    def return_book_and_allocate(self, patron_id: str, book_id: int, return_date: datetime,
+                                 pickup_until: datetime) -> Optional[Dict]:
+        with self._lock:
+            returned = self._close_loans(patron_id, book_id, return_date) > 0
+            if returned:
+                self.update_book_availability(book_id, 1)
+        return {"returned": returned, "hold": None}
+
+    # Payments (fee ledger)
+
+    def insert_fee_entry(self, patron_id: str, entry_type: str, amount: float, created_at: datetime,
+                         borrow_record_id: Optional[int] = None, book_id: Optional[int] = None,
+                         transaction_id: Optional[str] = None) -> bool:
+        amount = round(amount, 2)
+        entry = {"id": next(self._next_entry_id), "patron_id": patron_id, "borrow_record_id": borrow_record_id,
+                 "book_id": book_id, "entry_type": entry_type, "amount": amount,
+                 "transaction_id": transaction_id, "created_at": created_at.isoformat()}
+        with self._lock:
+            self._fee_entries.append(entry)
+            if entry_type == "payment" and transaction_id is not None:
+                self._payments_by_transaction.setdefault(transaction_id, entry)
+            if entry_type in ("payment", "refund") and borrow_record_id is not None:
+                self._paid_by_loan[borrow_record_id] = self._paid_by_loan.get(borrow_record_id, 0.0) - amount
+            self._balances[patron_id] = round(self._balances.get(patron_id, 0.0) + amount, 2)
+            self._bump_version(patron_id)
+        return True
+
+    def get_fee_entry_by_transaction(self, transaction_id: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._payments_by_transaction.get(transaction_id)
+            return dict(entry) if entry else None
+
+    def get_loan_amount_paid(self, borrow_record_id: int, conn=None) -> float:
+        with self._lock:
+            return round(self._paid_by_loan.get(borrow_record_id, 0.0), 2)
+
+    def get_patron_balance(self, patron_id: str, conn=None) -> float:
+        with self._lock:
+            return self._balances.get(patron_id, 0.0)
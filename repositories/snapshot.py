@@ -0,0 +1,441 @@
+"""
+Snapshot repository - a read-only catalog served from a memory-mapped file
+Search and kiosk nodes only read the books table. They can load a binary
+snapshot written by the exporter instead of querying library.db. The file
+is mapped read-only, so opening it costs no parsing, and every worker
+process on the host shares the same page-cache pages. Writes and loans
+are not available on these nodes.
+
+File layout (little-endian, sections 8-byte aligned):
+    header      magic, format, section count, CRC-32 of everything after
+                the header (checked when the file is written and by
+                snapshot-info, not on every open), catalog change sequence
+                number, creation time, book count, then (offset, length)
+                for each section
+    ids         int64 book IDs, ascending (row order)
+    total       int32 total_copies per row
+    available   int32 available_copies per row
+    strings     uint32 offsets into the pool, three strings per row
+                (title, author, isbn) plus an end offset
+    pool        UTF-8 string data
+    by_title    uint32 rows ordered by (title, id)
+    title_rank  uint32 position of each row in by_title
+    by_isbn     uint32 rows ordered by ISBN
+    gram_keys   uint32 (field << 24 | trigram) keys, ascending
+    gram_starts uint32 offsets into postings per key, plus an end offset
+    postings    uint32 rows containing each trigram, ascending
+"""
+
+import bisect
+import logging
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+from array import array
+from datetime import datetime
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from models import Book, Loan
+from repositories.base import LibraryRepository
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_MAGIC = b"LIBCATSN"
+SNAPSHOT_FORMAT = 1
+SECTIONS = (("ids", "q"), ("total", "i"), ("available", "i"), ("strings", "I"), ("pool", "B"),
+            ("by_title", "I"), ("title_rank", "I"), ("by_isbn", "I"),
+            ("gram_keys", "I"), ("gram_starts", "I"), ("postings", "I"))
+# magic, format, section count, crc32, catalog version, created (epoch seconds), book count
+_HEADER = struct.Struct("<8sHHIQdI4x")
+_SECTION = struct.Struct("<QQ")
+_BODY_START = _HEADER.size + _SECTION.size * len(SECTIONS)
+
+TITLE, AUTHOR, ISBN = 0, 1, 2
+# Trigram index fields (the high byte of a gram key)
+_INDEXED_FIELDS = {"title": TITLE, "author": AUTHOR}
+
+
+class SnapshotError(Exception):
+    """The file is not a catalog snapshot this version can read."""
+
+
+def _grams(text: str) -> set:
+    """3-byte windows of the lower-cased UTF-8 text."""
+    data = text.lower().encode("utf-8")
+    return {int.from_bytes(data[i:i + 3], "big") for i in range(len(data) - 2)}
+
+
+def _padding(length: int) -> bytes:
+    return b"\0" * (-length % 8)
+
+
+def write_catalog_snapshot(path: str, books: Iterable[Book], version: int) -> Dict:
+    """
+    Write `books` as a snapshot of catalog change `version`.
+    The file is written beside `path`, read back to check its CRC and
+    renamed over it, so readers see the old snapshot or the new one, never
+    a partial or damaged file.
+
+    Returns:
+        dict: {'path', 'books', 'bytes'}
+    """
+    books = sorted(books, key=lambda book: book.id)
+    ids, total, available = array("q"), array("i"), array("i")
+    strings, pool = array("I", [0]), bytearray()
+    postings_by_key: Dict[int, List[int]] = {}
+
+    for row, book in enumerate(books):
+        ids.append(book.id)
+        total.append(book.total_copies)
+        available.append(book.available_copies)
+        for value in (book.title, book.author, book.isbn):
+            pool += value.encode("utf-8")
+            strings.append(len(pool))
+        for field, code in _INDEXED_FIELDS.items():
+            for gram in _grams(book[field]):
+                postings_by_key.setdefault(code << 24 | gram, []).append(row)
+
+    by_title = sorted(range(len(books)), key=lambda row: (books[row].title, books[row].id))
+    title_rank = array("I", bytes(4 * len(books)))
+    for rank, row in enumerate(by_title):
+        title_rank[row] = rank
+    by_isbn = sorted(range(len(books)), key=lambda row: books[row].isbn)
+
+    gram_keys, gram_starts, postings = array("I"), array("I", [0]), array("I")
+    for key in sorted(postings_by_key):
+        gram_keys.append(key)
+        postings.extend(postings_by_key[key])
+        gram_starts.append(len(postings))
+
+    sections = {"ids": ids, "total": total, "available": available, "strings": strings, "pool": pool,
+                "by_title": array("I", by_title), "title_rank": title_rank, "by_isbn": array("I", by_isbn),
+                "gram_keys": gram_keys, "gram_starts": gram_starts, "postings": postings}
+    body, table = bytearray(), []
+    for name, _ in SECTIONS:
+        data = bytes(sections[name])
+        table.append((_BODY_START + len(body), len(data)))
+        body += data + _padding(len(data))
+
+    header = _HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_FORMAT, len(SECTIONS), zlib.crc32(body), version,
+                          time.time(), len(books))
+    partial = f"{path}.partial"
+    with open(partial, "wb") as handle:
+        handle.write(header)
+        for offset, length in table:
+            handle.write(_SECTION.pack(offset, length))
+        handle.write(body)
+        handle.flush()
+        os.fsync(handle.fileno())
+    try:
+        CatalogSnapshot(partial, verify=True).close()
+    except SnapshotError:
+        os.remove(partial)
+        raise
+    os.replace(partial, path)
+    return {"path": path, "books": len(books), "bytes": _BODY_START + len(body)}
+
+
+class CatalogSnapshot:
+    """
+    A memory-mapped snapshot; records are decoded from the file on access.
+    `verify` checks the CRC, which reads every page of the file; files are
+    verified when written, so serving nodes open them without it.
+    """
+
+    def __init__(self, path: str, verify: bool = False):
+        if sys.byteorder != "little":
+            raise SnapshotError("Catalog snapshots can only be read on little-endian hosts")
+        with open(path, "rb") as handle:
+            self._map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        self._views: List[memoryview] = []
+        try:
+            self._load(path, verify)
+        except Exception:
+            self.close()
+            raise
+
+    def _load(self, path: str, verify: bool) -> None:
+        if len(self._map) < _BODY_START:
+            raise SnapshotError(f"{path} is too short to be a catalog snapshot")
+        magic, file_format, section_count, checksum, self.version, created, self.book_count = \
+            _HEADER.unpack_from(self._map)
+        if magic != SNAPSHOT_MAGIC or file_format != SNAPSHOT_FORMAT or section_count != len(SECTIONS):
+            raise SnapshotError(f"{path} is not a format {SNAPSHOT_FORMAT} catalog snapshot")
+        self.path = path
+        self.created_at = datetime.fromtimestamp(created)
+
+        view = memoryview(self._map)
+        self._views.append(view)
+        if verify and zlib.crc32(view[_BODY_START:]) != checksum:
+            raise SnapshotError(f"{path} failed its checksum")
+        for index, (name, code) in enumerate(SECTIONS):
+            offset, length = _SECTION.unpack_from(self._map, _HEADER.size + index * _SECTION.size)
+            if offset + length > len(self._map):
+                raise SnapshotError(f"{path} is truncated")
+            section = view[offset:offset + length].cast(code)
+            self._views.append(section)
+            setattr(self, f"_{name}", section)
+
+    def close(self) -> None:
+        for view in reversed(self._views):
+            view.release()
+        self._map.close()
+
+    def _string(self, row: int, field: int) -> str:
+        index = row * 3 + field
+        return str(self._pool[self._strings[index]:self._strings[index + 1]], "utf-8")
+
+    def book(self, row: int) -> Book:
+        return Book(self._ids[row], self._string(row, TITLE), self._string(row, AUTHOR),
+                    self._string(row, ISBN), self._total[row], self._available[row])
+
+    def row_for_id(self, book_id: int) -> Optional[int]:
+        row = bisect.bisect_left(self._ids, book_id)
+        return row if row < len(self._ids) and self._ids[row] == book_id else None
+
+    def row_for_isbn(self, isbn: str) -> Optional[int]:
+        index = bisect.bisect_left(self._by_isbn, isbn, key=lambda row: self._string(row, ISBN))
+        if index < len(self._by_isbn) and self._string(self._by_isbn[index], ISBN) == isbn:
+            return self._by_isbn[index]
+        return None
+
+    def rows_by_title(self, start: int = 0) -> Iterator[int]:
+        """Rows in (title, id) order from position `start`."""
+        return (self._by_title[rank] for rank in range(start, len(self._by_title)))
+
+    def title_position(self, row: int) -> int:
+        """Position of a row in (title, id) order."""
+        return self._title_rank[row]
+
+    def title_position_after(self, after: Tuple[str, int]) -> int:
+        """Position in title order of the first row after the keyset (title, id)."""
+        return bisect.bisect_right(self._by_title, tuple(after),
+                                   key=lambda row: (self._string(row, TITLE), self._ids[row]))
+
+    def rows_containing(self, field: str, term: str) -> List[int]:
+        """
+        Rows whose title or author contains `term` (case-insensitive), in
+        title order. Terms of three or more bytes are narrowed with the
+        trigram index, using the trigram with the shortest posting list.
+        """
+        code = _INDEXED_FIELDS[field]
+        needle = term.lower()
+        grams = _grams(term)
+        if grams:
+            candidates = None
+            for gram in grams:
+                key = code << 24 | gram
+                index = bisect.bisect_left(self._gram_keys, key)
+                if index == len(self._gram_keys) or self._gram_keys[index] != key:
+                    return []
+                postings = self._postings[self._gram_starts[index]:self._gram_starts[index + 1]]
+                if candidates is None or len(postings) < len(candidates):
+                    candidates = postings
+        else:
+            candidates = range(self.book_count)
+        rows = [row for row in candidates if needle in self._string(row, code).lower()]
+        return sorted(rows, key=self._title_rank.__getitem__)
+
+
+class SnapshotRepository(LibraryRepository):
+    """
+    Serves the books operations from a catalog snapshot file and notices a
+    newer snapshot (at most every `check_interval` seconds) by its size,
+    inode and modification time. A snapshot that fails to load is logged
+    and the current one kept. Records from a replaced snapshot stay valid;
+    its mapping is released once nothing refers to it.
+    """
+
+    def __init__(self, path: str, check_interval: float = 5.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._refresh_listeners: List[Callable[[], None]] = []
+        self._snapshot = CatalogSnapshot(path)
+        self._signature = self._file_signature()
+        self._checked_at = time.monotonic()
+
+    def _file_signature(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+    def refresh(self) -> bool:
+        """Load the snapshot file if it changed; returns True if a new one was loaded."""
+        with self._lock:
+            self._checked_at = time.monotonic()
+            signature = self._file_signature()
+            if signature is None or signature == self._signature:
+                return False
+            try:
+                snapshot = CatalogSnapshot(self.path)
+            except (OSError, ValueError, SnapshotError) as e:
+                logger.error("Keeping catalog snapshot version %d: %s", self._snapshot.version, e)
+                return False
+            self._snapshot, self._signature = snapshot, signature
+        logger.info("Loaded catalog snapshot version %d (%d books)", snapshot.version, snapshot.book_count)
+        for listener in self._refresh_listeners:
+            listener()
+        return True
+
+    def register_refresh_listener(self, listener: Callable[[], None]) -> None:
+        """Register a callback run after each newly loaded snapshot."""
+        if listener not in self._refresh_listeners:
+            self._refresh_listeners.append(listener)
+
+    @property
+    def snapshot(self) -> CatalogSnapshot:
+        if time.monotonic() - self._checked_at >= self.check_interval:
+            self.refresh()
+        return self._snapshot
+
+    # Books
+
+    def get_book_by_id(self, book_id: int, conn=None) -> Optional[Book]:
+        snapshot = self.snapshot
+        row = snapshot.row_for_id(book_id)
+        return snapshot.book(row) if row is not None else None
+
+    def get_book_by_isbn(self, isbn: str, conn=None) -> Optional[Book]:
+        snapshot = self.snapshot
+        row = snapshot.row_for_isbn(isbn)
+        return snapshot.book(row) if row is not None else None
+
+    def get_books_by_ids(self, book_ids: List[int]) -> Dict[int, Book]:
+        snapshot = self.snapshot
+        rows = ((book_id, snapshot.row_for_id(book_id)) for book_id in book_ids)
+        return {book_id: snapshot.book(row) for book_id, row in rows if row is not None}
+
+    def get_all_books(self, conn=None) -> List[Book]:
+        return list(self.iter_books())
+
+    def iter_books(self, chunk_size: int = 500) -> Iterator[Book]:
+        snapshot = self.snapshot
+        return (snapshot.book(row) for row in snapshot.rows_by_title())
+
+    def insert_book(self, title: str, author: str, isbn: str, total_copies: int, available_copies: int) -> bool:
+        return False
+
+    def update_book_availability(self, book_id: int, change: int) -> bool:
+        return False
+
+    def register_book_insert_listener(self, listener: Callable[[Dict], None]) -> None:
+        pass  # no books are inserted through a snapshot
+
+    def search_books_by_field(self, search_type: str, term: str) -> List[Book]:
+        snapshot = self.snapshot
+        if search_type == "isbn":
+            row = snapshot.row_for_isbn(term)
+            return [snapshot.book(row)] if row is not None else []
+        if search_type in _INDEXED_FIELDS:
+            return [snapshot.book(row) for row in snapshot.rows_containing(search_type, term)]
+        return []
+
+    def search_books_page(self, title: Optional[str], author: Optional[str], author_prefix: Optional[str],
+                          isbn: Optional[str], available_only: bool, after: Optional[Tuple[str, int]],
+                          limit: int, count_cap: int, conn=None) -> Tuple[List[Book], int]:
+        snapshot = self.snapshot
+        if isbn:
+            row = snapshot.row_for_isbn(isbn)
+            rows = [row] if row is not None else []
+        elif title:
+            rows = snapshot.rows_containing("title", title)
+        elif author:
+            rows = snapshot.rows_containing("author", author)
+        else:
+            rows = None
+
+        def matches(book: Book) -> bool:
+            return ((not title or title.lower() in book.title.lower())
+                    and (not author or author.lower() in book.author.lower())
+                    and (not author_prefix or book.author.lower().startswith(author_prefix.lower()))
+                    and (not available_only or book.available_copies > 0))
+
+        # Seek to the cursor; rows before it are only counted, up to count_cap
+        start = snapshot.title_position_after(after) if after else 0
+        if rows is None:
+            before, rows = islice(snapshot.rows_by_title(), start), snapshot.rows_by_title(start)
+        else:
+            split = bisect.bisect_left(rows, start, key=snapshot.title_position)
+            before, rows = rows[:split], rows[split:]
+
+        total = 0
+        for row in before:
+            if total >= count_cap:
+                break
+            if matches(snapshot.book(row)):
+                total += 1
+        page = []
+        for row in rows:
+            if total >= count_cap and len(page) >= limit:
+                break
+            book = snapshot.book(row)
+            if not matches(book):
+                continue
+            total += 1
+            if len(page) < limit:
+                page.append(book)
+        return page, min(total, count_cap)
+
+    # Loans: a snapshot node holds no loans, holds or ledger, and lends nothing
+
+    def get_patron_borrowed_books(self, patron_id: str, conn=None) -> List[Loan]:
+        return []
+
+    def get_patron_borrow_count(self, patron_id: str, conn=None) -> int:
+        return 0
+
+    def get_open_loans_with_paid(self, patron_ids: List[str]) -> List[Tuple[int, str, int, str, float]]:
+        return []
+
+    def get_patron_loan_version(self, patron_id: str) -> int:
+        return 0
+
+    def get_patrons_with_open_loans(self, limit: Optional[int] = None) -> List[str]:
+        return []
+
+    def insert_borrow_record(self, patron_id: str, book_id: int, borrow_date: datetime, due_date: datetime) -> bool:
+        return False
+
+    def insert_borrow_records_batch(self, patron_id: str, book_ids: List[int], borrow_date: datetime,
+                                    due_date: datetime,
+                                    ready_holds: Optional[Dict[int, int]] = None) -> Optional[List[int]]:
+        return None
+
+    def update_borrow_records_return_batch(self, patron_id: str, book_ids: List[int], return_date: datetime,
+                                           pickup_until: datetime) -> Optional[Dict]:
+        return None
+
+    def get_active_hold(self, patron_id: str, book_id: int) -> Optional[Dict]:
+        return None
+
+    def insert_borrow_record_for_hold(self, hold_id: int, patron_id: str, book_id: int,
+                                      borrow_date: datetime, due_date: datetime) -> bool:
+        return False
+
+    def return_book_and_allocate(self, patron_id: str, book_id: int, return_date: datetime,
+                                 pickup_until: datetime) -> Optional[Dict]:
+        return None
+
+    # Payments (fee ledger)
+
+    def insert_fee_entry(self, patron_id: str, entry_type: str, amount: float, created_at: datetime,
+                         borrow_record_id: Optional[int] = None, book_id: Optional[int] = None,
+                         transaction_id: Optional[str] = None) -> bool:
+        return False
+
+    def get_fee_entry_by_transaction(self, transaction_id: str) -> Optional[Dict]:
+        return None
+
+    def get_loan_amount_paid(self, borrow_record_id: int, conn=None) -> float:
+        return 0.0
+
+    def get_patron_balance(self, patron_id: str, conn=None) -> float:
+        return 0.0
@@ -0,0 +1,38 @@
+"""
+SQLite repository - the production backend, backed by database.py
+"""
+
+import database
+from repositories.base import LibraryRepository
+
+
+class SQLiteRepository(LibraryRepository):
+    """Delegates every operation to the database module (database.DATABASE)."""
+
+    get_book_by_id = staticmethod(database.get_book_by_id)
+    get_book_by_isbn = staticmethod(database.get_book_by_isbn)
+    get_books_by_ids = staticmethod(database.get_books_by_ids)
+    get_all_books = staticmethod(database.get_all_books)
+    iter_books = staticmethod(database.iter_books)
+    insert_book = staticmethod(database.insert_book)
+    update_book_availability = staticmethod(database.update_book_availability)
+    register_book_insert_listener = staticmethod(database.register_book_insert_listener)
+    search_books_by_field = staticmethod(database.search_books_by_field)
+    search_books_page = staticmethod(database.search_books_page)
+
+    get_patron_borrowed_books = staticmethod(database.get_patron_borrowed_books)
+    get_patron_borrow_count = staticmethod(database.get_patron_borrow_count)
+    get_open_loans_with_paid = staticmethod(database.get_open_loans_with_paid)
+    get_patron_loan_version = staticmethod(database.get_patron_loan_version)
+    get_patrons_with_open_loans = staticmethod(database.get_patrons_with_open_loans)
+    insert_borrow_record = staticmethod(database.insert_borrow_record)
+    insert_borrow_records_batch = staticmethod(database.insert_borrow_records_batch)
+    update_borrow_records_return_batch = staticmethod(database.update_borrow_records_return_batch)
+    get_active_hold = staticmethod(database.get_active_hold)
+    insert_borrow_record_for_hold = staticmethod(database.insert_borrow_record_for_hold)
+    return_book_and_allocate = staticmethod(database.return_book_and_allocate)
+
+    insert_fee_entry = staticmethod(database.insert_fee_entry)
+    get_fee_entry_by_transaction = staticmethod(database.get_fee_entry_by_transaction)
+    get_loan_amount_paid = staticmethod(database.get_loan_amount_paid)
+    get_patron_balance = staticmethod(database.get_patron_balance)
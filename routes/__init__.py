@@ -6,6 +6,8 @@ from .catalog_routes import catalog_bp
 from .borrowing_routes import borrowing_bp
 from .search_routes import search_bp
 from .api_routes import api_bp
+from .async_api_routes import api_async_bp
+from .stats_routes import stats_bp
 
 def register_blueprints(app):
     """Register all route blueprints with the Flask app."""
@@ -13,3 +15,5 @@ def register_blueprints(app):
     app.register_blueprint(borrowing_bp)
     app.register_blueprint(search_bp)
     app.register_blueprint(api_bp)
+    app.register_blueprint(api_async_bp)
+    app.register_blueprint(stats_bp)
@@ -3,7 +3,17 @@ API Routes - JSON API endpoints
 """
 
 from flask import Blueprint, jsonify, request
-from library_service import calculate_late_fee_for_book, search_books_in_catalog
+from services.library_service import (
+    calculate_late_fee_for_book, calculate_late_fees_batch,
+    search_books_in_catalog, search_books_filtered, DEFAULT_SEARCH_LIMIT,
+    borrow_books_batch, return_books_batch, get_patron_status_report,
+    pay_late_fees, refund_late_fee_payment
+)
+from services.idempotency import KEY_IN_PROGRESS, KEY_REUSED
+from services.change_feed import get_catalog_changes_since, DEFAULT_CHANGE_LIMIT
+from services.fee_ledger_service import get_patron_fee_balance
+from services.hold_service import place_hold, get_hold_status, cancel_hold
+from services.search_index import suggest_books, DEFAULT_SUGGEST_LIMIT
 
 api_bp = Blueprint('api', __name__, url_prefix='/api')
 
@@ -16,24 +26,234 @@ def get_late_fee(patron_id, book_id):
     result = calculate_late_fee_for_book(patron_id, book_id)
     return jsonify(result), 501 if 'not implemented' in result.get('status', '') else 200
 
+@api_bp.route('/late_fees', methods=['POST'])
+def get_late_fees_batch():
+    """
+    Late fees for many patrons or (patron, book) pairs in one request.
+    Body: {"patron_ids": [...], "pairs": [[patron_id, book_id], ...]}
+    Answers {"fees": {patron_id: {book_id: [fee_amount, days_overdue] or null}}, "invalid": [...]}
+    """
+    payload = request.get_json(silent=True) or {}
+    result = calculate_late_fees_batch(payload.get('patron_ids'), payload.get('pairs'))
+    return jsonify(result), 400 if 'error' in result else 200
+
+@api_bp.route('/patrons/<patron_id>/balance')
+def get_fee_balance(patron_id):
+    """
+    Late-fee balance from the fee ledger (accruals less payments).
+    A single indexed read; accruals are brought up to date daily.
+    """
+    result = get_patron_fee_balance(patron_id)
+    return jsonify(result), 400 if 'error' in result else 200
+
+@api_bp.route('/patrons/<patron_id>/status')
+def get_patron_status(patron_id):
+    """
+    Patron status report (R7) as JSON.
+    Served from the status cache until the patron's loans or fees change.
+    """
+    report = get_patron_status_report(patron_id)
+    if not report:
+        return jsonify({'error': 'Invalid patron ID. Must be exactly 6 digits.'}), 400
+    return jsonify(report)
+
 @api_bp.route('/search')
 def search_books_api():
     """
     Search for books via API endpoint.
     Alternative API interface for R5: Book Search Functionality
+
+    Accepts the single-field q/type form or combined filters (title, author,
+    author_prefix, isbn, available) and returns one page of results with a
+    next_cursor for the following page.
     """
     search_term = request.args.get('q', '').strip()
     search_type = request.args.get('type', 'title')
     
-    if not search_term:
+    filters = {
+        'title': request.args.get('title'),
+        'author': request.args.get('author'),
+        'author_prefix': request.args.get('author_prefix'),
+        'isbn': request.args.get('isbn'),
+    }
+    available_only = request.args.get('available', '').lower() in ('1', 'true', 'yes')
+
+    if search_term and search_type == 'fuzzy':
+        books = search_books_in_catalog(search_term, search_type)
+        return jsonify({
+            'search_term': search_term,
+            'search_type': search_type,
+            'results': books,
+            'count': len(books)
+        })
+
+    if search_term:
+        if search_type not in ('title', 'author', 'isbn'):
+            return jsonify({'error': 'Search type must be title, author, isbn or fuzzy'}), 400
+        filters[search_type] = search_term
+
+    if not any(filters.values()) and not available_only:
         return jsonify({'error': 'Search term is required'}), 400
     
+    try:
+        limit = int(request.args.get('limit', DEFAULT_SEARCH_LIMIT))
+    except ValueError:
+        return jsonify({'error': 'Limit must be a positive integer.'}), 400
+
     # Use business logic function
-    books = search_books_in_catalog(search_term, search_type)
+    page = search_books_filtered(available_only=available_only, limit=limit,
+                                 cursor=request.args.get('cursor'), **filters)
+    if 'error' in page:
+        return jsonify(page), 400
     
     return jsonify({
         'search_term': search_term,
         'search_type': search_type,
-        'results': books,
-        'count': len(books)
+        **page
+    })
+
+
+@api_bp.route('/suggest')
+def suggest_books_api():
+    """
+    Typeahead suggestions for titles or authors.
+    Served from the in-memory prefix index, never the database.
+    """
+    prefix = request.args.get('q', '').strip()
+    suggest_type = request.args.get('type', 'title')
+    limit = request.args.get('limit', DEFAULT_SUGGEST_LIMIT, type=int)
+
+    if suggest_type not in ('title', 'author'):
+        return jsonify({'error': 'Suggestion type must be title or author'}), 400
+
+    suggestions = suggest_books(prefix, suggest_type, limit)
+
+    return jsonify({
+        'query': prefix,
+        'type': suggest_type,
+        'suggestions': suggestions
     })
+
+
+def _run_circulation_batch(batch_function):
+    """Parse a {patron_id, book_ids} JSON body and apply a circulation batch."""
+    payload = request.get_json(silent=True) or {}
+    patron_id = str(payload.get('patron_id', '')).strip()
+    book_ids = payload.get('book_ids')
+
+    success, message, results = batch_function(patron_id, book_ids)
+    status = 200 if results else 400
+
+    return jsonify({
+        'patron_id': patron_id,
+        'success': success,
+        'message': message,
+        'results': results
+    }), status
+
+
+@api_bp.route('/circulation/borrow', methods=['POST'])
+def borrow_books_batch_api():
+    """
+    Borrow several books for one patron in one request (self-checkout kiosks).
+    Batch interface for R3: Book Borrowing
+    """
+    return _run_circulation_batch(borrow_books_batch)
+
+
+@api_bp.route('/circulation/return', methods=['POST'])
+def return_books_batch_api():
+    """
+    Return several books for one patron in one request.
+    Batch interface for R4: Book Return Processing
+    """
+    return _run_circulation_batch(return_books_batch)
+
+
+@api_bp.route('/holds', methods=['POST'])
+def place_hold_api():
+    """
+    Place a hold from a JSON body {patron_id, book_id}. Patrons always
+    queue at normal priority; raising it is left to staff-side code.
+    """
+    payload = request.get_json(silent=True) or {}
+    patron_id = str(payload.get('patron_id', '')).strip()
+    book_id = payload.get('book_id')
+
+    success, message = place_hold(patron_id, book_id)
+    return jsonify({'success': success, 'message': message}), 201 if success else 400
+
+
+@api_bp.route('/holds/<patron_id>/<int:book_id>', methods=['GET'])
+def get_hold_api(patron_id, book_id):
+    """Queue position or pickup deadline of a patron's hold."""
+    return jsonify(get_hold_status(patron_id, book_id))
+
+
+@api_bp.route('/holds/<patron_id>/<int:book_id>', methods=['DELETE'])
+def cancel_hold_api(patron_id, book_id):
+    """Cancel a patron's hold on a book."""
+    success, message = cancel_hold(patron_id, book_id)
+    return jsonify({'success': success, 'message': message}), 200 if success else 404
+
+
+def _payment_status(success, message):
+    """HTTP status for a payment or refund outcome."""
+    if success:
+        return 200
+    return 409 if message in (KEY_IN_PROGRESS, KEY_REUSED) else 400
+
+
+@api_bp.route('/payments', methods=['POST'])
+def pay_late_fees_api():
+    """
+    Pay the late fee on a loan from a JSON body {patron_id, book_id}.
+    An Idempotency-Key header makes retries safe: a repeated key returns
+    the first outcome without charging again.
+    """
+    payload = request.get_json(silent=True) or {}
+    patron_id = str(payload.get('patron_id', '')).strip()
+    book_id = payload.get('book_id')
+
+    success, message, transaction_id = pay_late_fees(
+        patron_id, book_id, idempotency_key=request.headers.get('Idempotency-Key')
+    )
+    return jsonify({'success': success, 'message': message, 'transaction_id': transaction_id}), \
+        _payment_status(success, message)
+
+
+@api_bp.route('/refunds', methods=['POST'])
+def refund_late_fee_api():
+    """Refund a late fee payment from a JSON body {transaction_id, amount}; honours Idempotency-Key."""
+    payload = request.get_json(silent=True) or {}
+    transaction_id = str(payload.get('transaction_id', '')).strip()
+    try:
+        amount = float(payload.get('amount'))
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'message': 'Amount must be a number.'}), 400
+
+    success, message = refund_late_fee_payment(
+        transaction_id, amount, idempotency_key=request.headers.get('Idempotency-Key')
+    )
+    return jsonify({'success': success, 'message': message}), _payment_status(success, message)
+
+
+@api_bp.route('/changes')
+def get_catalog_changes_api():
+    """
+    Catalog change feed for downstream caches.
+    Without `since`, returns {"latest": N}: take it, snapshot the catalog,
+    then poll ?since=N (optionally &wait=seconds to long-poll) and apply
+    each page, continuing from next_since. 410 means the consumer fell
+    behind the retained log and must snapshot again.
+    """
+    since = request.args.get('since', type=int)
+    if 'since' in request.args and since is None:
+        return jsonify({'error': 'since must be an integer.'}), 400
+    limit = request.args.get('limit', DEFAULT_CHANGE_LIMIT, type=int)
+    wait = request.args.get('wait', 0.0, type=float)
+
+    result = get_catalog_changes_since(since, limit, wait)
+    if result.get('resync'):
+        return jsonify(result), 410
+    return jsonify(result), 400 if 'error' in result else 200
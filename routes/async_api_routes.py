@@ -0,0 +1,61 @@
+"""
+Async API Routes - asyncio variants of the JSON API endpoints
+Requires Flask's async extra (asgiref)
+"""
+
+from flask import Blueprint, jsonify, request
+import async_database
+from services.async_library_service import calculate_late_fee_for_book, search_books, get_patron_loans
+from services.library_service import DEFAULT_SEARCH_LIMIT
+
+api_async_bp = Blueprint('api_async', __name__, url_prefix='/api/async')
+
+@api_async_bp.route('/late_fee/<patron_id>/<int:book_id>')
+async def get_late_fee(patron_id, book_id):
+    """
+    Calculate late fee for a specific book borrowed by a patron.
+    Async variant of GET /api/late_fee/<patron_id>/<book_id>
+    """
+    result = await calculate_late_fee_for_book(patron_id, book_id)
+    return jsonify(result)
+
+@api_async_bp.route('/search')
+async def search_books_api():
+    """
+    Search for books with combined filters, one page at a time.
+    Async variant of GET /api/search (filter parameters only)
+    """
+    try:
+        limit = int(request.args.get('limit', DEFAULT_SEARCH_LIMIT))
+    except ValueError:
+        return jsonify({'error': 'Limit must be a positive integer.'}), 400
+
+    page = await search_books(
+        title=request.args.get('title'),
+        author=request.args.get('author'),
+        author_prefix=request.args.get('author_prefix'),
+        isbn=request.args.get('isbn'),
+        available_only=request.args.get('available', '').lower() in ('1', 'true', 'yes'),
+        limit=limit,
+        cursor=request.args.get('cursor')
+    )
+    if 'error' in page:
+        return jsonify(page), 400
+
+    return jsonify(page)
+
+@api_async_bp.route('/books/<int:book_id>')
+async def get_book(book_id):
+    """Get a single book by ID."""
+    book = await async_database.get_book_by_id(book_id)
+    if not book:
+        return jsonify({'error': 'Book not found'}), 404
+    return jsonify(book)
+
+@api_async_bp.route('/patrons/<patron_id>/loans')
+async def get_loans(patron_id):
+    """Get a patron's open loans and current late fees."""
+    loans = await get_patron_loans(patron_id)
+    if loans is None:
+        return jsonify({'error': 'Invalid patron ID. Must be exactly 6 digits.'}), 400
+    return jsonify({'patron_id': patron_id, 'loans': loans, 'count': len(loans)})
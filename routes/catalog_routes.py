@@ -2,12 +2,76 @@
 Catalog Routes - Book catalog related endpoints
 """
 
-from flask import Blueprint, render_template, request, redirect, url_for, flash
-from database import get_all_books
-from library_service import add_book_to_catalog
+import threading
+from collections import OrderedDict
+from itertools import chain
+from typing import Dict, Iterator, Tuple
+
+from flask import (Blueprint, render_template, request, redirect, url_for, flash, get_flashed_messages,
+                   stream_template, current_app)
+from markupsafe import Markup
+from repositories import iter_books
+from services.library_service import add_book_to_catalog
 
 catalog_bp = Blueprint('catalog', __name__)
 
+# Most catalog rows kept pre-rendered
+MAX_CACHED_ROWS = 5000
+
+
+class RowFragmentCache:
+    """
+    LRU cache of rendered catalog rows.
+
+    A row only changes with the book's availability (title, author and ISBN
+    are never edited), so fragments are keyed by (id, available, total).
+    """
+
+    def __init__(self, max_entries: int = MAX_CACHED_ROWS):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._rows = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    @staticmethod
+    def key(book: Dict) -> Tuple[int, int, int]:
+        return book['id'], book['available_copies'], book['total_copies']
+
+    def render(self, book: Dict) -> Markup:
+        """Get the row for a book, rendering and caching it on a miss."""
+        key = self.key(book)
+        with self._lock:
+            row = self._rows.get(key)
+            if row is not None:
+                self._rows.move_to_end(key)
+                self.hits += 1
+                return row
+            self.misses += 1
+
+        row = Markup(current_app.jinja_env.get_template('_catalog_row.html').render(book=book))
+        with self._lock:
+            self._rows[key] = row
+            while len(self._rows) > self.max_entries:
+                self._rows.popitem(last=False)
+        return row
+
+    def clear(self) -> None:
+        with self._lock:
+            self._rows.clear()
+
+
+row_cache = RowFragmentCache()
+
+
+def _catalog_rows(books: Iterator[Dict]) -> Iterator[Markup]:
+    for book in books:
+        yield row_cache.render(book)
+
+
 @catalog_bp.route('/')
 def index():
     """Home page redirects to catalog."""
@@ -18,9 +82,17 @@ def catalog():
     """
     Display all books in the catalog.
     Implements R2: Book Catalog Display
+
+    The page is streamed: rows are read in chunks and sent as they are
+    rendered, with unchanged rows served from the fragment cache.
+    Flashed messages are taken from the session here, before the headers
+    (and session cookie) go out with the first chunk.
     """
-    books = get_all_books()
-    return render_template('catalog.html', books=books)
+    messages = get_flashed_messages(with_categories=True)
+    books = iter_books()
+    first = next(books, None)
+    rows = _catalog_rows(chain([first], books)) if first else iter(())
+    return stream_template('catalog.html', rows=rows, has_books=first is not None, flashed_messages=messages)
 
 @catalog_bp.route('/add_book', methods=['GET', 'POST'])
 def add_book():
@@ -3,7 +3,7 @@ Search Routes - Book search functionality
 """
 
 from flask import Blueprint, render_template, request, flash
-from library_service import search_books_in_catalog
+from services.library_service import search_books_in_catalog
 
 search_bp = Blueprint('search', __name__)
 
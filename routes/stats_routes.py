@@ -0,0 +1,41 @@
+"""
+Stats Routes - Circulation analytics endpoints
+Served entirely from the circulation rollup tables
+"""
+
+from flask import Blueprint, jsonify, request
+from services.stats_service import (
+    get_top_books, get_daily_stats, get_summary, get_patron_stats, DEFAULT_TOP_BOOKS, DEFAULT_STATS_DAYS
+)
+
+stats_bp = Blueprint('stats', __name__, url_prefix='/api/stats')
+
+def _int_arg(name, default):
+    """Read an integer query parameter; None if it is not an integer."""
+    try:
+        return int(request.args.get(name, default))
+    except ValueError:
+        return None
+
+@stats_bp.route('/summary')
+def summary():
+    """Utilization, open and overdue loans, and late-return rate."""
+    return jsonify(get_summary())
+
+@stats_bp.route('/top_books')
+def top_books():
+    """Most borrowed titles (?limit=N)."""
+    result = get_top_books(_int_arg('limit', DEFAULT_TOP_BOOKS))
+    return jsonify(result), 400 if 'error' in result else 200
+
+@stats_bp.route('/daily')
+def daily():
+    """Checkouts and returns per day for the last N days (?days=N)."""
+    result = get_daily_stats(_int_arg('days', DEFAULT_STATS_DAYS))
+    return jsonify(result), 400 if 'error' in result else 200
+
+@stats_bp.route('/patrons/<patron_id>')
+def patron(patron_id):
+    """A patron's lifetime circulation counts."""
+    result = get_patron_stats(patron_id)
+    return jsonify(result), 400 if 'error' in result else 200
@@ -0,0 +1,69 @@
+"""
+Throttling - Per-patron and per-client rate limits on hot endpoints
+Checked in a before_request hook, so rejected requests never reach the database.
+"""
+
+import math
+
+from flask import current_app, jsonify, request
+from services.rate_limit import KeyedRateLimiter, MemoryBucketStore, SQLiteBucketStore
+
+# Endpoint -> (requests per second, burst) for each client address, and for
+# each patron on endpoints that name one
+DEFAULT_RATE_LIMITS = {
+    'search.search_books': (5.0, 20),
+    'api.search_books_api': (10.0, 30),
+    'api.get_late_fee': (10.0, 30),
+    'api.get_late_fees_batch': (2.0, 10),
+    'api_async.search_books_api': (10.0, 30),
+    'api_async.get_late_fee': (10.0, 30),
+    'borrowing.borrow_book': (1.0, 5),
+}
+
+# Endpoint -> (requests per second, burst) for each client address where it
+# differs from RATE_LIMITS: looser on per-patron endpoints, since one desk or
+# kiosk address serves many patrons
+DEFAULT_CLIENT_RATE_LIMITS = {
+    'api.get_late_fee': (50.0, 100),
+    'api_async.get_late_fee': (50.0, 100),
+    'borrowing.borrow_book': (10.0, 30),
+}
+
+
+def _patron_key():
+    """The patron the request names, if any."""
+    patron_id = (request.view_args or {}).get('patron_id')
+    if patron_id is None and request.method == 'POST':
+        patron_id = request.form.get('patron_id', '').strip()
+    return f'patron:{patron_id}' if patron_id else None
+
+
+def _check_rate_limit():
+    limit = current_app.config['RATE_LIMITS'].get(request.endpoint)
+    if limit is None:
+        return None
+    limiter = current_app.extensions['rate_limiter']
+    # Every request draws on its client's bucket, so walking patron IDs does not escape the limit
+    rate, burst = current_app.config['CLIENT_RATE_LIMITS'].get(request.endpoint, limit)
+    allowed, retry_after = limiter.hit(f'{request.endpoint}|ip:{request.remote_addr}', rate, burst)
+    patron_key = _patron_key()
+    if allowed and patron_key:
+        rate, burst = limit
+        allowed, retry_after = limiter.hit(f'{request.endpoint}|{patron_key}', rate, burst)
+    if allowed:
+        return None
+
+    headers = {'Retry-After': str(max(1, math.ceil(retry_after)))}
+    if request.path.startswith('/api/'):
+        return jsonify({'error': 'Too many requests. Please slow down.'}), 429, headers
+    return 'Too many requests. Please slow down.', 429, headers
+
+
+def register_rate_limits(app):
+    """Install the rate limiter on the app if RATE_LIMIT_ENABLED is set."""
+    if not app.config['RATE_LIMIT_ENABLED']:
+        return
+    store_path = app.config['RATE_LIMIT_STORE']
+    store = SQLiteBucketStore(store_path) if store_path else MemoryBucketStore()
+    app.extensions['rate_limiter'] = KeyedRateLimiter(store)
+    app.before_request(_check_rate_limit)
@@ -0,0 +1,102 @@
+"""
+Async Library Service Module - Business logic for the async JSON API
+Same rules and results as library_service, with repository reads awaited
+on the async connection pool
+"""
+
+import asyncio
+from typing import Dict, List, Optional
+
+import async_database
+from repositories import get_loan_amount_paid
+from services.library_service import (
+    compute_late_fee, fee_still_owed, search_books_filtered, DEFAULT_SEARCH_LIMIT
+)
+
+
+async def calculate_late_fee_for_book(patron_id: str, book_id: int) -> Dict:
+    """
+    Calculate late fees for a specific book.
+    Async counterpart of library_service.calculate_late_fee_for_book; the
+    book and the patron's loans are fetched concurrently.
+
+    Returns:
+        dict: {'fee_amount': float, 'days_overdue': int, 'status': str}
+    """
+    if not patron_id or not patron_id.isdigit() or len(patron_id) != 6:
+        return {
+            "fee_amount": 0.00,
+            "days_overdue": 0,
+            "status": "Invalid patron ID"
+        }
+
+    book, loans = await asyncio.gather(
+        async_database.get_book_by_id(book_id),
+        async_database.get_patron_borrowed_books(patron_id)
+    )
+
+    if not book:
+        return {
+            "fee_amount": 0.00,
+            "days_overdue": 0,
+            "status": "Book Doesn't Exist"
+        }
+
+    loan = next((loan for loan in loans if loan["book_id"] == book_id), None)
+    if loan is None:
+        return {
+            "fee_amount": 0.00,
+            "days_overdue": 0,
+            "status": "Book not borrowed by patron."
+        }
+
+    fee, days_overdue = compute_late_fee(loan["due_date"])
+    amount_paid = await async_database.run_query(get_loan_amount_paid, loan["borrow_record_id"])
+    return {
+        "fee_amount": fee_still_owed(fee, amount_paid),
+        "days_overdue": days_overdue,
+        "amount_paid": amount_paid,
+        "borrow_record_id": loan["borrow_record_id"],
+        "status": "Completed"
+    }
+
+
+async def search_books(title: Optional[str] = None, author: Optional[str] = None,
+                       author_prefix: Optional[str] = None, isbn: Optional[str] = None,
+                       available_only: bool = False, limit: int = DEFAULT_SEARCH_LIMIT,
+                       cursor: Optional[str] = None) -> Dict:
+    """Async counterpart of library_service.search_books_filtered."""
+    return await async_database.run_query(
+        search_books_filtered, title=title, author=author, author_prefix=author_prefix,
+        isbn=isbn, available_only=available_only, limit=limit, cursor=cursor
+    )
+
+
+async def get_patron_loans(patron_id: str) -> Optional[List[Dict]]:
+    """
+    Get a patron's open loans with the current fee on each.
+
+    Returns:
+        list of dicts, or None if the patron ID is invalid
+    """
+    if not patron_id or not patron_id.isdigit() or len(patron_id) != 6:
+        return None
+
+    open_loans = await async_database.get_patron_borrowed_books(patron_id)
+    amounts_paid = await asyncio.gather(*(
+        async_database.run_query(get_loan_amount_paid, loan["borrow_record_id"]) for loan in open_loans
+    ))
+
+    loans = []
+    for loan, amount_paid in zip(open_loans, amounts_paid):
+        fee, days_overdue = compute_late_fee(loan["due_date"])
+        fee = fee_still_owed(fee, amount_paid)
+        loans.append({
+            "book_id": loan["book_id"],
+            "title": loan["title"],
+            "author": loan["author"],
+            "due_date": loan["due_date"].strftime("%Y-%m-%d"),
+            "days_overdue": days_overdue,
+            "late_fee": fee
+        })
+    return loans
@@ -0,0 +1,156 @@
+"""
+Backup Service Module - Online backups through the SQLite backup API
+Copies the live database a batch of pages at a time, pausing between
+batches, verifies the copy and keeps the newest few backups.
+"""
+
+import logging
+import os
+import sqlite3
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+import database
+from database import get_db_connection
+from services.maintenance import OffPeakScheduler
+
+logger = logging.getLogger(__name__)
+
+BACKUP_JOB = "backup_last_run"
+BACKUP_PREFIX = "library-"
+BACKUP_SUFFIX = ".db"
+DEFAULT_BACKUP_DIR = "backups"
+DEFAULT_WINDOW = "01:00-02:00"
+DEFAULT_KEEP = 7
+# Pages copied per step (4 KiB each) and the pause that lets writers in between
+PAGES_PER_STEP = 256
+STEP_PAUSE = 0.01
+
+
+def list_backups(backup_dir: str) -> List[str]:
+    """Backup files in `backup_dir`, oldest first."""
+    if not os.path.isdir(backup_dir):
+        return []
+    return sorted(name for name in os.listdir(backup_dir)
+                  if name.startswith(BACKUP_PREFIX) and name.endswith(BACKUP_SUFFIX))
+
+
+def verify_backup(path: str) -> str:
+    """Run an integrity check on a backup; returns 'ok' or the first problem."""
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        return conn.execute("PRAGMA integrity_check").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def rotate_backups(backup_dir: str, keep: int) -> List[str]:
+    """Delete all but the newest `keep` backups; returns the removed names."""
+    backups = list_backups(backup_dir)
+    removed = backups[:max(0, len(backups) - keep)]
+    for name in removed:
+        os.remove(os.path.join(backup_dir, name))
+    return removed
+
+
+def create_backup(backup_dir: str = DEFAULT_BACKUP_DIR, keep: int = DEFAULT_KEEP,
+                  pages: int = PAGES_PER_STEP, pause: float = STEP_PAUSE,
+                  now: Optional[datetime] = None) -> Dict:
+    """
+    Back up the live database without stopping the service.
+
+    In WAL mode the copy is taken inside one read transaction: it is a
+    consistent snapshot, and writers carry on meanwhile. Otherwise each step
+    takes a brief shared lock, and SQLite restarts the copy if a writer
+    changes the database mid-way.
+
+    Args:
+        backup_dir: where backups are written
+        keep: number of backups to retain
+        pages: pages copied per step
+        pause: seconds slept between steps
+
+    Returns:
+        dict: {'status', 'path', 'pages', 'seconds', 'removed'}
+    """
+    if keep <= 0 or pages <= 0 or pause < 0:
+        return {"status": "Invalid keep, page batch or pause"}
+
+    os.makedirs(backup_dir, exist_ok=True)
+    now = now or datetime.now()
+    path = os.path.join(backup_dir, f"{BACKUP_PREFIX}{now.strftime('%Y%m%d-%H%M%S')}{BACKUP_SUFFIX}")
+    partial = path + ".partial"
+    if os.path.exists(partial):
+        os.remove(partial)
+
+    started = time.perf_counter()
+    copied = {"pages": 0}
+
+    def progress(status, remaining, total):
+        copied["pages"] = total - remaining
+        if remaining and pause:
+            time.sleep(pause)
+
+    source = get_db_connection()
+    target = sqlite3.connect(partial)
+    try:
+        snapshot = source.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        if snapshot:
+            source.execute("BEGIN")
+            source.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchall()
+        source.backup(target, pages=pages, progress=progress)
+        if snapshot:
+            source.rollback()
+    except sqlite3.Error as e:
+        target.close()
+        os.remove(partial)
+        logger.error("Backup of %s failed: %s", database.DATABASE, e)
+        return {"status": f"Backup failed: {e}"}
+    finally:
+        source.close()
+    # A backup is a standalone copy; keep it in rollback-journal mode
+    target.execute("PRAGMA journal_mode = DELETE")
+    target.close()
+
+    integrity = verify_backup(partial)
+    if integrity != "ok":
+        os.remove(partial)
+        logger.error("Backup failed its integrity check: %s", integrity)
+        return {"status": f"Backup failed its integrity check: {integrity}"}
+    os.replace(partial, path)
+
+    removed = rotate_backups(backup_dir, keep)
+    seconds = round(time.perf_counter() - started, 3)
+    logger.info("Backed up %s to %s (%d pages) in %.3fs", database.DATABASE, path, copied["pages"], seconds)
+    return {"status": "Completed", "path": path, "pages": copied["pages"], "seconds": seconds,
+            "removed": removed}
+
+
+class BackupScheduler(OffPeakScheduler):
+    """Daily online backup in the off-peak window."""
+
+    job_name = BACKUP_JOB
+
+    def __init__(self, backup_dir: str = DEFAULT_BACKUP_DIR, keep: int = DEFAULT_KEEP,
+                 window: str = DEFAULT_WINDOW, interval: timedelta = timedelta(days=1),
+                 poll_seconds: float = 60.0, clock: Callable[[], datetime] = datetime.now):
+        super().__init__(window, interval, poll_seconds, clock)
+        self.backup_dir = backup_dir
+        self.keep = keep
+
+    def run_job(self) -> Dict:
+        return create_backup(self.backup_dir, self.keep)
+
+
+_scheduler: Optional[BackupScheduler] = None
+
+
+def start_backup_scheduler(backup_dir: str = DEFAULT_BACKUP_DIR, keep: int = DEFAULT_KEEP,
+                           window: str = DEFAULT_WINDOW) -> BackupScheduler:
+    """Start this process's backup scheduler (once)."""
+    global _scheduler
+    if _scheduler is None or not _scheduler.is_running():
+        _scheduler = BackupScheduler(backup_dir, keep, window)
+        _scheduler.start()
+    return _scheduler
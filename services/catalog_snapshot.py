@@ -0,0 +1,32 @@
+"""
+Catalog Snapshot Module - Export the catalog for read-only search nodes
+Writes the books table as a memory-mapped snapshot file (see
+repositories.snapshot). Nodes running with REPOSITORY='snapshot' pick up
+a new export within their check interval. The snapshot records the
+catalog change sequence number it reflects, so a node can follow the
+change feed from that point.
+"""
+
+import time
+from typing import Dict
+
+from database import get_catalog_with_latest_change
+from repositories.snapshot import SnapshotError, write_catalog_snapshot
+
+DEFAULT_SNAPSHOT_PATH = "catalog.snap"
+
+
+def export_catalog_snapshot(path: str = DEFAULT_SNAPSHOT_PATH) -> Dict:
+    """
+    Write the current catalog to `path`, replacing any previous snapshot.
+
+    Returns:
+        dict: {'status', 'path', 'books', 'bytes', 'version', 'seconds'}
+    """
+    started = time.perf_counter()
+    version, books = get_catalog_with_latest_change()
+    try:
+        written = write_catalog_snapshot(path, books, version)
+    except (OSError, SnapshotError) as e:
+        return {"status": f"Snapshot export failed: {e}"}
+    return dict(written, status="Completed", version=version, seconds=round(time.perf_counter() - started, 3))
@@ -0,0 +1,70 @@
+"""
+Change Feed Module - Incremental catalog sync for downstream caches
+Consumers take a snapshot once, then follow the catalog_changes log from
+the sequence number they last saw, optionally long-polling for new changes.
+"""
+
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional
+
+from database import get_catalog_changes, get_latest_catalog_change, get_job_state, prune_catalog_changes
+
+DEFAULT_CHANGE_LIMIT = 500
+MAX_CHANGE_LIMIT = 1000
+MAX_WAIT_SECONDS = 25.0
+POLL_INTERVAL = 0.25
+CHANGE_RETENTION = timedelta(days=7)
+PRUNED_STATE = "catalog_changes_pruned_through"
+
+
+def get_catalog_changes_since(since: Optional[int], limit: int = DEFAULT_CHANGE_LIMIT, wait: float = 0.0,
+                              sleep: Callable[[float], None] = time.sleep) -> Dict:
+    """
+    Catalog changes after sequence number `since`, one entry per book
+    carrying its current row (None if deleted).
+
+    Args:
+        since: last sequence number the consumer applied; None just reports
+               the latest number (take it before snapshotting the catalog)
+        limit: changes read per call (capped at MAX_CHANGE_LIMIT)
+        wait: seconds to wait for a change if there are none yet (long poll)
+
+    Returns:
+        dict: {'changes', 'next_since', 'has_more'}, {'latest'} when since is None,
+              or {'error', 'resync': True} if changes after `since` were pruned
+    """
+    if since is None:
+        return {"latest": get_latest_catalog_change()}
+    if since < 0 or limit <= 0 or wait < 0:
+        return {"error": "since, limit and wait must not be negative; limit must be positive."}
+    limit = min(limit, MAX_CHANGE_LIMIT)
+    wait = min(wait, MAX_WAIT_SECONDS)
+
+    if since < int(get_job_state(PRUNED_STATE) or 0):
+        return {"error": "Changes after this point were pruned. Resynchronize from a snapshot.",
+                "resync": True, "latest": get_latest_catalog_change()}
+
+    deadline = time.monotonic() + wait
+    while get_latest_catalog_change() <= since and time.monotonic() < deadline:
+        sleep(min(POLL_INTERVAL, max(0.0, deadline - time.monotonic())))
+
+    rows = get_catalog_changes(since, limit)
+    # Later changes to a book supersede earlier ones in the same batch
+    latest_by_book = {}
+    for row in rows:
+        latest_by_book.pop(row["book_id"], None)
+        latest_by_book[row["book_id"]] = row
+
+    return {
+        "changes": [{"seq": row["seq"], "book_id": row["book_id"], "deleted": row["book"] is None,
+                     "book": row["book"]} for row in latest_by_book.values()],
+        "next_since": rows[-1]["seq"] if rows else since,
+        "has_more": len(rows) == limit,
+    }
+
+
+def prune_catalog_change_log(retention: timedelta = CHANGE_RETENTION, now: Optional[datetime] = None) -> Optional[int]:
+    """Drop changes older than `retention`; consumers further behind must resync."""
+    now = now or datetime.now()
+    return prune_catalog_changes(now - retention, PRUNED_STATE)
@@ -0,0 +1,74 @@
+"""
+Fee Ledger Service Module - Persisted late-fee accounting
+Accrues late fees into the fee ledger incrementally and reads patron
+balances kept current by the ledger's balance trigger
+"""
+
+from datetime import datetime
+from typing import Dict, Optional
+from database import get_job_state, get_fee_accrual_candidates, apply_fee_accruals
+from repositories import get_patron_balance
+from services.library_service import compute_late_fee
+
+ACCRUAL_JOB = "fee_accrual_last_run"
+MAX_LATE_FEE = 15.00
+
+
+def accrue_late_fees(as_of: Optional[datetime] = None) -> Dict:
+    """
+    Bring the fee ledger up to date (run daily).
+
+    Only loans whose fee can still grow are examined: open loans past due,
+    loans whose accrual is not settled yet, and late loans returned since
+    the previous run. Each gets an accrual entry for the increase since it
+    was last accrued. A loan is settled once it is returned or its fee
+    reaches the R5 maximum.
+
+    Returns:
+        dict: {'status', 'loans_examined', 'entries', 'amount_accrued'}
+    """
+    if as_of is None:
+        as_of = datetime.now()
+
+    returned_since = get_job_state(ACCRUAL_JOB) or ""
+    candidates = get_fee_accrual_candidates(as_of, returned_since)
+
+    accruals = []
+    for loan in candidates:
+        due_date = datetime.fromisoformat(loan["due_date"])
+        return_date = datetime.fromisoformat(loan["return_date"]) if loan["return_date"] else None
+        charged_until = min(as_of, return_date) if return_date else as_of
+
+        fee, _ = compute_late_fee(due_date, charged_until)
+        accruals.append({
+            "borrow_record_id": loan["id"],
+            "patron_id": loan["patron_id"],
+            "book_id": loan["book_id"],
+            "delta": round(fee - loan["accrued_amount"], 2),
+            "accrued_amount": max(fee, loan["accrued_amount"]),
+            "settled": return_date is not None or fee >= MAX_LATE_FEE
+        })
+
+    if not apply_fee_accruals(accruals, as_of, ACCRUAL_JOB):
+        return {"status": "Database error"}
+
+    increases = [accrual["delta"] for accrual in accruals if accrual["delta"] > 0]
+    return {
+        "status": "Completed",
+        "loans_examined": len(candidates),
+        "entries": len(increases),
+        "amount_accrued": round(sum(increases), 2)
+    }
+
+
+def get_patron_fee_balance(patron_id: str) -> Dict:
+    """
+    Get what a patron owes according to the fee ledger.
+
+    Returns:
+        dict: {'patron_id': str, 'balance': float} or {'error': message}
+    """
+    if not patron_id or not patron_id.isdigit() or len(patron_id) != 6:
+        return {"error": "Invalid patron ID. Must be exactly 6 digits."}
+
+    return {"patron_id": patron_id, "balance": round(get_patron_balance(patron_id), 2)}
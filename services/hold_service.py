@@ -0,0 +1,136 @@
+"""
+Hold Service Module - Reservation queue business logic
+Lets patrons queue for unavailable books; returned copies are set aside
+for the next hold instead of going back on the shelf
+"""
+
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+from database import (
+    get_book_by_id, insert_hold, get_active_hold,
+    get_hold_queue_position, cancel_hold_and_release, expire_holds
+)
+
+# Days a patron has to collect a copy set aside for them
+HOLD_PICKUP_DAYS = 3
+MAX_HOLD_PRIORITY = 9
+
+# Why insert_hold refused a hold
+_HOLD_REFUSALS = {
+    'available': "This book is available now. Borrow it instead of placing a hold.",
+    'borrowed': "You already have this book borrowed.",
+    'held': "You already have a hold on this book.",
+}
+
+
+def _valid_patron_id(patron_id: str) -> bool:
+    return bool(patron_id) and patron_id.isdigit() and len(patron_id) == 6
+
+
+def pickup_deadline(now: datetime) -> datetime:
+    """When a hold made ready at `now` lapses if not collected."""
+    return now + timedelta(days=HOLD_PICKUP_DAYS)
+
+
+def place_hold(patron_id: str, book_id: int, priority: int = 0,
+               expires_in_days: Optional[int] = None) -> Tuple[bool, str]:
+    """
+    Place a hold on a book that has no available copies.
+
+    Args:
+        patron_id: 6-digit library card ID
+        book_id: ID of the book to reserve
+        priority: 0 (normal) to MAX_HOLD_PRIORITY; higher is served first,
+                  ties are served in the order holds were placed
+        expires_in_days: drop the hold if still waiting after this many days
+
+    Returns:
+        tuple: (success: bool, message: str)
+    """
+    if not _valid_patron_id(patron_id):
+        return False, "Invalid patron ID. Must be exactly 6 digits."
+
+    if not isinstance(priority, int) or not 0 <= priority <= MAX_HOLD_PRIORITY:
+        return False, f"Priority must be an integer from 0 to {MAX_HOLD_PRIORITY}."
+
+    if expires_in_days is not None and (not isinstance(expires_in_days, int) or expires_in_days <= 0):
+        return False, "Hold expiry must be a positive number of days."
+
+    book = get_book_by_id(book_id)
+    if not book:
+        return False, "Book not found."
+
+    now = datetime.now()
+    expires_at = now + timedelta(days=expires_in_days) if expires_in_days else None
+    # Checked and inserted in one transaction, so a return or a second
+    # submit landing in between cannot slip past the checks
+    hold_id = insert_hold(patron_id, book_id, priority, now, expires_at)
+    if hold_id is None:
+        return False, "Database error occurred while placing the hold."
+    if hold_id in _HOLD_REFUSALS:
+        return False, _HOLD_REFUSALS[hold_id]
+
+    position = get_hold_queue_position({'id': hold_id, 'book_id': book_id, 'priority': priority})
+    return True, f'Hold placed on "{book["title"]}". You are number {position} in the queue.'
+
+
+def get_hold_status(patron_id: str, book_id: int) -> Dict:
+    """
+    Report where a patron's hold on a book stands.
+
+    Returns:
+        dict: {'status': 'waiting'|'ready'|'none', 'position': int or None,
+               'pickup_by': 'YYYY-MM-DD' or None}
+    """
+    if not _valid_patron_id(patron_id):
+        return {"status": "Invalid patron ID", "position": None, "pickup_by": None}
+
+    hold = get_active_hold(patron_id, book_id)
+    if not hold:
+        return {"status": "none", "position": None, "pickup_by": None}
+
+    if hold['status'] == 'ready':
+        pickup_by = datetime.fromisoformat(hold['expires_at']).strftime("%Y-%m-%d")
+        return {"status": "ready", "position": None, "pickup_by": pickup_by}
+
+    return {"status": "waiting", "position": get_hold_queue_position(hold), "pickup_by": None}
+
+
+def cancel_hold(patron_id: str, book_id: int) -> Tuple[bool, str]:
+    """
+    Cancel a patron's hold. A copy already set aside passes to the next hold.
+
+    Returns:
+        tuple: (success: bool, message: str)
+    """
+    if not _valid_patron_id(patron_id):
+        return False, "Invalid patron ID. Must be exactly 6 digits."
+
+    hold = get_active_hold(patron_id, book_id)
+    if not hold:
+        return False, "No active hold on this book."
+
+    now = datetime.now()
+    if not cancel_hold_and_release(hold['id'], now, pickup_deadline(now)):
+        return False, "Database error occurred while cancelling the hold."
+
+    return True, "Hold cancelled."
+
+
+def sweep_expired_holds(now: Optional[datetime] = None) -> Dict:
+    """
+    Expire lapsed holds and pass their reserved copies down the queue.
+    Intended to run periodically (see `flask holds sweep`).
+
+    Returns:
+        dict: counts of expired waiting holds, expired ready holds and
+              copies reallocated to the next hold
+    """
+    if now is None:
+        now = datetime.now()
+
+    counts = expire_holds(now, pickup_deadline(now))
+    if counts is None:
+        return {"status": "Database error"}
+
+    return {"status": "Completed", **counts}
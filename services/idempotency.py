@@ -0,0 +1,79 @@
+"""
+Idempotency Module - Replay-safe payments and refunds
+A client that times out and retries with the same idempotency key gets
+the stored outcome of the first request instead of a second gateway call
+"""
+
+import hashlib
+import json
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional, Tuple
+
+from database import claim_idempotency_key, complete_idempotency_key, release_idempotency_key
+
+MAX_KEY_LENGTH = 255
+# An in-flight claim older than this belongs to a request that died
+IN_FLIGHT_TIMEOUT = timedelta(minutes=5)
+
+KEY_INVALID = f"Idempotency key must be 1 to {MAX_KEY_LENGTH} characters."
+KEY_IN_PROGRESS = "A request with this idempotency key is still in progress."
+KEY_REUSED = "This idempotency key was already used for a different request."
+KEY_UNAVAILABLE = "Unable to record the idempotency key. Please retry."
+
+
+def _request_hash(request: Dict) -> str:
+    return hashlib.sha256(json.dumps(request, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def run_idempotent(action: str, key: Optional[str], request: Dict,
+                   execute: Callable[[], Tuple[tuple, bool]],
+                   error: Callable[[str], tuple]) -> tuple:
+    """
+    Run `execute` at most once per (action, key).
+
+    Args:
+        action: namespace for keys ('payment', 'refund')
+        key: client-supplied key, or None to run without deduplication
+        request: the request's parameters; reusing a key for different
+                 parameters is rejected
+        execute: returns (outcome, definitive); an outcome that is not
+                 definitive (the gateway could not be reached) is not
+                 stored, so the client may retry with the same key.
+                 definitive is None when the outcome is unknown (the
+                 gateway timed out): the key stays in flight, so retries
+                 are turned away until the claim goes stale
+        error: builds an outcome tuple from an error message
+
+    Returns:
+        the outcome tuple, replayed from storage for a repeated key
+    """
+    if key is None:
+        return execute()[0]
+    if not isinstance(key, str) or not key.strip() or len(key) > MAX_KEY_LENGTH:
+        return error(KEY_INVALID)
+
+    now = datetime.now()
+    request_hash = _request_hash(request)
+    try:
+        existing = claim_idempotency_key(action, key, request_hash, now, now - IN_FLIGHT_TIMEOUT)
+    except Exception:
+        return error(KEY_UNAVAILABLE)
+
+    if existing is not None:
+        if existing["request_hash"] != request_hash:
+            return error(KEY_REUSED)
+        if existing["status"] != "completed":
+            return error(KEY_IN_PROGRESS)
+        return tuple(json.loads(existing["response"]))
+
+    try:
+        outcome, definitive = execute()
+    except Exception:
+        release_idempotency_key(action, key)
+        raise
+
+    if definitive:
+        complete_idempotency_key(action, key, json.dumps(list(outcome)), datetime.now())
+    elif definitive is not None:
+        release_idempotency_key(action, key)
+    return outcome
@@ -3,14 +3,37 @@ Library Service Module - Business Logic Functions
 Contains all the core business logic for the Library Management System
 """
 
-from datetime import datetime, timedelta
+import base64
+import json
+import logging
+from datetime import date, datetime, timedelta
 from typing import Dict, List, Optional, Tuple
-from database import (
+from repositories import (
     get_book_by_id, get_book_by_isbn, get_patron_borrow_count,
     insert_book, insert_borrow_record, update_book_availability,
-    update_borrow_record_return_date, get_all_books, get_patron_borrowed_books, get_db_connection
+    get_patron_borrowed_books, search_books_by_field, search_books_page,
+    get_books_by_ids, insert_borrow_records_batch, update_borrow_records_return_batch,
+    get_active_hold, insert_borrow_record_for_hold, return_book_and_allocate,
+    insert_fee_entry, get_fee_entry_by_transaction, get_loan_amount_paid, get_patron_balance,
+    get_patron_loan_version, get_open_loans_with_paid
 )
-from services.payment_service import PaymentGateway
+from services.hold_service import pickup_deadline
+from services.idempotency import run_idempotent
+from services.payment_service import PaymentGateway, PaymentGatewayTimeout
+from services.search_index import fuzzy_match_books
+from services.status_cache import status_report_cache, invalidate_patron_status, warm_status_cache
+
+logger = logging.getLogger(__name__)
+
+MAX_BORROW_LIMIT = 5
+BORROW_LIMIT_MESSAGE = f"You have reached the maximum borrowing limit of {MAX_BORROW_LIMIT} books."
+MAX_BATCH_SIZE = 20
+MAX_LATE_FEE_BATCH = 1000
+
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+# Matches beyond this are not counted; the total is reported as an estimate
+SEARCH_COUNT_CAP = 1000
 
 
 def add_book_to_catalog(title: str, author: str, isbn: str, total_copies: int) -> Tuple[bool, str]:
@@ -58,6 +81,11 @@ def add_book_to_catalog(title: str, author: str, isbn: str, total_copies: int) -
     else:
         return False, "Database error occurred while adding the book."
 
+def remaining_borrow_allowance(patron_id: str) -> int:
+    """How many more books a patron may borrow under the R3 limit (desk and kiosk alike)."""
+    return max(0, MAX_BORROW_LIMIT - get_patron_borrow_count(patron_id))
+
+
 def borrow_book_by_patron(patron_id: str, book_id: int) -> Tuple[bool, str]:
     """
     Allow a patron to borrow a book.
@@ -79,23 +107,32 @@ def borrow_book_by_patron(patron_id: str, book_id: int) -> Tuple[bool, str]:
     if not book:
         return False, "Book not found."
     
-    if book['available_copies'] <= 0:
+    # A copy set aside for this patron's hold can be borrowed even when none are on the shelf
+    hold = get_active_hold(patron_id, book_id)
+    ready_hold = hold if hold and hold['status'] == 'ready' else None
+    
+    if book['available_copies'] <= 0 and not ready_hold:
         return False, "This book is currently not available."
     
     # Check patron's current borrowed books count
-    current_borrowed = get_patron_borrow_count(patron_id)
-    
-    if current_borrowed > 5:
-        return False, "You have reached the maximum borrowing limit of 5 books."
+    if remaining_borrow_allowance(patron_id) <= 0:
+        return False, BORROW_LIMIT_MESSAGE
     
     # Create borrow record
     borrow_date = datetime.now()
     due_date = borrow_date + timedelta(days=14)
     
+    if ready_hold:
+        if not insert_borrow_record_for_hold(ready_hold['id'], patron_id, book_id, borrow_date, due_date):
+            return False, "Database error occurred while creating borrow record."
+        invalidate_patron_status(patron_id)
+        return True, f'Successfully borrowed "{book["title"]}" from your hold. Due date: {due_date.strftime("%Y-%m-%d")}.'
+    
     # Insert borrow record and update availability
     borrow_success = insert_borrow_record(patron_id, book_id, borrow_date, due_date)
     if not borrow_success:
         return False, "Database error occurred while creating borrow record."
+    invalidate_patron_status(patron_id)
     
     availability_success = update_book_availability(book_id, -1)
     if not availability_success:
@@ -135,19 +172,175 @@ def return_book_by_patron(patron_id: str, book_id: int) -> Tuple[bool, str]:
     if book_id not in book_ids:
         return (False, "Book is not borrowed by this patron")  
     
-    update_avail = update_book_availability(book_id, 1)
-    update_borrow = update_borrow_record_return_date(patron_id, book_id, datetime.now())
+    # Close the loan and hand the copy to the next hold (or the shelf) in one transaction
+    return_date = datetime.now()
+    outcome = return_book_and_allocate(patron_id, book_id, return_date, pickup_deadline(return_date))
 
-    if not update_avail or not update_borrow:
+    if not outcome or not outcome["returned"]:
         return (False, "DB error")
+    invalidate_patron_status(patron_id)
+    
+    held_note = " Copy reserved for the next patron on hold." if outcome["hold"] else ""
     
     fees = calculate_late_fee_for_book(patron_id, book_id)
     
     if fees["fee_amount"] > 0:
         return (True, (f'Late by {fees["days_overdue"]} days. '
-            f'Fee owed: ${fees["fee_amount"]:.2f}.'))
+            f'Fee owed: ${fees["fee_amount"]:.2f}.' + held_note))
+    
+    return (True, "Book returned succesfully and on time!" + held_note)
+
+
+def _validate_batch(patron_id: str, book_ids: List[int]) -> Optional[str]:
+    """Return an error message if a circulation batch request is malformed."""
+    if not patron_id or not patron_id.isdigit() or len(patron_id) != 6:
+        return "Invalid patron ID. Must be exactly 6 digits."
+
+    if not isinstance(book_ids, list) or not book_ids:
+        return "At least one book ID is required."
+
+    if len(book_ids) > MAX_BATCH_SIZE:
+        return f"A batch may contain at most {MAX_BATCH_SIZE} books."
+
+    if not all(isinstance(book_id, int) and not isinstance(book_id, bool) for book_id in book_ids):
+        return "Book IDs must be integers."
+
+    return None
+
+
+def borrow_books_batch(patron_id: str, book_ids: List[int]) -> Tuple[bool, str, List[Dict]]:
+    """
+    Borrow a stack of books for one patron (self-checkout kiosks).
+    Applies the R3 rules once for the whole batch and writes every loan in
+    a single transaction.
+    
+    Args:
+        patron_id: 6-digit library card ID
+        book_ids: IDs of the books to borrow, in scan order
+        
+    Returns:
+        tuple: (success: bool, message: str, results: list of per-book dicts)
+    """
+    error = _validate_batch(patron_id, book_ids)
+    if error:
+        return False, error, []
+
+    books = get_books_by_ids(book_ids)
+    remaining = remaining_borrow_allowance(patron_id)
+
+    # Copies set aside for this patron's holds can be borrowed even when none are on the shelf
+    ready_holds = {}
+    for book_id in set(books):
+        hold = get_active_hold(patron_id, book_id)
+        if hold and hold['status'] == 'ready':
+            ready_holds[book_id] = hold['id']
+
+    results = []
+    accepted = []
+    for book_id in book_ids:
+        book = books.get(book_id)
+        if book_id in accepted:
+            message = "Book appears more than once in this batch."
+        elif not book:
+            message = "Book not found."
+        elif book['available_copies'] <= 0 and book_id not in ready_holds:
+            message = "This book is currently not available."
+        elif len(accepted) >= remaining:
+            message = BORROW_LIMIT_MESSAGE
+        else:
+            accepted.append(book_id)
+            message = None
+        results.append({"book_id": book_id, "success": False, "message": message})
+
+    borrow_date = datetime.now()
+    due_date = borrow_date + timedelta(days=14)
+
+    borrowed = []
+    if accepted:
+        borrowed = insert_borrow_records_batch(patron_id, accepted, borrow_date, due_date,
+                                               {book_id: ready_holds[book_id] for book_id in accepted
+                                                if book_id in ready_holds})
+        if borrowed is None:
+            return False, "Database error occurred while creating borrow records.", []
+        invalidate_patron_status(patron_id)
+
+    for result in results:
+        if result["message"] is not None:
+            continue
+        if result["book_id"] in borrowed:
+            result["success"] = True
+            result["message"] = f'Successfully borrowed "{books[result["book_id"]]["title"]}".'
+            result["due_date"] = due_date.strftime("%Y-%m-%d")
+        else:
+            result["message"] = "This book is currently not available."
+
+    return bool(borrowed), f"Borrowed {len(borrowed)} of {len(book_ids)} books.", results
+
+
+def return_books_batch(patron_id: str, book_ids: List[int]) -> Tuple[bool, str, List[Dict]]:
+    """
+    Return a stack of books for one patron in a single transaction.
+    Each copy goes to the next hold on its book, as at the desk.
+    Late fees are computed from the loans read before the batch is applied.
     
-    return (True, "Book returned succesfully and on time!")
+    Args:
+        patron_id: 6-digit library card ID
+        book_ids: IDs of the books being returned
+        
+    Returns:
+        tuple: (success: bool, message: str, results: list of per-book dicts)
+    """
+    error = _validate_batch(patron_id, book_ids)
+    if error:
+        return False, error, []
+
+    loans = {}
+    for loan in get_patron_borrowed_books(patron_id):
+        loans.setdefault(loan["book_id"], loan)
+
+    results = []
+    accepted = []
+    for book_id in book_ids:
+        if book_id in accepted:
+            message = "Book appears more than once in this batch."
+        elif book_id not in loans:
+            message = "Book is not borrowed by this patron"
+        else:
+            accepted.append(book_id)
+            message = None
+        results.append({"book_id": book_id, "success": False, "message": message})
+
+    return_date = datetime.now()
+
+    returned = []
+    held = {}
+    if accepted:
+        outcome = update_borrow_records_return_batch(patron_id, accepted, return_date, pickup_deadline(return_date))
+        if outcome is None:
+            return False, "Database error occurred while recording returns.", []
+        returned, held = outcome["returned"], outcome["holds"]
+        invalidate_patron_status(patron_id)
+
+    for result in results:
+        if result["message"] is not None:
+            continue
+        if result["book_id"] not in returned:
+            result["message"] = "Book is not borrowed by this patron"
+            continue
+        loan = loans[result["book_id"]]
+        fee, days_overdue = compute_late_fee(loan["due_date"], return_date)
+        if fee > 0:
+            fee = fee_still_owed(fee, get_loan_amount_paid(loan["borrow_record_id"]))
+        result["success"] = True
+        result["fee_amount"] = fee
+        result["days_overdue"] = days_overdue
+        held_note = " Copy reserved for the next patron on hold." if result["book_id"] in held else ""
+        if fee > 0:
+            result["message"] = f'Late by {days_overdue} days. Fee owed: ${fee:.2f}.' + held_note
+        else:
+            result["message"] = "Book returned succesfully and on time!" + held_note
+
+    return bool(returned), f"Returned {len(returned)} of {len(book_ids)} books.", results
 
 
 def calculate_late_fee_for_book(patron_id: str, book_id: int) -> Dict:
@@ -187,10 +380,12 @@ def calculate_late_fee_for_book(patron_id: str, book_id: int) -> Dict:
     books = get_patron_borrowed_books(patron_id)
     book_ids = []
     due_dates = []
+    record_ids = []
 
     for book in books:
         book_ids.append(book["book_id"])
         due_dates.append(book["due_date"])
+        record_ids.append(book["borrow_record_id"])
     if book_id not in book_ids:
         return {
             "fee_amount": 0.00,
@@ -201,7 +396,96 @@ def calculate_late_fee_for_book(patron_id: str, book_id: int) -> Dict:
     index = book_ids.index(book_id)
     due_date = due_dates[index]
     
-    days_overdue = max(0, (datetime.now() - due_date).days)
+    fee, days_overdue = compute_late_fee(due_date)
+    amount_paid = get_loan_amount_paid(record_ids[index])
+
+    return {
+        "fee_amount": fee_still_owed(fee, amount_paid),
+        "days_overdue": days_overdue,
+        "amount_paid": amount_paid,
+        "borrow_record_id": record_ids[index],
+        "status": "Completed"
+    }
+
+
+def calculate_late_fees_batch(patron_ids: Optional[List] = None, pairs: Optional[List] = None) -> Dict:
+    """
+    Late fees (R5) for many patrons or (patron, book) pairs at once.
+    All open loans involved are read with one query and fees are computed
+    in memory, instead of one calculate_late_fee_for_book call per pair.
+
+    Args:
+        patron_ids: patrons whose every open loan is wanted
+        pairs: [patron_id, book_id] pairs
+
+    Returns:
+        dict: {'fees': {patron_id: {book_id: [fee_amount, days_overdue] or None}},
+               'invalid': entries that could not be parsed}
+        or {'error': message}
+    """
+    patron_ids = patron_ids or []
+    pairs = pairs or []
+    if not isinstance(patron_ids, list) or not isinstance(pairs, list):
+        return {"error": "patron_ids and pairs must be lists."}
+    if not patron_ids and not pairs:
+        return {"error": "Provide patron_ids or pairs."}
+    if len(patron_ids) + len(pairs) > MAX_LATE_FEE_BATCH:
+        return {"error": f"At most {MAX_LATE_FEE_BATCH} patrons and pairs per request."}
+
+    invalid = []
+    whole_patrons = set()
+    wanted: Dict[str, set] = {}
+    for patron_id in patron_ids:
+        patron_id = str(patron_id)
+        if patron_id.isdigit() and len(patron_id) == 6:
+            whole_patrons.add(patron_id)
+        else:
+            invalid.append(patron_id)
+    for pair in pairs:
+        try:
+            patron_id, book_id = str(pair[0]), int(pair[1])
+        except (TypeError, ValueError, IndexError, KeyError):
+            invalid.append(pair)
+            continue
+        if patron_id.isdigit() and len(patron_id) == 6:
+            wanted.setdefault(patron_id, set()).add(book_id)
+        else:
+            invalid.append(pair)
+
+    fees: Dict[str, Dict[str, Optional[list]]] = {patron_id: {} for patron_id in whole_patrons | wanted.keys()}
+    for patron_id, book_ids in wanted.items():
+        # Pairs with no open loan stay None
+        fees[patron_id].update((str(book_id), None) for book_id in book_ids)
+
+    now = datetime.now()
+    for _, patron_id, book_id, due_date, paid in get_open_loans_with_paid(sorted(fees)):
+        key = str(book_id)
+        if patron_id not in whole_patrons and key not in fees[patron_id]:
+            continue
+        if fees[patron_id].get(key) is not None:
+            # Same title borrowed twice: report the earliest loan, as the single lookup does
+            continue
+        fee, days_overdue = compute_late_fee(datetime.fromisoformat(due_date), now)
+        fees[patron_id][key] = [fee_still_owed(fee, paid), days_overdue]
+
+    return {"fees": fees, "invalid": invalid}
+
+
+def compute_late_fee(due_date: datetime, as_of: Optional[datetime] = None) -> Tuple[float, int]:
+    """
+    Apply the R5 late fee rules to a single loan.
+
+    Args:
+        due_date: when the book was due
+        as_of: moment to charge up to (defaults to now)
+
+    Returns:
+        tuple: (fee_amount: float, days_overdue: int)
+    """
+    if as_of is None:
+        as_of = datetime.now()
+
+    days_overdue = max(0, (as_of - due_date).days)
 
     fee = 0
     if days_overdue == 0:
@@ -215,11 +499,14 @@ def calculate_late_fee_for_book(patron_id: str, book_id: int) -> Dict:
     if fee > 15.00:
         fee = 15.00
 
-    return {
-        "fee_amount": round(fee, 2),
-        "days_overdue": days_overdue,
-        "status": "Completed"
-    }
+    return round(fee, 2), days_overdue
+
+def fee_still_owed(fee: float, amount_paid: float) -> float:
+    """
+    The part of a computed late fee not yet paid. Payments recorded in the
+    fee ledger (net of refunds) reduce what is still owed, never below zero.
+    """
+    return round(max(0.0, fee - amount_paid), 2)
 
 def search_books_in_catalog(search_term: str, search_type: str) -> List[Dict]:
     """
@@ -237,28 +524,109 @@ def search_books_in_catalog(search_term: str, search_type: str) -> List[Dict]:
     if not search_term or not search_type:
         return []
 
-    conn = get_db_connection()
-
     search_type = search_type.lower().strip()
     search_term = search_term.strip()
 
-    if search_type == "isbn":
-        query = "SELECT * FROM books WHERE isbn = ? ORDER BY title"
-        params = (search_term,)
-    elif search_type == "title":
-        query = "SELECT * FROM books WHERE LOWER(title) LIKE ? ORDER BY title"
-        params = (f"%{search_term.lower()}%",)
-    elif search_type == "author":
-        query = "SELECT * FROM books WHERE LOWER(author) LIKE ? ORDER BY title"
-        params = (f"%{search_term.lower()}%",)
-    else:
-        conn.close()
+    if search_type == "fuzzy":
+        return _fuzzy_search_books(search_term)
+
+    if search_type not in ("isbn", "title", "author"):
         return []
-    
-    results = conn.execute(query, params).fetchall()
-    conn.close()
 
-    return [dict(book) for book in results]
+    return search_books_by_field(search_type, search_term)
+
+
+def _fuzzy_search_books(search_term: str) -> List[Dict]:
+    """Load the books matched by the trigram index, best match first."""
+    matches = fuzzy_match_books(search_term)
+    if not matches:
+        return []
+
+    books = get_books_by_ids([book_id for book_id, _ in matches])
+    results = []
+    for book_id, score in matches:
+        if book_id in books:
+            results.append(dict(books[book_id], score=score))
+    return results
+
+
+def encode_search_cursor(title: str, book_id: int) -> str:
+    """Encode the (title, id) of the last row on a page as an opaque cursor."""
+    raw = json.dumps([title, book_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_search_cursor(cursor: str) -> Optional[Tuple[str, int]]:
+    """Decode a cursor from encode_search_cursor, or None if it is malformed."""
+    try:
+        title, book_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(title, str) or not isinstance(book_id, int):
+        return None
+    return title, book_id
+
+
+def search_books_filtered(title: Optional[str] = None, author: Optional[str] = None,
+                          author_prefix: Optional[str] = None, isbn: Optional[str] = None,
+                          available_only: bool = False, limit: int = DEFAULT_SEARCH_LIMIT,
+                          cursor: Optional[str] = None, conn=None) -> Dict:
+    """
+    Search the catalog with combined filters, one page at a time.
+
+    Filters are AND-ed together and results ordered by (title, id), so
+    pages are fetched with a keyset cursor instead of OFFSET. The total is
+    counted up to SEARCH_COUNT_CAP.
+
+    Args:
+        title: partial title match (case-insensitive)
+        author: partial author match (case-insensitive)
+        author_prefix: author must start with this (case-insensitive)
+        isbn: exact ISBN match
+        available_only: only books with available copies
+        limit: page size (capped at MAX_SEARCH_LIMIT)
+        cursor: next_cursor from the previous page
+        conn: open connection to use (one is opened and closed if omitted)
+
+    Returns:
+        dict: {'results', 'count', 'next_cursor', 'total_estimate', 'total_is_exact'}
+              or {'error': message} for invalid input
+    """
+    title = title.strip() if title else None
+    author = author.strip() if author else None
+    author_prefix = author_prefix.strip() if author_prefix else None
+    isbn = isbn.strip() if isbn else None
+
+    if not any([title, author, author_prefix, isbn, available_only]):
+        return {"error": "At least one search filter is required."}
+
+    if not isinstance(limit, int) or limit <= 0:
+        return {"error": "Limit must be a positive integer."}
+    limit = min(limit, MAX_SEARCH_LIMIT)
+
+    after = None
+    if cursor:
+        after = decode_search_cursor(cursor)
+        if after is None:
+            return {"error": "Invalid cursor."}
+
+    # Fetch one extra row to learn whether another page exists
+    rows, total = search_books_page(title, author, author_prefix, isbn, available_only,
+                                    after, limit + 1, SEARCH_COUNT_CAP, conn=conn)
+
+    books = rows[:limit]
+
+    next_cursor = None
+    if len(rows) > limit:
+        next_cursor = encode_search_cursor(books[-1].title, books[-1].id)
+
+    return {
+        "results": books,
+        "count": len(books),
+        "next_cursor": next_cursor,
+        "total_estimate": total,
+        "total_is_exact": total < SEARCH_COUNT_CAP,
+    }
 
 
 def get_patron_status_report(patron_id: str) -> Dict:
@@ -272,6 +640,19 @@ def get_patron_status_report(patron_id: str) -> Dict:
     if not patron_id or not patron_id.isdigit() or len(patron_id) != 6:
         return {}
     
+    # Read the version before building so a concurrent change is never cached as current
+    today = date.today().isoformat()
+    version = get_patron_loan_version(patron_id)
+    cached = status_report_cache.get(patron_id, today, version)
+    if cached is not None:
+        return cached
+    
+    report = _build_patron_status_report(patron_id)
+    status_report_cache.put(patron_id, today, version, report)
+    return report
+
+def _build_patron_status_report(patron_id: str) -> Dict:
+    """Build a patron status report from the database."""
     books = get_patron_borrowed_books(patron_id)
     books_borrowed = get_patron_borrow_count(patron_id)
     total_late_fees = 0
@@ -300,9 +681,15 @@ def get_patron_status_report(patron_id: str) -> Dict:
         "currently_borrowed": borrowed,
         "num_currently_borrowed": books_borrowed,
         "total_late_fees": round(total_late_fees, 2),
+        "fee_balance": get_patron_balance(patron_id),
     }
 
-def pay_late_fees(patron_id: str, book_id: int, payment_gateway: PaymentGateway = None) -> Tuple[bool, str, Optional[str]]:
+def warm_patron_status_cache(limit: Optional[int] = None) -> int:
+    """Preload status reports for patrons with open loans; returns how many."""
+    return warm_status_cache(get_patron_status_report, limit)
+
+def pay_late_fees(patron_id: str, book_id: int, payment_gateway: PaymentGateway = None,
+                  idempotency_key: Optional[str] = None) -> Tuple[bool, str, Optional[str]]:
     """
     Process payment for late fees using external payment gateway.
     
@@ -313,6 +700,9 @@ def pay_late_fees(patron_id: str, book_id: int, payment_gateway: PaymentGateway
         patron_id: 6-digit library card ID
         book_id: ID of the book with late fees
         payment_gateway: Payment gateway instance (injectable for testing)
+        idempotency_key: Optional client key; a retry with the same key
+                         returns the first attempt's outcome without
+                         charging again
         
     Returns:
         tuple: (success: bool, message: str, transaction_id: Optional[str])
@@ -323,6 +713,23 @@ def pay_late_fees(patron_id: str, book_id: int, payment_gateway: PaymentGateway
         mock_gateway.process_payment.return_value = (True, "txn_123", "Success")
         success, msg, txn = pay_late_fees("123456", 1, mock_gateway)
     """
+    def execute():
+        try:
+            return _pay_late_fees(patron_id, book_id, payment_gateway, idempotency_key), True
+        except PaymentGatewayTimeout as e:
+            # The charge may have gone through; keep the key in flight so a retry cannot charge twice
+            return (False, f"Payment processing error: {str(e)}", None), None
+        except Exception as e:
+            # Handle payment gateway errors; the charge may not have gone through, so allow a retry
+            return (False, f"Payment processing error: {str(e)}", None), False
+    
+    return run_idempotent("payment", idempotency_key, {"patron_id": patron_id, "book_id": book_id},
+                          execute, lambda message: (False, message, None))
+
+
+def _pay_late_fees(patron_id: str, book_id: int, payment_gateway: Optional[PaymentGateway],
+                   idempotency_key: Optional[str] = None) -> Tuple[bool, str, Optional[str]]:
+    """Charge a patron's late fee for one book; gateway errors propagate."""
     # Validate patron ID
     if not patron_id or not patron_id.isdigit() or len(patron_id) != 6:
         return False, "Invalid patron ID. Must be exactly 6 digits.", None
@@ -350,24 +757,30 @@ def pay_late_fees(patron_id: str, book_id: int, payment_gateway: PaymentGateway
     
     # Process payment through external gateway
     # THIS IS WHAT YOU SHOULD MOCK IN THEIR TESTS!
-    try:
-        success, transaction_id, message = payment_gateway.process_payment(
-            patron_id=patron_id,
-            amount=fee_amount,
-            description=f"Late fees for '{book['title']}'"
-        )
-        
-        if success:
-            return True, f"Payment successful! {message}", transaction_id
-        else:
-            return False, f"Payment failed: {message}", None
-            
-    except Exception as e:
-        # Handle payment gateway errors
-        return False, f"Payment processing error: {str(e)}", None
-
-
-def refund_late_fee_payment(transaction_id: str, amount: float, payment_gateway: PaymentGateway = None) -> Tuple[bool, str]:
+    # The client's idempotency key goes to the gateway too, so it can dedupe a retried charge
+    forwarded = {"idempotency_key": idempotency_key} if idempotency_key is not None else {}
+    success, transaction_id, message = payment_gateway.process_payment(
+        patron_id=patron_id,
+        amount=fee_amount,
+        description=f"Late fees for '{book['title']}'",
+        **forwarded
+    )
+    
+    if not success:
+        return False, f"Payment failed: {message}", None
+    
+    # Record the payment so the fee no longer shows as owed
+    if not insert_fee_entry(patron_id, "payment", -fee_amount, datetime.now(),
+                            borrow_record_id=fee_info.get("borrow_record_id"), book_id=book_id,
+                            transaction_id=transaction_id):
+        logger.error("Payment %s succeeded but could not be recorded in the fee ledger", transaction_id)
+    invalidate_patron_status(patron_id)
+    
+    return True, f"Payment successful! {message}", transaction_id
+
+
+def refund_late_fee_payment(transaction_id: str, amount: float, payment_gateway: PaymentGateway = None,
+                            idempotency_key: Optional[str] = None) -> Tuple[bool, str]:
     """
     Refund a late fee payment (e.g., if book was returned on time but fees were charged in error).
     
@@ -377,10 +790,28 @@ def refund_late_fee_payment(transaction_id: str, amount: float, payment_gateway:
         transaction_id: Original transaction ID to refund
         amount: Amount to refund
         payment_gateway: Payment gateway instance (injectable for testing)
+        idempotency_key: Optional client key; a retry with the same key
+                         returns the first attempt's outcome
         
     Returns:
         tuple: (success: bool, message: str)
     """
+    def execute():
+        try:
+            return _refund_late_fee_payment(transaction_id, amount, payment_gateway, idempotency_key), True
+        except PaymentGatewayTimeout as e:
+            return (False, f"Refund processing error: {str(e)}"), None
+        except Exception as e:
+            return (False, f"Refund processing error: {str(e)}"), False
+    
+    return run_idempotent("refund", idempotency_key, {"transaction_id": transaction_id, "amount": amount},
+                          execute, lambda message: (False, message))
+
+
+def _refund_late_fee_payment(transaction_id: str, amount: float,
+                             payment_gateway: Optional[PaymentGateway],
+                             idempotency_key: Optional[str] = None) -> Tuple[bool, str]:
+    """Refund part or all of a payment; gateway errors propagate."""
     # Validate inputs
     if not transaction_id or not transaction_id.startswith("txn_"):
         return False, "Invalid transaction ID."
@@ -397,14 +828,20 @@ def refund_late_fee_payment(transaction_id: str, amount: float, payment_gateway:
     
     # Process refund through external gateway
     # THIS IS WHAT YOU SHOULD MOCK IN YOUR TESTS!
-    try:
-        success, message = payment_gateway.refund_payment(transaction_id, amount)
-        
-        if success:
-            return True, message
-        else:
-            return False, f"Refund failed: {message}"
-            
-    except Exception as e:
-        return False, f"Refund processing error: {str(e)}"
+    forwarded = {"idempotency_key": idempotency_key} if idempotency_key is not None else {}
+    success, message = payment_gateway.refund_payment(transaction_id, amount, **forwarded)
+    
+    if not success:
+        return False, f"Refund failed: {message}"
+    
+    # Put the refunded amount back on the loan it was paid against
+    payment = get_fee_entry_by_transaction(transaction_id)
+    if payment and not insert_fee_entry(payment["patron_id"], "refund", amount, datetime.now(),
+                                        borrow_record_id=payment["borrow_record_id"],
+                                        book_id=payment["book_id"], transaction_id=transaction_id):
+        logger.error("Refund of %s succeeded but could not be recorded in the fee ledger", transaction_id)
+    if payment:
+        invalidate_patron_status(payment["patron_id"])
+    
+    return True, message
 
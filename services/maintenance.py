@@ -0,0 +1,198 @@
+"""
+Maintenance Module - Off-peak database upkeep
+Trims the catalog change log, repairs drifted shelf counts, refreshes
+planner statistics, reclaims free pages and checkpoints the WAL during a
+nightly window, logging how long each step took.
+"""
+
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Sequence
+
+from database import get_db_connection, claim_job_run
+from services.availability_reconciliation import reconcile_availability
+from services.change_feed import prune_catalog_change_log
+
+logger = logging.getLogger(__name__)
+
+MAINTENANCE_JOB = "maintenance_last_run"
+MAINTENANCE_TASKS = ("prune_changes", "reconcile_availability", "optimize", "analyze", "incremental_vacuum", "checkpoint")
+DEFAULT_WINDOW = "02:00-05:00"
+
+
+def _prune_changes(conn) -> str:
+    deleted = prune_catalog_change_log()
+    if deleted is None:
+        raise RuntimeError("could not prune the catalog change log")
+    return f"deleted {deleted} catalog changes"
+
+
+def _reconcile_availability(conn) -> str:
+    result = reconcile_availability(repair=True)
+    if result["status"] != "Completed":
+        raise RuntimeError(result["status"])
+    return f"repaired {result['repaired']} of {len(result['drift'])} drifted books ({result['scope']})"
+
+
+def _optimize(conn) -> str:
+    conn.execute("PRAGMA optimize").fetchall()
+    return "ok"
+
+
+def _analyze(conn) -> str:
+    conn.execute("ANALYZE")
+    conn.commit()
+    return "ok"
+
+
+def _incremental_vacuum(conn) -> str:
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        return "skipped: auto_vacuum is not incremental"
+    free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    conn.execute("PRAGMA incremental_vacuum").fetchall()
+    return f"reclaimed {free_pages} pages"
+
+
+def _checkpoint(conn) -> str:
+    if conn.execute("PRAGMA journal_mode").fetchone()[0] != "wal":
+        return "skipped: not in WAL mode"
+    busy, log_pages, checkpointed = conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+    if busy:
+        return f"partial: {checkpointed} of {log_pages} pages (readers active)"
+    return f"checkpointed {checkpointed} pages"
+
+
+_TASKS: Dict[str, Callable] = {
+    "prune_changes": _prune_changes,
+    "reconcile_availability": _reconcile_availability,
+    "optimize": _optimize,
+    "analyze": _analyze,
+    "incremental_vacuum": _incremental_vacuum,
+    "checkpoint": _checkpoint,
+}
+
+
+def run_maintenance(tasks: Sequence[str] = MAINTENANCE_TASKS) -> List[Dict]:
+    """
+    Run maintenance tasks in order; a failed task does not stop the rest.
+
+    Returns:
+        list: one {'task', 'seconds', 'result'} per task
+    """
+    unknown = [task for task in tasks if task not in _TASKS]
+    if unknown:
+        raise ValueError(f"Unknown maintenance task(s): {', '.join(unknown)}")
+
+    report = []
+    conn = get_db_connection()
+    try:
+        for task in tasks:
+            started = time.perf_counter()
+            try:
+                result = _TASKS[task](conn)
+            except Exception as e:
+                result = f"failed: {e}"
+            seconds = round(time.perf_counter() - started, 3)
+            logger.info("Maintenance %s took %.3fs (%s)", task, seconds, result)
+            report.append({"task": task, "seconds": seconds, "result": result})
+    finally:
+        conn.close()
+    return report
+
+
+def parse_window(window: str) -> tuple:
+    """Parse 'HH:MM-HH:MM' into two datetime.time values."""
+    try:
+        start, end = window.split("-")
+        return (datetime.strptime(start.strip(), "%H:%M").time(),
+                datetime.strptime(end.strip(), "%H:%M").time())
+    except ValueError:
+        raise ValueError(f"Invalid window {window!r}; expected HH:MM-HH:MM")
+
+
+class OffPeakScheduler(ABC):
+    """
+    Runs a job at most once per `interval`, only inside the off-peak
+    window (which may wrap past midnight). Runs are claimed in the database,
+    so several workers each running a scheduler do the work once.
+    Subclasses set `job_name` and implement run_job().
+    """
+
+    job_name = ""
+
+    def __init__(self, window: str, interval: timedelta = timedelta(days=1), poll_seconds: float = 60.0,
+                 clock: Callable[[], datetime] = datetime.now):
+        self.start_time, self.end_time = parse_window(window)
+        self.interval = interval
+        self.poll_seconds = poll_seconds
+        self._clock = clock
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.last_report = None
+
+    def in_window(self, now: datetime) -> bool:
+        current = now.time()
+        if self.start_time <= self.end_time:
+            return self.start_time <= current < self.end_time
+        return current >= self.start_time or current < self.end_time
+
+    @abstractmethod
+    def run_job(self):
+        """Do the scheduled work; the return value is kept as last_report."""
+
+    def run_pending(self):
+        """Run the job if it is due now; returns its report if it ran."""
+        now = self._clock()
+        if not self.in_window(now) or not claim_job_run(self.job_name, now, now - self.interval):
+            return None
+        self.last_report = self.run_job()
+        return self.last_report
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name=self.job_name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.poll_seconds):
+            try:
+                self.run_pending()
+            except Exception:
+                logger.exception("Scheduled %s failed", self.job_name)
+
+
+class MaintenanceScheduler(OffPeakScheduler):
+    """Daily prune/reconcile/optimize/analyze/vacuum/checkpoint in the off-peak window."""
+
+    job_name = MAINTENANCE_JOB
+
+    def __init__(self, window: str = DEFAULT_WINDOW, interval: timedelta = timedelta(days=1),
+                 poll_seconds: float = 60.0, tasks: Sequence[str] = MAINTENANCE_TASKS,
+                 clock: Callable[[], datetime] = datetime.now):
+        super().__init__(window, interval, poll_seconds, clock)
+        self.tasks = tuple(tasks)
+
+    def run_job(self) -> List[Dict]:
+        return run_maintenance(self.tasks)
+
+
+_scheduler: Optional[MaintenanceScheduler] = None
+
+
+def start_maintenance_scheduler(window: str = DEFAULT_WINDOW) -> MaintenanceScheduler:
+    """Start this process's maintenance scheduler (once)."""
+    global _scheduler
+    if _scheduler is None or not _scheduler.is_running():
+        _scheduler = MaintenanceScheduler(window)
+        _scheduler.start()
+    return _scheduler
@@ -0,0 +1,152 @@
+"""
+Notice Service Module - Nightly overdue and due-soon notices
+Streams open loans grouped by patron, prices them with the R5 fee rules
+less any payments in the fee ledger, and renders notices in a process
+pool into spool files. Progress is checkpointed after every spool file
+so an interrupted run can resume.
+"""
+
+import json
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import groupby, islice
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from database import iter_open_loans
+from services.library_service import compute_late_fee, fee_still_owed
+
+# Loans due within this many days get a reminder
+DUE_SOON_DAYS = 3
+CHECKPOINT_FILE = "checkpoint.json"
+
+
+def build_patron_notices(loans: Iterator[Tuple[Dict, float]], as_of: datetime) -> Iterator[Dict]:
+    """
+    Lazily turn a patron-ordered stream of (open loan, amount paid) pairs
+    into one notice per patron with overdue or due-soon books. Patrons with
+    neither are skipped.
+    """
+    for patron_id, patron_loans in groupby(loans, key=lambda pair: pair[0]["patron_id"]):
+        overdue = []
+        due_soon = []
+        for loan, amount_paid in patron_loans:
+            fee, days_overdue = compute_late_fee(loan["due_date"], as_of)
+            fee = fee_still_owed(fee, amount_paid)
+            item = {
+                "book_id": loan["book_id"],
+                "title": loan["title"],
+                "author": loan["author"],
+                "due_date": loan["due_date"].strftime("%Y-%m-%d"),
+                "days_overdue": days_overdue,
+                "late_fee": fee
+            }
+            if loan["due_date"] < as_of:
+                overdue.append(item)
+            elif (loan["due_date"] - as_of).days < DUE_SOON_DAYS:
+                due_soon.append(item)
+
+        if overdue or due_soon:
+            yield {
+                "patron_id": patron_id,
+                "as_of": as_of.strftime("%Y-%m-%d"),
+                "overdue": overdue,
+                "due_soon": due_soon,
+                "total_late_fees": round(sum(item["late_fee"] for item in overdue), 2)
+            }
+
+
+def render_notice(notice: Dict) -> str:
+    """Render one patron's notice as plain text (runs in worker processes)."""
+    lines = [f"Library notice for patron {notice['patron_id']} ({notice['as_of']})"]
+    if notice["overdue"]:
+        lines.append("Overdue books:")
+        for item in notice["overdue"]:
+            lines.append(f"  - {item['title']} by {item['author']}: due {item['due_date']}, "
+                         f"{item['days_overdue']} days overdue, fee ${item['late_fee']:.2f}")
+        lines.append(f"Total late fees: ${notice['total_late_fees']:.2f}")
+    if notice["due_soon"]:
+        lines.append("Due soon:")
+        for item in notice["due_soon"]:
+            lines.append(f"  - {item['title']} by {item['author']}: due {item['due_date']}")
+    return "\n".join(lines) + "\n"
+
+
+def _write_atomically(path: str, content: str) -> None:
+    """Write a file so readers never see a partial spool or checkpoint."""
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    with os.fdopen(fd, "w", encoding="utf-8") as handle:
+        handle.write(content)
+    os.replace(tmp_path, path)
+
+
+def _load_checkpoint(output_dir: str, run_date: str) -> Dict:
+    """Load today's checkpoint, or a fresh one if there is none."""
+    path = os.path.join(output_dir, CHECKPOINT_FILE)
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as handle:
+            checkpoint = json.load(handle)
+        if checkpoint.get("run_date") == run_date:
+            return checkpoint
+    return {"run_date": run_date, "last_patron_id": "", "files": 0, "notices": 0, "completed": False}
+
+
+def generate_overdue_notices(output_dir: str, as_of: Optional[datetime] = None, workers: int = 0,
+                             batch_size: int = 500, chunk_size: int = 1000) -> Dict:
+    """
+    Generate notices for every patron with overdue or due-soon loans.
+
+    Args:
+        output_dir: directory for spool files and the checkpoint
+        as_of: moment fees are computed at (defaults to now)
+        workers: rendering processes (0 renders in this process)
+        batch_size: notices per spool file (and per checkpoint)
+        chunk_size: open loans read per database query
+
+    Returns:
+        dict: {'status', 'files', 'notices', 'resumed'}
+    """
+    if as_of is None:
+        as_of = datetime.now()
+    if batch_size <= 0 or chunk_size <= 0 or workers < 0:
+        return {"status": "Invalid batch, chunk or worker count"}
+
+    os.makedirs(output_dir, exist_ok=True)
+    run_date = as_of.strftime("%Y-%m-%d")
+    checkpoint = _load_checkpoint(output_dir, run_date)
+    resumed = bool(checkpoint["last_patron_id"])
+    if checkpoint["completed"]:
+        return {"status": "Completed", "files": checkpoint["files"],
+                "notices": checkpoint["notices"], "resumed": resumed}
+
+    loans = iter_open_loans(checkpoint["last_patron_id"], chunk_size)
+    notices = build_patron_notices(loans, as_of)
+
+    pool = ProcessPoolExecutor(max_workers=workers) if workers else None
+    try:
+        while True:
+            batch: List[Dict] = list(islice(notices, batch_size))
+            if not batch:
+                break
+            if pool:
+                rendered = list(pool.map(render_notice, batch, chunksize=max(1, len(batch) // (workers * 4))))
+            else:
+                rendered = [render_notice(notice) for notice in batch]
+
+            checkpoint["files"] += 1
+            spool_name = f"notices-{run_date}-{checkpoint['files']:05d}.txt"
+            _write_atomically(os.path.join(output_dir, spool_name), "\n".join(rendered))
+
+            checkpoint["last_patron_id"] = batch[-1]["patron_id"]
+            checkpoint["notices"] += len(batch)
+            _write_atomically(os.path.join(output_dir, CHECKPOINT_FILE), json.dumps(checkpoint))
+    finally:
+        if pool:
+            pool.shutdown()
+
+    checkpoint["completed"] = True
+    _write_atomically(os.path.join(output_dir, CHECKPOINT_FILE), json.dumps(checkpoint))
+    return {"status": "Completed", "files": checkpoint["files"],
+            "notices": checkpoint["notices"], "resumed": resumed}
@@ -0,0 +1,143 @@
+"""
+Payment Reconciliation Module - Check recorded payments against the gateway
+Streams payments from the fee ledger, verifies them concurrently under the
+gateway's rate limit and writes every disagreement to a mismatch report.
+Progress is checkpointed after each chunk so an interrupted run resumes.
+"""
+
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from itertools import islice
+from typing import Dict, List, Optional
+
+from database import iter_recorded_payments
+from services.notice_service import _write_atomically
+from services.payment_service import PaymentGateway
+from services.rate_limit import TokenBucket
+
+CHECKPOINT_FILE = "checkpoint.json"
+# Gateway allowance for status checks (requests per second, burst)
+GATEWAY_RATE_LIMIT = 25.0
+GATEWAY_BURST = 25
+DEFAULT_WORKERS = 16
+
+
+def compare_payment(record: Dict, status: Dict) -> Optional[Dict]:
+    """
+    Compare one recorded payment with the gateway's view of it.
+
+    Returns:
+        dict describing the mismatch, or None if they agree
+    """
+    problem = None
+    if status.get("status") == "not_found":
+        problem = "missing_at_gateway"
+    elif status.get("status") not in ("completed", "refunded", "partially_refunded"):
+        problem = "status"
+    elif round(float(status.get("amount", 0)), 2) != round(record["amount"], 2):
+        problem = "amount"
+
+    if problem is None:
+        return None
+    return {
+        "transaction_id": record["transaction_id"],
+        "problem": problem,
+        "patron_id": record["patron_id"],
+        "book_id": record["book_id"],
+        "recorded_amount": round(record["amount"], 2),
+        "recorded_refunded": round(record["refunded"], 2),
+        "recorded_at": record["created_at"],
+        "gateway_status": status.get("status"),
+        "gateway_amount": status.get("amount")
+    }
+
+
+def _verify(gateway: PaymentGateway, limiter: TokenBucket, record: Dict) -> Optional[Dict]:
+    limiter.acquire()
+    try:
+        status = gateway.verify_payment_status(record["transaction_id"])
+    except Exception as e:
+        status = {"status": "error", "message": str(e)}
+    mismatch = compare_payment(record, status)
+    if mismatch and status.get("status") == "error":
+        mismatch["problem"] = "verify_error"
+        mismatch["error"] = status.get("message")
+    return mismatch
+
+
+def _load_checkpoint(output_dir: str, since: str, until: str) -> Dict:
+    """Load the checkpoint for this period, or a fresh one."""
+    path = os.path.join(output_dir, CHECKPOINT_FILE)
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as handle:
+            checkpoint = json.load(handle)
+        if checkpoint.get("since") == since and checkpoint.get("until") == until:
+            return checkpoint
+    return {"since": since, "until": until, "last_created_at": "", "last_id": 0,
+            "chunks": 0, "verified": 0, "mismatches": 0, "completed": False}
+
+
+def reconcile_payments(output_dir: str, since: datetime, until: datetime,
+                       payment_gateway: Optional[PaymentGateway] = None, workers: int = DEFAULT_WORKERS,
+                       rate: float = GATEWAY_RATE_LIMIT, burst: int = GATEWAY_BURST,
+                       chunk_size: int = 200) -> Dict:
+    """
+    Verify every payment recorded in [since, until) with the gateway.
+
+    Args:
+        output_dir: directory for mismatch report files and the checkpoint
+        workers: concurrent status checks
+        rate, burst: token-bucket limit on gateway calls
+        chunk_size: payments verified between checkpoints
+
+    Returns:
+        dict: {'status', 'verified', 'mismatches', 'reports', 'resumed'}
+    """
+    if workers <= 0 or chunk_size <= 0 or rate <= 0 or burst <= 0:
+        return {"status": "Invalid worker count, chunk size or rate limit"}
+    if until <= since:
+        return {"status": "The end of the period must be after its start"}
+
+    os.makedirs(output_dir, exist_ok=True)
+    checkpoint = _load_checkpoint(output_dir, since.isoformat(), until.isoformat())
+    resumed = checkpoint["chunks"] > 0
+    if not resumed and not checkpoint["completed"]:
+        # Reports left by a run over a different period
+        for name in os.listdir(output_dir):
+            if name.startswith("mismatches-"):
+                os.remove(os.path.join(output_dir, name))
+
+    if not checkpoint["completed"]:
+        if payment_gateway is None:
+            payment_gateway = PaymentGateway()
+        limiter = TokenBucket(rate, burst)
+        payments = iter_recorded_payments(checkpoint["since"], checkpoint["until"],
+                                          (checkpoint["last_created_at"], checkpoint["last_id"]))
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="reconcile") as pool:
+            while True:
+                chunk: List[Dict] = list(islice(payments, chunk_size))
+                if not chunk:
+                    break
+                results = pool.map(lambda record: _verify(payment_gateway, limiter, record), chunk)
+                mismatches = [mismatch for mismatch in results if mismatch]
+
+                checkpoint["chunks"] += 1
+                if mismatches:
+                    report = os.path.join(output_dir, f"mismatches-{checkpoint['chunks']:05d}.jsonl")
+                    _write_atomically(report, "".join(json.dumps(m) + "\n" for m in mismatches))
+
+                checkpoint["last_created_at"] = chunk[-1]["created_at"]
+                checkpoint["last_id"] = chunk[-1]["id"]
+                checkpoint["verified"] += len(chunk)
+                checkpoint["mismatches"] += len(mismatches)
+                _write_atomically(os.path.join(output_dir, CHECKPOINT_FILE), json.dumps(checkpoint))
+
+        checkpoint["completed"] = True
+        _write_atomically(os.path.join(output_dir, CHECKPOINT_FILE), json.dumps(checkpoint))
+
+    reports = sorted(name for name in os.listdir(output_dir) if name.startswith("mismatches-"))
+    return {"status": "Completed", "verified": checkpoint["verified"], "mismatches": checkpoint["mismatches"],
+            "reports": reports, "resumed": resumed}
@@ -6,10 +6,26 @@ For Assignment 3: You will learn to mock this service in their tests
 since we cannot make actual payment API calls during testing.
 """
 
+import os
+import threading
 import requests
-from typing import Dict, Tuple
+from urllib.parse import quote
+from typing import Dict, Optional, Tuple
 import time
 
+DEFAULT_BASE_URL = "https://api.payment-gateway.example.com"
+# Setting this switches the default gateway to HTTP mode (e.g. the local emulator)
+GATEWAY_URL_ENV = "PAYMENT_GATEWAY_URL"
+DEFAULT_TIMEOUT = 5.0
+
+
+class PaymentGatewayError(Exception):
+    """The gateway could not give a definite answer (unreachable, 429 or 5xx)."""
+
+
+class PaymentGatewayTimeout(PaymentGatewayError):
+    """The gateway took the request but did not answer in time; it may have been carried out."""
+
 
 class PaymentGateway:
     """
@@ -22,17 +38,54 @@ class PaymentGateway:
     - Incurring costs or rate limits
     """
     
-    def __init__(self, api_key: str = "test_key_12345"):
+    def __init__(self, api_key: str = "test_key_12345", base_url: Optional[str] = None,
+                 mode: Optional[str] = None, timeout: float = DEFAULT_TIMEOUT):
         """
         Initialize payment gateway with API credentials.
         
         Args:
             api_key: API key for authentication (default is test key)
+            base_url: gateway URL (defaults to $PAYMENT_GATEWAY_URL)
+            mode: "simulated" (in-process, the default) or "http"; a
+                  base_url from the argument or environment implies "http"
+            timeout: seconds to wait for the gateway in HTTP mode
         """
         self.api_key = api_key
-        self.base_url = "https://api.payment-gateway.example.com"
+        base_url = base_url or os.environ.get(GATEWAY_URL_ENV)
+        self.base_url = (base_url or DEFAULT_BASE_URL).rstrip("/")
+        self.mode = mode or ("http" if base_url else "simulated")
+        self.timeout = timeout
+        self._local = threading.local()
     
-    def process_payment(self, patron_id: str, amount: float, description: str = "") -> Tuple[bool, str, str]:
+    def _request(self, method: str, path: str, payload: Optional[Dict] = None,
+                 idempotency_key: Optional[str] = None) -> Tuple[int, Dict]:
+        """
+        Call the gateway over HTTP; raises PaymentGatewayError unless it answered definitely,
+        and PaymentGatewayTimeout when the request was sent but the outcome is unknown.
+        """
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+            session.headers["Authorization"] = f"Bearer {self.api_key}"
+        headers = {"Idempotency-Key": idempotency_key} if idempotency_key else None
+        try:
+            response = session.request(method, self.base_url + path, json=payload, headers=headers,
+                                       timeout=self.timeout)
+        except requests.ReadTimeout as e:
+            raise PaymentGatewayTimeout(f"Gateway timed out: {e}") from e
+        except requests.RequestException as e:
+            raise PaymentGatewayError(f"Gateway unreachable: {e}") from e
+        if response.status_code == 504:
+            raise PaymentGatewayTimeout("Gateway returned HTTP 504")
+        if response.status_code == 429 or response.status_code >= 500:
+            raise PaymentGatewayError(f"Gateway returned HTTP {response.status_code}")
+        try:
+            return response.status_code, response.json()
+        except ValueError as e:
+            raise PaymentGatewayError("Gateway returned an invalid response") from e
+    
+    def process_payment(self, patron_id: str, amount: float, description: str = "",
+                        idempotency_key: Optional[str] = None) -> Tuple[bool, str, str]:
         """
         Process a payment through the external gateway.
         
@@ -43,6 +96,8 @@ class PaymentGateway:
             patron_id: 6-digit patron/customer ID
             amount: Payment amount in dollars
             description: Payment description
+            idempotency_key: sent to the gateway in HTTP mode so a retried
+                             charge is carried out only once
             
         Returns:
             tuple: (success: bool, transaction_id: str, message: str)
@@ -51,6 +106,14 @@ class PaymentGateway:
             gateway = PaymentGateway()
             success, txn_id, msg = gateway.process_payment("123456", 10.50, "Late fees")
         """
+        if self.mode == "http":
+            status, body = self._request("POST", "/charges", {
+                "customer_id": patron_id, "amount": amount, "currency": "usd", "description": description
+            }, idempotency_key)
+            if status != 200:
+                return False, "", body.get("message", f"Payment rejected (HTTP {status})")
+            return True, body["id"], f"Payment of ${amount:.2f} processed successfully"
+        
         # Simulate API call delay
         time.sleep(0.5)
         
@@ -82,7 +145,8 @@ class PaymentGateway:
         transaction_id = f"txn_{patron_id}_{int(time.time())}"
         return True, transaction_id, f"Payment of ${amount:.2f} processed successfully"
     
-    def refund_payment(self, transaction_id: str, amount: float) -> Tuple[bool, str]:
+    def refund_payment(self, transaction_id: str, amount: float,
+                       idempotency_key: Optional[str] = None) -> Tuple[bool, str]:
         """
         Refund a previous payment.
         
@@ -92,10 +156,19 @@ class PaymentGateway:
         Args:
             transaction_id: Original transaction ID to refund
             amount: Amount to refund
+            idempotency_key: sent to the gateway in HTTP mode so a retried
+                             refund is carried out only once
             
         Returns:
             tuple: (success: bool, message: str)
         """
+        if self.mode == "http":
+            status, body = self._request("POST", "/refunds", {"transaction_id": transaction_id, "amount": amount},
+                                         idempotency_key)
+            if status != 200:
+                return False, body.get("message", f"Refund rejected (HTTP {status})")
+            return True, f"Refund of ${amount:.2f} processed successfully. Refund ID: {body['id']}"
+        
         time.sleep(0.5)
         
         if not transaction_id or not transaction_id.startswith("txn_"):
@@ -120,6 +193,12 @@ class PaymentGateway:
         Returns:
             dict: Payment status information
         """
+        if self.mode == "http":
+            status, body = self._request("GET", f"/charges/{quote(transaction_id, safe='')}")
+            if status == 404:
+                return {"status": "not_found", "message": body.get("message", "Transaction not found")}
+            return body
+        
         time.sleep(0.3)
         
         if not transaction_id or not transaction_id.startswith("txn_"):
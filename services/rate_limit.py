@@ -0,0 +1,148 @@
+"""
+Rate Limit Module - Token buckets
+TokenBucket paces our calls to rate-limited services; KeyedRateLimiter
+throttles callers of our own endpoints
+"""
+
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Tuple
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` tokens per second, holding at most
+    `capacity` (the largest burst allowed after a quiet period).
+    """
+
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic):
+        if rate <= 0 or capacity <= 0:
+            raise ValueError("rate and capacity must be positive")
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._tokens = capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens: float = 1) -> bool:
+        """Take tokens if available right now."""
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens: float = 1) -> None:
+        """Block until tokens are available, then take them."""
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+# Keyed limiting: one bucket per (endpoint, patron or client) key. Bucket
+# state lives in a store; SQLiteBucketStore shares it between processes.
+
+class MemoryBucketStore:
+    """Per-process bucket state, bounded to the most recently used keys."""
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> (tokens, updated)
+        self._lock = threading.Lock()
+
+    def take(self, key: str, rate: float, capacity: float, now: float) -> Tuple[bool, float]:
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            allowed, tokens, retry_after = _take_token(tokens, updated, rate, capacity, now)
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, retry_after
+
+
+class SQLiteBucketStore:
+    """
+    Bucket state in a small SQLite file shared by all workers on the host
+    (put it on /dev/shm to keep it in shared memory). Separate from the
+    library database, so throttling never contends with circulation writes.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS rate_buckets (
+                bucket_key TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                updated REAL NOT NULL
+            ) WITHOUT ROWID
+        ''')
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=OFF')
+            self._local.conn = conn
+        return conn
+
+    def take(self, key: str, rate: float, capacity: float, now: float) -> Tuple[bool, float]:
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT tokens, updated FROM rate_buckets WHERE bucket_key = ?', (key,)).fetchone()
+            tokens, updated = row if row else (capacity, now)
+            allowed, tokens, retry_after = _take_token(tokens, updated, rate, capacity, now)
+            conn.execute('''
+                INSERT INTO rate_buckets (bucket_key, tokens, updated) VALUES (?, ?, ?)
+                ON CONFLICT (bucket_key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated
+            ''', (key, tokens, now))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return allowed, retry_after
+
+
+def _take_token(tokens: float, updated: float, rate: float, capacity: float,
+                now: float) -> Tuple[bool, float, float]:
+    """Refill a bucket and try to take one token: (allowed, tokens left, retry after)."""
+    tokens = min(capacity, tokens + max(0.0, now - updated) * rate)
+    if tokens >= 1:
+        return True, tokens - 1, 0.0
+    return False, tokens, (1 - tokens) / rate
+
+
+class KeyedRateLimiter:
+    """Token buckets keyed by caller, each endpoint with its own rate."""
+
+    def __init__(self, store=None, clock: Callable[[], float] = time.time):
+        self.store = store if store is not None else MemoryBucketStore()
+        # Wall-clock time so buckets shared between processes agree
+        self._clock = clock
+
+    def hit(self, key: str, rate: float, capacity: float) -> Tuple[bool, float]:
+        """
+        Count one request against `key`.
+
+        Returns:
+            tuple: (allowed: bool, retry_after: seconds until a token is free)
+        """
+        return self.store.take(key, rate, capacity, self._clock())
@@ -0,0 +1,331 @@
+"""
+Search Index Module - In-memory indexes over the book catalog
+Serves as-you-type suggestions and typo-tolerant matching without
+touching the database
+"""
+
+import bisect
+import re
+import threading
+import weakref
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from repositories import LibraryRepository, SQLiteRepository, SnapshotRepository, get_repository
+
+SUGGEST_TYPES = ("title", "author")
+DEFAULT_SUGGEST_LIMIT = 10
+MAX_SUGGEST_LIMIT = 25
+
+DEFAULT_FUZZY_LIMIT = 20
+DEFAULT_CANDIDATE_CAP = 200
+DEFAULT_SIMILARITY_THRESHOLD = 0.4
+
+_WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def normalize_text(text: str) -> str:
+    """Lower-case a string and collapse runs of whitespace."""
+    return " ".join(text.lower().split())
+
+
+def trigrams(word: str) -> frozenset:
+    """Return the padded character trigrams of a word ("  a", " ab", "abc", ...)."""
+    padded = f"  {word} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+class PrefixIndex:
+    """
+    Sorted prefix index of normalized strings.
+
+    Every word suffix of a value is stored (e.g. "great gatsby" and "gatsby"
+    for "The Great Gatsby"), so a prefix lookup is a single bisect followed by
+    a short forward scan. Whole values and inner suffixes are kept in
+    separate lists, so a common inner word cannot crowd out values that
+    start with the prefix.
+    """
+
+    def __init__(self):
+        # Sorted lists of (key, word_position, book_id, original value):
+        # position 0 in _leading, the rest in _inner
+        self._leading = []
+        self._inner = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._leading) + len(self._inner)
+
+    def clear(self) -> None:
+        """Remove every entry from the index."""
+        with self._lock:
+            self._leading, self._inner = [], []
+
+    def add(self, value: str, book_id: int) -> None:
+        """Index a value for a book."""
+        words = normalize_text(value).split()
+        with self._lock:
+            # Copied and swapped in, so a search never scans a list being changed
+            leading, inner = list(self._leading), list(self._inner)
+            for position in range(len(words)):
+                key = " ".join(words[position:])
+                bisect.insort(leading if position == 0 else inner, (key, position, book_id, value))
+            self._leading, self._inner = leading, inner
+
+    def bulk_load(self, items: List) -> None:
+        """Replace the index contents from (value, book_id) pairs in one sort."""
+        leading, inner = [], []
+        for value, book_id in items:
+            words = normalize_text(value).split()
+            for position in range(len(words)):
+                entry = (" ".join(words[position:]), position, book_id, value)
+                (leading if position == 0 else inner).append(entry)
+        leading.sort()
+        inner.sort()
+        with self._lock:
+            self._leading, self._inner = leading, inner
+
+    def search(self, prefix: str, limit: int = DEFAULT_SUGGEST_LIMIT) -> List[Dict]:
+        """
+        Return up to `limit` distinct values starting with `prefix`.
+
+        Values whose first word matches are ranked ahead of mid-value matches.
+
+        Returns:
+            list of dicts: [{'book_id': int, 'value': str}, ...]
+        """
+        prefix = normalize_text(prefix)
+        if not prefix or limit <= 0:
+            return []
+
+        results = []
+        seen = set()
+        # Values starting with the prefix first, then mid-value matches
+        for entries in (self._leading, self._inner):
+            for _, _, value, book_id in self._scan(entries, prefix, limit):
+                if value in seen:
+                    continue
+                seen.add(value)
+                results.append({"book_id": book_id, "value": value})
+                if len(results) == limit:
+                    return results
+        return results
+
+    @staticmethod
+    def _scan(entries: List, prefix: str, limit: int) -> List[Tuple]:
+        """Matching entries of one list, shortest value first."""
+        # Bound the scan so very short prefixes stay cheap
+        scan_cap = limit * 8
+        start = bisect.bisect_left(entries, (prefix,))
+        matches = []
+        for index in range(start, min(start + scan_cap, len(entries))):
+            key, position, book_id, value = entries[index]
+            if not key.startswith(prefix):
+                break
+            matches.append((position, len(value), value, book_id))
+        matches.sort()
+        return matches
+
+
+class TrigramIndex:
+    """
+    Word-level trigram index for approximate matching.
+
+    Inverted lists map each trigram to the distinct words containing it, so a
+    query only scores words sharing at least one trigram with it. Similarity
+    is the Dice coefficient of the two trigram sets.
+    """
+
+    def __init__(self, candidate_cap: int = DEFAULT_CANDIDATE_CAP):
+        self.candidate_cap = candidate_cap
+        self._postings = defaultdict(set)   # trigram -> words
+        self._word_books = defaultdict(set)  # word -> book ids
+        self._word_grams = {}                # word -> trigram set
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._word_grams)
+
+    def clear(self) -> None:
+        """Remove every entry from the index."""
+        with self._lock:
+            self._postings = defaultdict(set)
+            self._word_books = defaultdict(set)
+            self._word_grams = {}
+
+    def add(self, text: str, book_id: int) -> None:
+        """Index every word of a value for a book."""
+        with self._lock:
+            for word in _WORD_PATTERN.findall(text.lower()):
+                self._word_books[word].add(book_id)
+                if word in self._word_grams:
+                    continue
+                grams = trigrams(word)
+                self._word_grams[word] = grams
+                for gram in grams:
+                    self._postings[gram].add(word)
+
+    def _similar_words(self, word: str) -> List[Tuple[str, float, Tuple[int, ...]]]:
+        """
+        Score the indexed words sharing the most trigrams with `word`, with
+        a copy of each word's book IDs. Runs under the lock, since add()
+        grows the same sets.
+        """
+        query_grams = trigrams(word)
+        with self._lock:
+            shared = Counter()
+            for gram in query_grams:
+                shared.update(self._postings.get(gram, ()))
+
+            scored = []
+            for candidate, count in shared.most_common(self.candidate_cap):
+                similarity = 2 * count / (len(query_grams) + len(self._word_grams[candidate]))
+                scored.append((candidate, similarity, tuple(self._word_books[candidate])))
+        return scored
+
+    def search(self, query: str, limit: int = DEFAULT_FUZZY_LIMIT,
+               threshold: float = DEFAULT_SIMILARITY_THRESHOLD) -> List[Tuple[int, float]]:
+        """
+        Find books whose words approximately match every word of the query.
+
+        A book's score is the mean, over query words, of the best similarity
+        between that query word and any of the book's words.
+
+        Returns:
+            list of tuples: [(book_id, score), ...] best first
+        """
+        query_words = _WORD_PATTERN.findall(query.lower())
+        if not query_words or limit <= 0:
+            return []
+
+        totals = defaultdict(float)
+        for word in query_words:
+            best = {}
+            for _, similarity, book_ids in self._similar_words(word):
+                for book_id in book_ids:
+                    if similarity > best.get(book_id, 0.0):
+                        best[book_id] = similarity
+            for book_id, similarity in best.items():
+                totals[book_id] += similarity
+
+        results = []
+        for book_id, total in totals.items():
+            score = total / len(query_words)
+            if score >= threshold:
+                results.append((book_id, round(score, 3)))
+
+        results.sort(key=lambda item: (-item[1], item[0]))
+        return results[:limit]
+
+
+title_index = PrefixIndex()
+author_index = PrefixIndex()
+fuzzy_index = TrigramIndex()
+
+# The repository the indexes were built from; books added to other stores stay out
+_indexed_repository: Optional[LibraryRepository] = None
+_listening_to = weakref.WeakSet()
+
+
+def _index_book(book: Dict) -> None:
+    """Add a single book to the in-memory indexes."""
+    title_index.add(book["title"], book["id"])
+    author_index.add(book["author"], book["id"])
+    fuzzy_index.add(book["title"], book["id"])
+    fuzzy_index.add(book["author"], book["id"])
+
+
+def _index_sqlite_insert(book: Dict) -> None:
+    # Registered once for every SQLite repository: they all read library.db
+    if isinstance(_indexed_repository, SQLiteRepository):
+        _index_book(book)
+
+
+def _index_inserted_book(repository: Optional[LibraryRepository], book: Dict) -> None:
+    if repository is not None and repository is _indexed_repository:
+        _index_book(book)
+
+
+def _reindex_refreshed_snapshot(repository: Optional[SnapshotRepository]) -> None:
+    if repository is not None and repository is _indexed_repository:
+        build_search_indexes(repository)
+
+
+def build_search_indexes(repository: Optional[LibraryRepository] = None) -> None:
+    """
+    Build the in-memory indexes from a repository's catalog (the active one
+    by default) and keep them current as books are added to it, or as new
+    snapshots are loaded on a snapshot node.
+    Called once at application startup.
+    """
+    global _indexed_repository, fuzzy_index
+
+    repository = repository if repository is not None else get_repository()
+    books = repository.get_all_books()
+    title_index.bulk_load([(book["title"], book["id"]) for book in books])
+    author_index.bulk_load([(book["author"], book["id"]) for book in books])
+    # Built aside and swapped in, so searches never see a half-built index
+    rebuilt = TrigramIndex(fuzzy_index.candidate_cap)
+    for book in books:
+        rebuilt.add(book["title"], book["id"])
+        rebuilt.add(book["author"], book["id"])
+    fuzzy_index = rebuilt
+    _indexed_repository = repository
+    if isinstance(repository, SQLiteRepository):
+        repository.register_book_insert_listener(_index_sqlite_insert)
+    elif repository not in _listening_to:
+        # Listeners hold the store weakly, so a discarded store can be freed
+        _listening_to.add(repository)
+        store = weakref.ref(repository)
+        repository.register_book_insert_listener(lambda book: _index_inserted_book(store(), book))
+        if isinstance(repository, SnapshotRepository):
+            repository.register_refresh_listener(lambda: _reindex_refreshed_snapshot(store()))
+
+
+def _ensure_search_indexes() -> None:
+    """Build the indexes on first use when the app factory has not."""
+    if _indexed_repository is None:
+        build_search_indexes()
+
+
+def suggest_books(prefix: str, suggest_type: str = "title", limit: int = DEFAULT_SUGGEST_LIMIT) -> List[Dict]:
+    """
+    Suggest catalog titles or authors starting with a prefix.
+
+    Args:
+        prefix: partial input typed by the user
+        suggest_type: "title" or "author"
+        limit: maximum number of suggestions (capped at MAX_SUGGEST_LIMIT)
+
+    Returns:
+        list of dicts: [{'book_id': int, 'value': str}, ...]
+    """
+    if not prefix or not suggest_type:
+        return []
+
+    suggest_type = suggest_type.lower().strip()
+    if suggest_type not in SUGGEST_TYPES:
+        return []
+
+    _ensure_search_indexes()
+    limit = max(1, min(limit, MAX_SUGGEST_LIMIT))
+    index = title_index if suggest_type == "title" else author_index
+    return index.search(prefix, limit)
+
+
+def fuzzy_match_books(search_term: str, limit: int = DEFAULT_FUZZY_LIMIT) -> List[Tuple[int, float]]:
+    """
+    Typo-tolerant match of a search term against titles and authors.
+
+    Args:
+        search_term: possibly misspelled title or author words
+        limit: maximum number of books to return
+
+    Returns:
+        list of tuples: [(book_id, score), ...] best first
+    """
+    if not search_term or not search_term.strip():
+        return []
+
+    _ensure_search_indexes()
+    return fuzzy_index.search(search_term, limit)
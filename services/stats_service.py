@@ -0,0 +1,107 @@
+"""
+Stats Service Module - Circulation analytics
+Reads only the rollup tables that triggers keep current on every borrow
+and return, so dashboards cost the same however large borrow_records grows
+"""
+
+from datetime import date, timedelta
+from typing import Dict, Optional
+
+from database import (
+    get_top_borrowed_books, get_daily_circulation, get_patron_circulation, get_circulation_totals
+)
+
+DEFAULT_TOP_BOOKS = 10
+MAX_TOP_BOOKS = 100
+DEFAULT_STATS_DAYS = 30
+MAX_STATS_DAYS = 366
+
+
+def _rate(part: int, whole: int) -> float:
+    return round(part / whole, 4) if whole else 0.0
+
+
+def get_top_books(limit: int = DEFAULT_TOP_BOOKS) -> Dict:
+    """
+    Most borrowed titles.
+
+    Returns:
+        dict: {'books': [...], 'count': int} or {'error': message}
+    """
+    if not isinstance(limit, int) or not 0 < limit <= MAX_TOP_BOOKS:
+        return {"error": f"Limit must be an integer from 1 to {MAX_TOP_BOOKS}."}
+
+    books = get_top_borrowed_books(limit)
+    return {"books": books, "count": len(books)}
+
+
+def get_daily_stats(days: int = DEFAULT_STATS_DAYS, today: Optional[date] = None) -> Dict:
+    """
+    Checkouts and returns per day over the last `days` days, today included.
+    Days with no activity are reported as zeros.
+
+    Returns:
+        dict: {'start', 'end', 'days': [...], 'checkouts', 'returns'} or {'error': message}
+    """
+    if not isinstance(days, int) or not 0 < days <= MAX_STATS_DAYS:
+        return {"error": f"Days must be an integer from 1 to {MAX_STATS_DAYS}."}
+    if today is None:
+        today = date.today()
+
+    start = today - timedelta(days=days - 1)
+    recorded = {row["day"]: row for row in get_daily_circulation(start.isoformat(), today.isoformat())}
+
+    series = []
+    for offset in range(days):
+        day = (start + timedelta(days=offset)).isoformat()
+        row = recorded.get(day)
+        series.append({
+            "day": day,
+            "checkouts": row["checkouts"] if row else 0,
+            "returns": row["returns"] if row else 0,
+            "late_returns": row["late_returns"] if row else 0
+        })
+
+    return {
+        "start": start.isoformat(),
+        "end": today.isoformat(),
+        "days": series,
+        "checkouts": sum(entry["checkouts"] for entry in series),
+        "returns": sum(entry["returns"] for entry in series)
+    }
+
+
+def get_summary(today: Optional[date] = None) -> Dict:
+    """
+    Library-wide utilization and overdue rates.
+
+    utilization is the share of copies currently out; overdue_rate is the
+    share of open loans past their due day; late_return_rate is the share
+    of all returns that came back late.
+    """
+    if today is None:
+        today = date.today()
+
+    totals = get_circulation_totals(today.isoformat())
+    return {
+        **totals,
+        "utilization": _rate(totals["total_copies"] - totals["available_copies"], totals["total_copies"]),
+        "overdue_rate": _rate(totals["overdue_loans"], totals["open_loans"]),
+        "late_return_rate": _rate(totals["late_returns"], totals["returns"])
+    }
+
+
+def get_patron_stats(patron_id: str) -> Dict:
+    """
+    A patron's lifetime circulation counts.
+
+    Returns:
+        dict: counts and late_return_rate, or {'error': message}
+    """
+    if not patron_id or not patron_id.isdigit() or len(patron_id) != 6:
+        return {"error": "Invalid patron ID. Must be exactly 6 digits."}
+
+    stats = get_patron_circulation(patron_id) or {
+        "patron_id": patron_id, "checkouts": 0, "returns": 0, "late_returns": 0, "open_loans": 0
+    }
+    return {**stats, "late_return_rate": _rate(stats["late_returns"], stats["returns"])}
@@ -0,0 +1,91 @@
+"""
+Status Cache Module - In-memory cache of patron status reports
+A report only changes when the patron's loans or fees change (tracked by
+the patron_loan_versions counter) or when the day rolls over, so entries
+are keyed by (patron_id, date, version).
+"""
+
+import copy
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+from repositories import get_patrons_with_open_loans
+
+DEFAULT_MAX_ENTRIES = 10000
+
+
+class StatusReportCache:
+    """
+    LRU cache holding at most one report per patron.
+
+    Only the newest (date, version) for a patron is useful, so a patron's
+    entry is replaced rather than kept alongside stale versions.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # patron_id -> (date, version, report)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, patron_id: str, day: str, version: int) -> Optional[Dict]:
+        """Get a copy of the cached report if it matches the day and version."""
+        with self._lock:
+            entry = self._entries.get(patron_id)
+            if entry is None or entry[0] != day or entry[1] != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(patron_id)
+            self.hits += 1
+            report = entry[2]
+        return copy.deepcopy(report)
+
+    def put(self, patron_id: str, day: str, version: int, report: Dict) -> None:
+        """Cache a report, evicting the least recently used patron if full."""
+        with self._lock:
+            self._entries[patron_id] = (day, version, copy.deepcopy(report))
+            self._entries.move_to_end(patron_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, patron_id: str) -> None:
+        """Drop a patron's cached report."""
+        with self._lock:
+            self._entries.pop(patron_id, None)
+
+    def clear(self) -> None:
+        """Drop every cached report."""
+        with self._lock:
+            self._entries.clear()
+
+
+status_report_cache = StatusReportCache()
+
+
+def invalidate_patron_status(patron_id: str) -> None:
+    """Hook for the borrow, return and payment paths."""
+    status_report_cache.invalidate(patron_id)
+
+
+def warm_status_cache(build_report: Callable[[str], Dict], limit: Optional[int] = None) -> int:
+    """
+    Build and cache reports for patrons with open loans.
+
+    Args:
+        build_report: function returning a patron's report (caches it as a side effect)
+        limit: most patrons to warm (defaults to the cache capacity)
+
+    Returns:
+        int: number of patrons warmed
+    """
+    if limit is None:
+        limit = status_report_cache.max_entries
+    patron_ids = get_patrons_with_open_loans(limit)
+    for patron_id in patron_ids:
+        build_report(patron_id)
+    return len(patron_ids)
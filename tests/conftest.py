@@ -0,0 +1,23 @@
+import pytest
+import database
+from database import init_database, add_sample_data
+from services.status_cache import status_report_cache
+
+
+@pytest.fixture
+def storage_profile():
+    """Storage profile the fresh database is created with (None keeps the current one)."""
+    return None
+
+
+@pytest.fixture
+def fresh_db(tmp_path, monkeypatch, storage_profile):
+    """Point the services at a fresh sample database with an empty status cache."""
+    monkeypatch.setattr(database, "DATABASE", str(tmp_path / "library.db"))
+    if storage_profile is not None:
+        monkeypatch.setattr(database, "STORAGE_PROFILE", database.STORAGE_PROFILES[storage_profile])
+    init_database()
+    add_sample_data()
+    status_report_cache.clear()
+    yield
+    status_report_cache.clear()
@@ -0,0 +1,43 @@
+import asyncio
+import pytest
+import async_database
+from services.async_library_service import calculate_late_fee_for_book, search_books, get_patron_loans
+
+
+pytestmark = pytest.mark.usefixtures("fresh_db")
+
+
+def test_async_late_fee_matches_rules():
+    """Testing the async late fee applies the R5 rules"""
+    result = asyncio.run(calculate_late_fee_for_book("298734", 2))
+
+    assert result["fee_amount"] == 6.50
+    assert result["days_overdue"] == 10
+    assert result["status"] == "Completed"
+
+
+def test_async_late_fee_invalid_inputs():
+    """Testing the async late fee validates patron and book"""
+    assert asyncio.run(calculate_late_fee_for_book("12", 2))["status"] == "Invalid patron ID"
+    assert asyncio.run(calculate_late_fee_for_book("298734", 99))["status"] == "Book Doesn't Exist"
+
+
+def test_async_queries_run_concurrently_on_pool():
+    """Testing many concurrent reads complete on the bounded pool"""
+    async def lookups():
+        return await asyncio.gather(*(async_database.get_book_by_id(1) for _ in range(50)))
+
+    books = asyncio.run(lookups())
+
+    assert len(books) == 50
+    assert all(book["title"] == "The Great Gatsby" for book in books)
+
+
+def test_async_search_and_loans():
+    """Testing async search and patron loans"""
+    page = asyncio.run(search_books(author="orwell"))
+    loans = asyncio.run(get_patron_loans("298745"))
+
+    assert [book["title"] for book in page["results"]] == ["1984"]
+    assert loans[0]["late_fee"] == 15.00
+    assert asyncio.run(get_patron_loans("abc")) is None
@@ -0,0 +1,82 @@
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from database import get_db_connection
+from services.backup_service import BackupScheduler, create_backup, list_backups, verify_backup
+
+
+pytestmark = pytest.mark.usefixtures("fresh_db")
+
+
+def test_backup_is_a_verified_copy(tmp_path):
+    """Testing a backup holds the same rows and passes its integrity check"""
+    result = create_backup(str(tmp_path / "backups"), pages=2, pause=0)
+
+    assert result["status"] == "Completed"
+    assert result["pages"] > 0
+    assert verify_backup(result["path"]) == "ok"
+    copy = sqlite3.connect(result["path"])
+    assert copy.execute("SELECT COUNT(*) FROM books").fetchone()[0] == 3
+    assert copy.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+    copy.close()
+
+
+def test_backups_are_rotated(tmp_path):
+    """Testing only the newest `keep` backups are retained"""
+    backup_dir = str(tmp_path / "backups")
+    start = datetime(2024, 1, 1, 1, 0)
+    for day in range(4):
+        result = create_backup(backup_dir, keep=2, pause=0, now=start + timedelta(days=day))
+
+    assert list_backups(backup_dir) == ["library-20240103-010000.db", "library-20240104-010000.db"]
+    assert result["removed"] == ["library-20240102-010000.db"]
+
+
+def test_writers_continue_during_backup(tmp_path):
+    """Testing writes committed mid-backup succeed and the copy is a consistent snapshot"""
+    conn = get_db_connection()
+    conn.executemany("INSERT INTO books (title, author, isbn, total_copies, available_copies) VALUES (?, ?, ?, 1, 1)",
+                     [(f"Title {i}", "Author", f"{i:013d}") for i in range(2000)])
+    conn.commit()
+    conn.close()
+
+    writes = []
+
+    def writer():
+        conn = get_db_connection()
+        for i in range(20):
+            conn.execute("INSERT INTO books (title, author, isbn, total_copies, available_copies) "
+                         "VALUES ('Late', 'Author', ?, 1, 1)", (f"9{i:012d}",))
+            conn.commit()
+            writes.append(i)
+        conn.close()
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    result = create_backup(str(tmp_path / "backups"), pages=1, pause=0.001)
+    thread.join()
+
+    assert result["status"] == "Completed"
+    assert len(writes) == 20
+    copy = sqlite3.connect(result["path"])
+    count = copy.execute("SELECT COUNT(*) FROM books").fetchone()[0]
+    copy.close()
+    assert 2003 <= count <= 2023
+
+
+def test_invalid_backup_options(tmp_path):
+    """Testing nonsensical options are rejected"""
+    assert create_backup(str(tmp_path / "backups"), keep=0)["status"] != "Completed"
+
+
+def test_backup_scheduler_runs_in_window(tmp_path):
+    """Testing the scheduler backs up once inside its window"""
+    now = [datetime(2024, 1, 1, 12, 0)]
+    scheduler = BackupScheduler(str(tmp_path / "backups"), clock=lambda: now[0])
+
+    assert scheduler.run_pending() is None
+    now[0] = datetime(2024, 1, 2, 1, 15)
+    assert scheduler.run_pending()["status"] == "Completed"
+    assert scheduler.run_pending() is None
@@ -0,0 +1,162 @@
+import os
+
+import pytest
+import database
+from database import insert_book
+from app import create_app
+from repositories import SQLiteRepository, get_repository, set_repository, use_repository
+from repositories.snapshot import CatalogSnapshot, SnapshotError, SnapshotRepository
+from services.catalog_snapshot import export_catalog_snapshot
+from services.library_service import (
+    add_book_to_catalog, borrow_book_by_patron, search_books_filtered, search_books_in_catalog
+)
+from services.search_index import build_search_indexes, suggest_books
+
+
+@pytest.fixture(autouse=True)
+def extra_books(fresh_db):
+    """Add a few books to the fresh sample database."""
+    insert_book("Brave New World", "Aldous Huxley", "9780060850524", 2, 0)
+    insert_book("Animal Farm", "George Orwell", "9780451526342", 1, 1)
+    insert_book("Café Society", "Émile Zola", "9780000000001", 1, 1)
+
+
+@pytest.fixture
+def snapshot_path(tmp_path):
+    path = str(tmp_path / "catalog.snap")
+    assert export_catalog_snapshot(path)["status"] == "Completed"
+    return path
+
+
+def test_snapshot_matches_the_database(snapshot_path):
+    """Testing every book reads back from the snapshot exactly as stored"""
+    repository = SnapshotRepository(snapshot_path)
+    sqlite = SQLiteRepository()
+
+    assert repository.get_all_books() == sqlite.get_all_books()
+    assert repository.get_book_by_id(3) == sqlite.get_book_by_id(3)
+    assert repository.get_book_by_isbn("9780000000001").author == "Émile Zola"
+    assert repository.get_book_by_id(99) is None and repository.get_book_by_isbn("0") is None
+    assert sorted(repository.get_books_by_ids([1, 5, 99])) == [1, 5]
+    assert repository.snapshot.version == database.get_latest_catalog_change()
+
+
+@pytest.mark.parametrize("term, search_type", [
+    ("mock", "title"), ("ORWELL", "author"), ("an", "title"), ("é", "author"), ("café", "title"),
+    ("9780451524935", "isbn"), ("xyz", "title"),
+])
+def test_field_search_agrees_with_sqlite(snapshot_path, term, search_type):
+    """Testing trigram-indexed and short-term searches find the same books as LIKE"""
+    expected = [book.id for book in SQLiteRepository().search_books_by_field(search_type, term)]
+    if term in ("é", "café"):
+        # SQLite's LOWER() only folds ASCII; these match case-sensitively there
+        expected = [6]
+
+    with use_repository(SnapshotRepository(snapshot_path)):
+        assert [book.id for book in search_books_in_catalog(term, search_type)] == expected
+
+
+@pytest.mark.parametrize("filters", [
+    {"title": "o"}, {"title": "the"}, {"author": "orwell"}, {"author_prefix": "geo"}, {"available_only": True},
+    {"isbn": "9780060850524"}, {"title": "a", "available_only": True},
+])
+def test_filtered_pages_agree_with_sqlite(snapshot_path, filters):
+    """Testing keyset pages and counts match the SQLite backend page by page"""
+    def pages():
+        results, cursor = [], None
+        while True:
+            page = search_books_filtered(limit=2, cursor=cursor, **filters)
+            results.append(([book.id for book in page["results"]], page["total_estimate"]))
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return results
+
+    expected = pages()
+    with use_repository(SnapshotRepository(snapshot_path)):
+        assert pages() == expected
+
+
+def test_page_after_cursor_skips_earlier_rows(snapshot_path, monkeypatch):
+    """Testing a cursor page decodes rows from the cursor on, plus those needed for the count"""
+    repository = SnapshotRepository(snapshot_path)
+    decoded = []
+    book = repository.snapshot.book
+    monkeypatch.setattr(repository.snapshot, "book", lambda row: decoded.append(row) or book(row))
+
+    page, total = repository.search_books_page(None, None, None, None, False, ("Café Society", 6),
+                                               limit=10, count_cap=1, conn=None)
+
+    assert [book.title for book in page] == ["The Great Gatsby", "To Kill a Mockingbird"]
+    assert total == 1
+    assert len(decoded) == 3
+
+
+def test_new_snapshot_is_picked_up(snapshot_path):
+    """Testing a node reloads when a newer export replaces its snapshot"""
+    repository = SnapshotRepository(snapshot_path, check_interval=0)
+    before = repository.get_book_by_id(1)
+    borrow_book_by_patron("111111", 1)
+
+    assert repository.get_book_by_id(1).available_copies == 3
+    export_catalog_snapshot(snapshot_path)
+
+    assert repository.get_book_by_id(1).available_copies == 2
+    assert repository.snapshot.version == database.get_latest_catalog_change()
+    assert before.available_copies == 3
+
+
+def test_refresh_rebuilds_search_indexes(snapshot_path):
+    """Testing suggestions on a snapshot node follow a newly loaded snapshot"""
+    repository = SnapshotRepository(snapshot_path, check_interval=0)
+    build_search_indexes(repository)
+    try:
+        add_book_to_catalog("Brave Little Toaster", "Thomas Disch", "9780000000002", 1)
+
+        assert "Brave Little Toaster" not in [s["value"] for s in suggest_books("brave", "title")]
+        export_catalog_snapshot(snapshot_path)
+        assert repository.refresh()
+
+        assert "Brave Little Toaster" in [s["value"] for s in suggest_books("brave", "title")]
+    finally:
+        build_search_indexes(get_repository())
+
+
+def test_damaged_snapshot_is_rejected(snapshot_path):
+    """Testing a corrupt file fails verification and a running node keeps its snapshot"""
+    repository = SnapshotRepository(snapshot_path, check_interval=0)
+    with open(snapshot_path, "r+b") as handle:
+        handle.seek(-1, os.SEEK_END)
+        handle.write(b"\xff")
+
+    with pytest.raises(SnapshotError):
+        CatalogSnapshot(snapshot_path, verify=True)
+    with open(snapshot_path, "r+b") as handle:
+        handle.write(b"NOTACATALOG")  # overwrite the magic so any open rejects it
+        handle.seek(0, os.SEEK_END)
+        handle.write(b"!")  # grow the file so the refresh check sees a change
+
+    with pytest.raises(SnapshotError):
+        CatalogSnapshot(snapshot_path)
+    assert not repository.refresh()
+    assert repository.get_book_by_id(1).title == "The Great Gatsby"
+
+
+def test_snapshot_node_is_read_only(snapshot_path):
+    """Testing writes through a snapshot repository fail instead of reaching the database"""
+    with use_repository(SnapshotRepository(snapshot_path)):
+        success, message = borrow_book_by_patron("111111", 1)
+
+    assert not success and "Database error" in message
+    assert SQLiteRepository().get_book_by_id(1).available_copies == 3
+
+
+def test_create_app_serves_search_from_snapshot(snapshot_path):
+    """Testing REPOSITORY='snapshot' answers the search API from the file"""
+    app = create_app({'TESTING': True, 'STATUS_CACHE_WARMUP': False,
+                      'REPOSITORY': 'snapshot', 'CATALOG_SNAPSHOT': snapshot_path})
+    try:
+        assert isinstance(get_repository(), SnapshotRepository)
+        response = app.test_client().get('/api/search?author=huxley')
+        assert [book["title"] for book in response.get_json()["results"]] == ["Brave New World"]
+    finally:
+        set_repository(SQLiteRepository())
@@ -0,0 +1,84 @@
+import pytest
+import database
+from app import create_app
+from routes.catalog_routes import row_cache
+from services.library_service import borrow_book_by_patron
+
+
+@pytest.fixture(autouse=True)
+def empty_row_cache(fresh_db):
+    """Start each test on the fresh database with an empty row cache."""
+    row_cache.clear()
+
+
+@pytest.fixture
+def app():
+    return create_app({'TESTING': True, 'STATUS_CACHE_WARMUP': False})
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def test_catalog_view_returns_streamed_response(app):
+    """Testing the catalog view hands back a streamed response"""
+    with app.test_request_context('/catalog'):
+        response = app.make_response(app.view_functions['catalog.catalog']())
+
+        assert response.is_streamed
+        response.close()
+
+
+def test_catalog_lists_every_book(client):
+    """Testing the streamed catalog page lists every book in title order"""
+    html = client.get('/catalog').get_data(as_text=True)
+
+    assert html.index("1984") < html.index("The Great Gatsby") < html.index("To Kill a Mockingbird")
+    assert "3/3 Available" in html
+    assert "Place Hold" in html
+
+
+def test_unchanged_rows_come_from_fragment_cache(client):
+    """Testing a second view reuses every row fragment"""
+    client.get('/catalog').get_data()
+    misses = row_cache.misses
+
+    client.get('/catalog').get_data()
+
+    assert row_cache.misses == misses
+    assert row_cache.hits == 3
+
+
+def test_availability_change_rerenders_only_that_row(client):
+    """Testing a borrow re-renders the borrowed book's row only"""
+    client.get('/catalog').get_data()
+    misses = row_cache.misses
+
+    borrow_book_by_patron("123456", 1)
+    html = client.get('/catalog').get_data(as_text=True)
+
+    assert row_cache.misses == misses + 1
+    assert "2/3 Available" in html
+
+
+def test_flashed_message_is_shown_once(client):
+    """Testing a message flashed before a redirect to the streamed catalog is not shown again"""
+    form = {'title': 'Flash Book', 'author': 'Author', 'isbn': '1234567890123', 'total_copies': '1'}
+
+    html = client.post('/add_book', data=form, follow_redirects=True).get_data(as_text=True)
+    assert '<div class="flash-success">' in html
+
+    assert '<div class="flash-success">' not in client.get('/catalog').get_data(as_text=True)
+
+
+def test_empty_catalog_shows_placeholder(client):
+    """Testing an empty catalog renders the empty-state message"""
+    conn = database.get_db_connection()
+    conn.execute('DELETE FROM books')
+    conn.commit()
+    conn.close()
+
+    html = client.get('/catalog').get_data(as_text=True)
+
+    assert "No books in catalog" in html
@@ -0,0 +1,102 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from database import get_db_connection
+from app import create_app
+from services.change_feed import get_catalog_changes_since, prune_catalog_change_log
+from services.library_service import add_book_to_catalog, borrow_book_by_patron
+
+
+pytestmark = pytest.mark.usefixtures("fresh_db")
+
+
+@pytest.fixture
+def client():
+    return create_app({'TESTING': True, 'STATUS_CACHE_WARMUP': False}).test_client()
+
+
+def test_changes_follow_catalog_writes():
+    """Testing inserts and availability changes appear in order with the current row"""
+    latest = get_catalog_changes_since(None)["latest"]
+    add_book_to_catalog("New Book", "Author", "1234567890123", 2)
+    borrow_book_by_patron("111111", 1)
+
+    feed = get_catalog_changes_since(latest)
+
+    assert [change["book"]["title"] for change in feed["changes"]] == ["New Book", "The Great Gatsby"]
+    assert feed["changes"][1]["book"]["available_copies"] == 2
+    assert feed["next_since"] == latest + 2
+    assert get_catalog_changes_since(feed["next_since"])["changes"] == []
+
+
+def test_repeated_changes_to_a_book_are_coalesced():
+    """Testing a page carries one entry per book, at its latest change"""
+    latest = get_catalog_changes_since(None)["latest"]
+    borrow_book_by_patron("111111", 1)
+    borrow_book_by_patron("222222", 1)
+
+    feed = get_catalog_changes_since(latest)
+
+    assert len(feed["changes"]) == 1
+    assert feed["changes"][0]["seq"] == latest + 2
+    assert feed["changes"][0]["book"]["available_copies"] == 1
+
+
+def test_paging_and_deletes():
+    """Testing limit pages through the log and deleted books are flagged"""
+    conn = get_db_connection()
+    conn.execute("DELETE FROM books WHERE id = 2")
+    conn.commit()
+    conn.close()
+
+    first = get_catalog_changes_since(0, limit=2)
+    assert first["has_more"]
+    rest = get_catalog_changes_since(first["next_since"], limit=100)
+    assert rest["changes"][-1] == {"seq": rest["next_since"], "book_id": 2, "deleted": True, "book": None}
+
+
+def test_long_poll_returns_when_a_change_arrives():
+    """Testing a waiting consumer is answered as soon as the catalog changes"""
+    latest = get_catalog_changes_since(None)["latest"]
+    timer = threading.Timer(0.3, borrow_book_by_patron, ("111111", 1))
+    timer.start()
+
+    started = time.monotonic()
+    feed = get_catalog_changes_since(latest, wait=5)
+
+    assert time.monotonic() - started < 3
+    assert [change["book_id"] for change in feed["changes"]] == [1]
+
+
+def test_long_poll_times_out_empty():
+    """Testing a long poll with no changes returns an empty page after the wait"""
+    latest = get_catalog_changes_since(None)["latest"]
+    feed = get_catalog_changes_since(latest, wait=0.3)
+
+    assert feed == {"changes": [], "next_since": latest, "has_more": False}
+
+
+def test_pruned_consumers_must_resync():
+    """Testing a consumer behind the pruned log is told to resync"""
+    assert prune_catalog_change_log(now=datetime.now() + timedelta(days=30)) > 0
+
+    assert get_catalog_changes_since(0)["resync"]
+    latest = get_catalog_changes_since(None)["latest"]
+    assert "resync" not in get_catalog_changes_since(latest)
+
+
+def test_changes_endpoint(client):
+    """Testing /api/changes serves the feed and validates its parameters"""
+    latest = client.get('/api/changes').get_json()["latest"]
+    client.post('/borrow', data={'patron_id': '111111', 'book_id': '1'})
+
+    response = client.get(f'/api/changes?since={latest}')
+    assert response.status_code == 200
+    assert response.get_json()["changes"][0]["book"]["id"] == 1
+
+    assert client.get('/api/changes?since=abc').status_code == 400
+    assert client.get('/api/changes?since=-1').status_code == 400
+    prune_catalog_change_log(now=datetime.now() + timedelta(days=30))
+    assert client.get('/api/changes?since=0').status_code == 410
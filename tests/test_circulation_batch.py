@@ -0,0 +1,62 @@
+import pytest
+from database import insert_book, get_book_by_id, get_patron_borrow_count
+from services.library_service import borrow_book_by_patron, borrow_books_batch, return_books_batch
+
+
+pytestmark = pytest.mark.usefixtures("fresh_db")
+
+
+def test_batch_borrow_reports_each_book():
+    """Testing a batch borrows what it can and explains the rest"""
+    success, message, results = borrow_books_batch("111111", [1, 2, 3, 99])
+
+    assert success is True
+    assert message == "Borrowed 2 of 4 books."
+    assert [r["success"] for r in results] == [True, True, False, False]
+    assert "not available" in results[2]["message"].lower()
+    assert "not found" in results[3]["message"].lower()
+    assert get_book_by_id(1)["available_copies"] == 2
+    assert get_patron_borrow_count("111111") == 2
+
+
+def test_batch_borrow_enforces_limit_once():
+    """Testing books past the borrowing limit are rejected"""
+    for i in range(6):
+        insert_book(f"Kiosk Book {i}", "Test Author", f"88888888888{i:02d}", 1, 1)
+    book_ids = [4, 5, 6, 7, 8, 9]
+
+    success, _, results = borrow_books_batch("222222", book_ids)
+
+    assert success is True
+    assert [r["success"] for r in results] == [True] * 5 + [False]
+    assert "limit" in results[-1]["message"].lower()
+
+
+def test_batch_return_with_late_fee():
+    """Testing a batch return closes loans and computes fees"""
+    success, _, results = return_books_batch("345453", [2, 1])
+
+    assert success is True
+    assert results[0]["success"] is True
+    assert results[0]["fee_amount"] == 2.50
+    assert results[1]["success"] is False
+    assert get_patron_borrow_count("345453") == 0
+
+
+def test_batch_invalid_request():
+    """Testing malformed batches are rejected before any work"""
+    assert borrow_books_batch("12345", [1])[:2] == (False, "Invalid patron ID. Must be exactly 6 digits.")
+    assert borrow_books_batch("123456", [])[0] is False
+    assert return_books_batch("123456", ["1"])[0] is False
+
+
+def test_desk_and_kiosk_share_the_borrow_limit():
+    """Testing a patron at the limit is refused at the desk as well as the kiosk"""
+    for i in range(6):
+        insert_book(f"Limit Book {i}", "Test Author", f"77777777777{i:02d}", 1, 1)
+    for book_id in range(4, 9):
+        assert borrow_book_by_patron("222222", book_id)[0]
+
+    success, message = borrow_book_by_patron("222222", 9)
+    assert not success and "limit of 5" in message
+    assert not borrow_books_batch("222222", [9])[2][0]["success"]
@@ -0,0 +1,74 @@
+import pytest
+import sqlite3
+from datetime import date
+import database
+from database import init_database
+from services.library_service import borrow_book_by_patron, return_book_by_patron
+from services.stats_service import get_top_books, get_daily_stats, get_summary, get_patron_stats
+
+
+pytestmark = pytest.mark.usefixtures("fresh_db")
+
+
+def test_top_books_ranked_by_checkouts():
+    """Testing the most borrowed book comes first"""
+    result = get_top_books(2)
+
+    assert result["count"] == 2
+    assert result["books"][0]["book_id"] == 2
+    assert result["books"][0]["checkouts"] == 3
+    assert result["books"][0]["open_loans"] == 3
+
+
+def test_borrow_and_late_return_update_rollups():
+    """Testing borrows and returns are counted as they happen"""
+    before = get_daily_stats(1)
+
+    borrow_book_by_patron("123456", 1)
+    return_book_by_patron("298734", 2)
+
+    today = get_daily_stats(1)["days"][0]
+    assert today["checkouts"] == before["days"][0]["checkouts"] + 1
+    assert today["returns"] == 1
+    assert today["late_returns"] == 1
+    assert get_patron_stats("298734")["late_return_rate"] == 1.0
+
+
+def test_summary_reports_utilization_and_overdue_rate():
+    """Testing copies out and overdue loans come from the rollups"""
+    summary = get_summary()
+
+    assert summary["total_copies"] == 6
+    assert summary["open_loans"] == 4
+    assert summary["overdue_loans"] == 3
+    assert summary["overdue_rate"] == 0.75
+
+
+def test_daily_series_fills_quiet_days():
+    """Testing every day in the window is reported"""
+    result = get_daily_stats(7, today=date(2030, 1, 7))
+
+    assert [entry["day"] for entry in result["days"]][0] == "2030-01-01"
+    assert len(result["days"]) == 7
+    assert result["checkouts"] == 0
+
+
+def test_existing_loans_are_backfilled():
+    """Testing a database created before the rollups gets them backfilled"""
+    conn = sqlite3.connect(database.DATABASE)
+    for table in ("circulation_daily", "book_circulation", "patron_circulation", "open_loans_by_due_day"):
+        conn.execute(f"DROP TABLE {table}")
+    conn.commit()
+    conn.close()
+
+    init_database()
+
+    assert get_top_books(1)["books"][0]["checkouts"] == 3
+    assert get_summary()["open_loans"] == 4
+
+
+def test_invalid_arguments_rejected():
+    """Testing limits and patron IDs are validated"""
+    assert "error" in get_top_books(0)
+    assert "error" in get_daily_stats(None)
+    assert "error" in get_patron_stats("12")
@@ -0,0 +1,94 @@
+import asyncio
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import Mock
+from database import get_patron_balance, iter_open_loans
+from services.fee_ledger_service import accrue_late_fees, get_patron_fee_balance
+from services.library_service import (
+    calculate_late_fee_for_book, pay_late_fees, refund_late_fee_payment, return_book_by_patron, return_books_batch
+)
+from services.async_library_service import get_patron_loans
+from services.notice_service import build_patron_notices
+from services.payment_service import PaymentGateway
+
+
+pytestmark = pytest.mark.usefixtures("fresh_db")
+
+
+def paying_gateway(txn_id="txn_298734_1"):
+    gateway = Mock(spec=PaymentGateway)
+    gateway.process_payment.return_value = (True, txn_id, "Payment processed")
+    gateway.refund_payment.return_value = (True, "Refund processed")
+    return gateway
+
+
+def test_accrual_is_incremental():
+    """Testing each run only adds the growth since the previous run"""
+    now = datetime.now()
+
+    first = accrue_late_fees(now)
+    again = accrue_late_fees(now)
+    next_day = accrue_late_fees(now + timedelta(days=1))
+
+    assert first["entries"] == 3
+    assert first["amount_accrued"] == 2.50 + 6.50 + 15.00
+    assert again["entries"] == 0
+    assert next_day["entries"] == 2
+    assert next_day["amount_accrued"] == 0.50 + 1.00
+    assert get_patron_fee_balance("298734") == {"patron_id": "298734", "balance": 7.50}
+
+
+def test_capped_loans_are_not_examined_again():
+    """Testing loans at the maximum fee drop out of later runs"""
+    now = datetime.now()
+    accrue_late_fees(now)
+
+    result = accrue_late_fees(now + timedelta(days=1))
+
+    assert result["loans_examined"] == 2
+
+
+def test_paid_fee_no_longer_owed():
+    """Testing a recorded payment clears the fee and the balance"""
+    accrue_late_fees()
+
+    success, _, txn_id = pay_late_fees("298734", 2, paying_gateway())
+    fee_info = calculate_late_fee_for_book("298734", 2)
+
+    assert success is True
+    assert fee_info["fee_amount"] == 0.00
+    assert fee_info["amount_paid"] == 6.50
+    assert get_patron_balance("298734") == 0.00
+    assert pay_late_fees("298734", 2, paying_gateway())[1] == "No late fees to pay for this book."
+
+
+def test_paid_fee_is_netted_everywhere_loans_are_priced():
+    """Testing loan lists, notices and kiosk returns subtract ledger payments"""
+    pay_late_fees("298734", 2, paying_gateway())
+
+    assert asyncio.run(get_patron_loans("298734"))[0]["late_fee"] == 0.0
+    assert [paid for loan, paid in iter_open_loans() if loan["patron_id"] == "298734"] == [6.50]
+    notices = build_patron_notices(iter_open_loans(), datetime.now())
+    assert next(n for n in notices if n["patron_id"] == "298734")["total_late_fees"] == 0.0
+    assert return_books_batch("298734", [2])[2][0]["fee_amount"] == 0.0
+
+
+def test_refund_restores_amount_owed():
+    """Testing a refund is credited back against the paid loan"""
+    pay_late_fees("298734", 2, paying_gateway())
+
+    success, _ = refund_late_fee_payment("txn_298734_1", 2.00, paying_gateway())
+
+    assert success is True
+    assert calculate_late_fee_for_book("298734", 2)["fee_amount"] == 2.00
+    assert get_patron_balance("298734") == -4.50
+
+
+def test_late_return_between_runs_is_accrued():
+    """Testing a loan returned late before the job ran is still charged"""
+    accrue_late_fees(datetime.now() - timedelta(days=30))
+    return_book_by_patron("345453", 2)
+
+    accrue_late_fees()
+
+    assert get_patron_balance("345453") == 2.50
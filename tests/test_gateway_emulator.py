@@ -0,0 +1,137 @@
+import time
+import pytest
+from gateway_emulator import EmulatorConfig, GatewayEmulator, parse_latency
+from services.idempotency import KEY_IN_PROGRESS
+from services.library_service import pay_late_fees, refund_late_fee_payment
+from services.payment_service import PaymentGateway, PaymentGatewayError, PaymentGatewayTimeout, GATEWAY_URL_ENV
+
+
+pytestmark = pytest.mark.usefixtures("fresh_db")
+
+
+@pytest.fixture
+def start_emulator():
+    emulators = []
+
+    def start(**settings):
+        emulator = GatewayEmulator(EmulatorConfig(seed=1, **settings))
+        emulator.start()
+        emulators.append(emulator)
+        return emulator
+
+    yield start
+    for emulator in emulators:
+        emulator.stop()
+
+
+def test_charge_refund_and_status_over_http(start_emulator):
+    """Testing the HTTP gateway mode against the emulator end to end"""
+    emulator = start_emulator()
+    gateway = PaymentGateway(base_url=emulator.base_url)
+
+    success, txn_id, _ = gateway.process_payment("298734", 6.50, "Late fees")
+    refunded, _ = gateway.refund_payment(txn_id, 2.00)
+    status = gateway.verify_payment_status(txn_id)
+
+    assert gateway.mode == "http"
+    assert success and refunded
+    assert status["status"] == "partially_refunded" and status["amount"] == 6.50
+    assert gateway.verify_payment_status("txn_unknown")["status"] == "not_found"
+
+
+def test_gateway_rejections_are_definite_answers(start_emulator):
+    """Testing 4xx replies come back as failures, not errors"""
+    gateway = PaymentGateway(base_url=start_emulator().base_url)
+
+    assert gateway.process_payment("298734", 5000) == (False, "", "Payment declined: amount exceeds limit")
+    assert gateway.refund_payment("txn_missing", 1.00) == (False, "Transaction not found")
+
+
+def test_injected_errors_and_rate_limit_raise(start_emulator):
+    """Testing 5xx and 429 replies are reported as gateway errors"""
+    failing = PaymentGateway(base_url=start_emulator(error_rate=1.0).base_url)
+    limited = PaymentGateway(base_url=start_emulator(rate_limit=1, burst=1).base_url)
+
+    with pytest.raises(PaymentGatewayError, match="503"):
+        failing.process_payment("298734", 5.00)
+    limited.verify_payment_status("txn_a")
+    with pytest.raises(PaymentGatewayError, match="429"):
+        limited.verify_payment_status("txn_b")
+
+
+def test_hung_request_times_out(start_emulator):
+    """Testing a hung gateway call fails at the client timeout"""
+    emulator = start_emulator(timeout_rate=1.0, hang_seconds=1.0)
+    gateway = PaymentGateway(base_url=emulator.base_url, timeout=0.2)
+
+    with pytest.raises(PaymentGatewayTimeout, match="timed out"):
+        gateway.process_payment("298734", 5.00)
+
+
+def test_gateway_dedupes_keyed_requests(start_emulator):
+    """Testing a charge or refund retried with the same key is carried out once"""
+    emulator = start_emulator()
+    gateway = PaymentGateway(base_url=emulator.base_url)
+
+    first = gateway.process_payment("298734", 6.50, "Late fees", idempotency_key="kiosk-1")
+    retry = gateway.process_payment("298734", 6.50, "Late fees", idempotency_key="kiosk-1")
+    refunds = [gateway.refund_payment(first[1], 2.00, idempotency_key="refund-1") for _ in range(2)]
+
+    assert retry == first
+    assert refunds[0] == refunds[1] and refunds[0][0]
+    assert len(emulator.transactions) == 1
+    assert emulator.transactions[first[1]]["refunded"] == 2.00
+    assert not gateway.process_payment("298734", 9.00, idempotency_key="kiosk-1")[0]
+
+
+def test_timed_out_payment_keeps_its_key(start_emulator):
+    """Testing a payment that times out after the charge is not charged again on retry"""
+    emulator = start_emulator(latency="fixed:0.4")
+    gateway = PaymentGateway(base_url=emulator.base_url, timeout=0.1)
+
+    first = pay_late_fees("298734", 2, gateway, idempotency_key="kiosk-2")
+    time.sleep(0.5)
+    retry = pay_late_fees("298734", 2, gateway, idempotency_key="kiosk-2")
+
+    assert first[0] is False and "timed out" in first[1]
+    assert retry == (False, KEY_IN_PROGRESS, None)
+    assert len(emulator.transactions) == 1
+
+
+def test_charge_with_lost_reply_is_not_repeated_on_retry(start_emulator):
+    """Testing a charge whose reply was lost is replayed, not charged again, on a same-key retry"""
+    emulator = start_emulator(lost_reply_rate=1.0, hang_seconds=0.5)
+    gateway = PaymentGateway(base_url=emulator.base_url, timeout=0.1)
+
+    with pytest.raises(PaymentGatewayTimeout):
+        gateway.process_payment("298734", 6.50, "Late fees", idempotency_key="kiosk-3")
+    assert len(emulator.transactions) == 1
+    emulator.config.lost_reply_rate = 0.0
+    success, txn_id, _ = gateway.process_payment("298734", 6.50, "Late fees", idempotency_key="kiosk-3")
+
+    assert success and txn_id in emulator.transactions
+    assert len(emulator.transactions) == 1
+
+
+def test_services_use_gateway_url_from_environment(start_emulator, monkeypatch):
+    """Testing pay and refund reach the emulator when PAYMENT_GATEWAY_URL is set"""
+    emulator = start_emulator(latency="uniform:0.001,0.01")
+    monkeypatch.setenv(GATEWAY_URL_ENV, emulator.base_url)
+
+    success, _, txn_id = pay_late_fees("298734", 2)
+    refund_ok, _ = refund_late_fee_payment(txn_id, 1.50)
+
+    assert success and refund_ok
+    assert emulator.transactions[txn_id]["amount"] == 6.50
+    assert emulator.transactions[txn_id]["refunded"] == 1.50
+
+
+def test_latency_specs():
+    """Testing latency specs parse and bad ones are rejected"""
+    import random
+    rng = random.Random(1)
+
+    assert parse_latency("fixed:0.25")(rng) == 0.25
+    assert 0.1 <= parse_latency("uniform:0.1,0.2")(rng) <= 0.2
+    with pytest.raises(ValueError):
+        parse_latency("gamma:1")
@@ -0,0 +1,69 @@
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import database
+from database import (
+    insert_borrow_record, get_patron_borrow_count,
+    start_circulation_writer, stop_circulation_writer, submit_write, GroupCommitWriter
+)
+
+
+@pytest.fixture(autouse=True)
+def stop_writer(fresh_db):
+    """Stop any writer a test started."""
+    yield
+    stop_circulation_writer()
+
+
+def test_concurrent_writes_share_commits():
+    """Testing queued writes are applied in fewer transactions than operations"""
+    writer = GroupCommitWriter(max_batch=64, max_wait=0.05)
+    writer.start()
+    now = datetime.now()
+
+    def borrow(i):
+        return writer.submit(lambda conn: conn.execute(
+            "INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date) VALUES (?, ?, ?, ?)",
+            ("444444", 1, now.isoformat(), (now + timedelta(days=14)).isoformat())
+        ).rowcount)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        futures = list(pool.map(borrow, range(40)))
+    results = [future.result(timeout=5) for future in futures]
+    writer.stop()
+
+    assert results == [1] * 40
+    assert writer.operations == 40
+    assert writer.batches < 40
+    assert get_patron_borrow_count("444444") == 40
+
+
+def test_failed_operation_does_not_abort_its_batch():
+    """Testing one failing write is rolled back alone"""
+    writer = GroupCommitWriter(max_batch=8, max_wait=0.05)
+
+    def bad_write(conn):
+        conn.execute("UPDATE books SET available_copies = 99 WHERE id = 1")
+        raise ValueError("boom")
+
+    failing = writer.submit(bad_write)
+    passing = writer.submit(lambda conn: conn.execute("UPDATE books SET available_copies = 7 WHERE id = 2"))
+    writer.start()
+    writer.stop()
+
+    with pytest.raises(ValueError):
+        failing.result(timeout=5)
+    assert passing.result(timeout=5) is not None
+    assert database.get_book_by_id(1)["available_copies"] == 3
+    assert database.get_book_by_id(2)["available_copies"] == 7
+    assert writer.batches == 1
+
+
+def test_helpers_use_running_writer():
+    """Testing the circulation helpers go through the writer when it is started"""
+    writer = start_circulation_writer()
+    now = datetime.now()
+
+    assert insert_borrow_record("555555", 1, now, now + timedelta(days=14)) is True
+    assert writer.operations == 1
+    assert submit_write(lambda conn: 42).result(timeout=5) == 42
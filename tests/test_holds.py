@@ -0,0 +1,137 @@
+import pytest
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from app import create_app
+from database import get_book_by_id, get_db_connection, insert_hold, update_book_availability
+from services.library_service import borrow_book_by_patron, return_book_by_patron, borrow_books_batch, return_books_batch
+from services.hold_service import place_hold, get_hold_status, cancel_hold, sweep_expired_holds
+
+
+pytestmark = pytest.mark.usefixtures("fresh_db")
+
+
+def test_place_hold_reports_queue_position():
+    """Testing holds on an unavailable book queue in arrival order"""
+    assert place_hold("111111", 3) == (True, 'Hold placed on "1984". You are number 1 in the queue.')
+    assert place_hold("222222", 3)[0] is True
+    assert place_hold("333333", 3, priority=5)[0] is True
+
+    assert get_hold_status("111111", 3)["position"] == 2
+    assert get_hold_status("222222", 3)["position"] == 3
+    assert get_hold_status("333333", 3)["position"] == 1
+
+
+def test_place_hold_rejected_when_available_or_duplicate():
+    """Testing holds are only placed on unavailable books, once per patron"""
+    assert place_hold("111111", 1)[0] is False
+    assert place_hold("123456", 3) == (False, "You already have this book borrowed.")
+    place_hold("111111", 3)
+    assert place_hold("111111", 3) == (False, "You already have a hold on this book.")
+
+
+def test_only_one_active_hold_per_patron_and_book():
+    """Testing concurrent submits cannot queue the same patron twice"""
+    now = datetime.now()
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(lambda _: place_hold("111111", 3), range(4)))
+
+    assert [success for success, _ in results].count(True) == 1
+    assert insert_hold("111111", 3, 0, now, None) == 'held'
+    conn = get_db_connection()
+    with pytest.raises(sqlite3.IntegrityError):
+        conn.execute('''
+            INSERT INTO holds (patron_id, book_id, status, created_at) VALUES ('111111', 3, 'waiting', ?)
+        ''', (now.isoformat(),))
+    conn.close()
+
+
+def test_return_allocates_copy_to_next_hold():
+    """Testing a returned copy goes to the hold instead of the shelf"""
+    place_hold("111111", 3)
+
+    success, message = return_book_by_patron("123456", 3)
+
+    assert success is True
+    assert "reserved" in message.lower()
+    assert get_book_by_id(3)["available_copies"] == 0
+    assert get_hold_status("111111", 3)["status"] == "ready"
+    assert borrow_book_by_patron("222222", 3)[0] is False
+
+    success, message = borrow_book_by_patron("111111", 3)
+    assert success is True
+    assert get_hold_status("111111", 3)["status"] == "none"
+
+
+def test_sweep_passes_lapsed_copy_down_the_queue():
+    """Testing an uncollected copy moves to the next hold when it lapses"""
+    place_hold("111111", 3)
+    place_hold("222222", 3)
+    return_book_by_patron("123456", 3)
+
+    result = sweep_expired_holds(datetime.now() + timedelta(days=4))
+
+    assert result["expired_ready"] == 1
+    assert result["reallocated"] == 1
+    assert get_hold_status("222222", 3)["status"] == "ready"
+
+
+def test_cancel_ready_hold_returns_copy_to_shelf():
+    """Testing cancelling the only hold puts its copy back on the shelf"""
+    place_hold("111111", 3)
+    return_book_by_patron("123456", 3)
+
+    assert cancel_hold("111111", 3) == (True, "Hold cancelled.")
+    assert get_book_by_id(3)["available_copies"] == 1
+
+
+def test_kiosk_return_serves_the_hold_queue():
+    """Testing a batch-returned copy goes to the waiting hold, not back on the shelf"""
+    place_hold("111111", 3)
+
+    success, _, results = return_books_batch("123456", [3])
+
+    assert success and "reserved for the next patron" in results[0]["message"]
+    assert get_book_by_id(3)["available_copies"] == 0
+    assert get_hold_status("111111", 3)["status"] == "ready"
+    assert borrow_book_by_patron("222222", 3)[0] is False
+    assert borrow_books_batch("222222", [3])[2][0]["success"] is False
+
+
+def test_kiosk_borrow_uses_the_ready_hold():
+    """Testing a patron can check out their ready hold at a kiosk"""
+    place_hold("111111", 3)
+    return_books_batch("123456", [3])
+
+    success, _, results = borrow_books_batch("111111", [3])
+
+    assert success and results[0]["success"]
+    assert get_hold_status("111111", 3)["status"] == "none"
+    assert get_book_by_id(3)["available_copies"] == 0
+
+
+def test_shelf_borrow_fulfils_the_waiting_hold():
+    """Testing a patron who borrows a shelf copy leaves the hold queue"""
+    place_hold("111111", 3)
+    place_hold("222222", 3)
+    update_book_availability(3, 1)
+
+    assert borrow_book_by_patron("111111", 3)[0] is True
+    assert get_hold_status("111111", 3)["status"] == "none"
+    update_book_availability(3, 1)
+    assert borrow_books_batch("222222", [3])[2][0]["success"] is True
+    assert get_hold_status("222222", 3)["status"] == "none"
+
+    return_book_by_patron("123456", 3)
+    assert get_book_by_id(3)["available_copies"] == 1
+
+
+def test_hold_api_ignores_patron_supplied_priority():
+    """Testing patrons cannot jump the queue through the public hold endpoint"""
+    client = create_app({'TESTING': True, 'STATUS_CACHE_WARMUP': False}).test_client()
+    place_hold("111111", 3)
+
+    response = client.post('/api/holds', json={'patron_id': '222222', 'book_id': 3, 'priority': 9})
+
+    assert response.status_code == 201
+    assert get_hold_status("222222", 3)["position"] == 2
@@ -0,0 +1,111 @@
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import Mock, patch
+from database import get_patron_balance, claim_idempotency_key
+from services.idempotency import KEY_IN_PROGRESS, KEY_REUSED, KEY_INVALID, IN_FLIGHT_TIMEOUT, _request_hash
+from services.library_service import pay_late_fees, refund_late_fee_payment
+from services.payment_service import PaymentGateway
+
+
+pytestmark = pytest.mark.usefixtures("fresh_db")
+
+
+def _hash(patron_id, book_id):
+    return _request_hash({"patron_id": patron_id, "book_id": book_id})
+
+
+def paying_gateway(txn_id="txn_298734_1"):
+    gateway = Mock(spec=PaymentGateway)
+    gateway.process_payment.return_value = (True, txn_id, "Payment processed")
+    gateway.refund_payment.return_value = (True, "Refund processed")
+    return gateway
+
+
+def test_retry_with_same_key_replays_without_charging():
+    """Testing a retried payment returns the first outcome and charges once"""
+    gateway = paying_gateway()
+
+    first = pay_late_fees("298734", 2, gateway, idempotency_key="kiosk-1")
+    retry = pay_late_fees("298734", 2, gateway, idempotency_key="kiosk-1")
+
+    assert first == (True, "Payment successful! Payment processed", "txn_298734_1")
+    assert retry == first
+    gateway.process_payment.assert_called_once()
+    assert get_patron_balance("298734") == -6.50
+
+
+def test_key_in_flight_is_not_charged_again():
+    """Testing a retry while the first request is still running is turned away"""
+    now = datetime.now()
+    claim_idempotency_key("payment", "kiosk-2", _hash("298734", 2), now, now - IN_FLIGHT_TIMEOUT)
+    gateway = paying_gateway()
+
+    success, message, txn = pay_late_fees("298734", 2, gateway, idempotency_key="kiosk-2")
+
+    assert (success, message, txn) == (False, KEY_IN_PROGRESS, None)
+    gateway.process_payment.assert_not_called()
+
+
+def test_stale_in_flight_claim_is_taken_over():
+    """Testing a claim left by a dead request can be reused after the timeout"""
+    old = datetime.now() - IN_FLIGHT_TIMEOUT - timedelta(minutes=1)
+    claim_idempotency_key("payment", "kiosk-3", _hash("298734", 2), old, old - IN_FLIGHT_TIMEOUT)
+
+    success, _, _ = pay_late_fees("298734", 2, paying_gateway(), idempotency_key="kiosk-3")
+
+    assert success
+
+
+def test_key_reused_for_different_request_is_rejected():
+    """Testing a key cannot be replayed against another book"""
+    pay_late_fees("298734", 2, paying_gateway(), idempotency_key="kiosk-4")
+
+    assert pay_late_fees("345453", 2, paying_gateway(), idempotency_key="kiosk-4") == (False, KEY_REUSED, None)
+
+
+def test_gateway_error_releases_key_for_retry():
+    """Testing an unreachable gateway leaves the key free to retry"""
+    failing = Mock(spec=PaymentGateway)
+    failing.process_payment.side_effect = ConnectionError("timeout")
+
+    first = pay_late_fees("298734", 2, failing, idempotency_key="kiosk-5")
+    retry = pay_late_fees("298734", 2, paying_gateway(), idempotency_key="kiosk-5")
+
+    assert first == (False, "Payment processing error: timeout", None)
+    assert retry[0] is True
+
+
+def test_refund_retry_replays():
+    """Testing a retried refund calls the gateway once"""
+    pay_late_fees("298734", 2, paying_gateway())
+    gateway = paying_gateway()
+
+    first = refund_late_fee_payment("txn_298734_1", 2.00, gateway, idempotency_key="refund-1")
+    retry = refund_late_fee_payment("txn_298734_1", 2.00, gateway, idempotency_key="refund-1")
+
+    assert first == retry == (True, "Refund processed")
+    gateway.refund_payment.assert_called_once()
+
+
+def test_invalid_key_rejected():
+    """Testing an empty key is refused"""
+    assert pay_late_fees("298734", 2, paying_gateway(), idempotency_key="") == (False, KEY_INVALID, None)
+
+
+def test_payment_route_honours_idempotency_header():
+    """Testing the payments endpoint replays on a repeated Idempotency-Key"""
+    from app import create_app
+    client = create_app({'TESTING': True, 'STATUS_CACHE_WARMUP': False}).test_client()
+    gateway = paying_gateway()
+
+    with patch("services.library_service.PaymentGateway", return_value=gateway):
+        body = {"patron_id": "298734", "book_id": 2}
+        first = client.post('/api/payments', json=body, headers={'Idempotency-Key': 'web-1'})
+        retry = client.post('/api/payments', json=body, headers={'Idempotency-Key': 'web-1'})
+        reused = client.post('/api/payments', json={"patron_id": "345453", "book_id": 2},
+                             headers={'Idempotency-Key': 'web-1'})
+
+    assert first.status_code == retry.status_code == 200
+    assert retry.get_json()["transaction_id"] == "txn_298734_1"
+    assert reused.status_code == 409
+    gateway.process_payment.assert_called_once()
@@ -0,0 +1,56 @@
+import pytest
+from app import create_app
+from services.library_service import calculate_late_fees_batch, calculate_late_fee_for_book, MAX_LATE_FEE_BATCH
+
+
+pytestmark = pytest.mark.usefixtures("fresh_db")
+
+
+def test_batch_by_patron_lists_every_open_loan():
+    """Testing a patron lookup returns the fee of each open loan"""
+    result = calculate_late_fees_batch(patron_ids=["298734", "123456", "999999"])
+
+    assert result["fees"] == {
+        "298734": {"2": [6.50, 10]},
+        "123456": {"3": [0.00, 0]},
+        "999999": {}
+    }
+    assert result["invalid"] == []
+
+
+def test_batch_pairs_match_single_lookups():
+    """Testing pair lookups agree with calculate_late_fee_for_book"""
+    pairs = [["345453", 2], ["298745", 2], ["123456", 1]]
+    result = calculate_late_fees_batch(pairs=pairs)
+
+    for patron_id, book_id in pairs[:2]:
+        single = calculate_late_fee_for_book(patron_id, book_id)
+        assert result["fees"][patron_id][str(book_id)] == [single["fee_amount"], single["days_overdue"]]
+    # Book 1 is not on loan to this patron
+    assert result["fees"]["123456"] == {"1": None}
+
+
+def test_batch_reports_invalid_entries():
+    """Testing malformed patron IDs and pairs are listed, not fatal"""
+    result = calculate_late_fees_batch(patron_ids=["12"], pairs=[["345453", "x"], ["345453"], ["345453", 2]])
+
+    assert result["invalid"] == ["12", ["345453", "x"], ["345453"]]
+    assert result["fees"] == {"345453": {"2": [2.50, 5]}}
+
+
+def test_batch_rejects_empty_and_oversized_requests():
+    """Testing an empty or oversized request is an error"""
+    assert "error" in calculate_late_fees_batch()
+    assert "error" in calculate_late_fees_batch(patron_ids=["123456"] * (MAX_LATE_FEE_BATCH + 1))
+    assert "error" in calculate_late_fees_batch(patron_ids="123456")
+
+
+def test_late_fees_endpoint():
+    """Testing POST /api/late_fees answers the compact fee map"""
+    client = create_app({'TESTING': True, 'STATUS_CACHE_WARMUP': False}).test_client()
+
+    response = client.post('/api/late_fees', json={'pairs': [['298745', 2]]})
+    assert response.status_code == 200
+    assert response.get_json()['fees'] == {'298745': {'2': [15.0, 35]}}
+
+    assert client.post('/api/late_fees', json={}).status_code == 400
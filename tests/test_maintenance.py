@@ -0,0 +1,97 @@
+from datetime import datetime, timedelta
+
+import pytest
+import app as app_module
+from database import get_db_connection, set_storage_profile
+from repositories import SQLiteRepository, set_repository
+from services.catalog_snapshot import export_catalog_snapshot
+from services.maintenance import MaintenanceScheduler, run_maintenance, MAINTENANCE_TASKS
+
+
+pytestmark = pytest.mark.usefixtures("fresh_db")
+
+
+@pytest.fixture
+def storage_profile():
+    """Create the fresh database with the tuned profile."""
+    return 'tuned'
+
+
+def test_tuned_profile_applied_on_connect():
+    """Testing the tuned profile's PRAGMAs are in effect on a new connection"""
+    conn = get_db_connection()
+
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+    assert conn.execute("PRAGMA cache_size").fetchone()[0] == -32000
+    assert conn.execute("PRAGMA temp_store").fetchone()[0] == 2
+    assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == 5000
+    conn.close()
+
+
+def test_unknown_storage_profile_rejected():
+    """Testing an unknown profile name is an error"""
+    with pytest.raises(ValueError):
+        set_storage_profile("turbo")
+
+
+def test_run_maintenance_reports_every_task():
+    """Testing each task runs and reports its duration"""
+    report = run_maintenance()
+
+    assert [step["task"] for step in report] == list(MAINTENANCE_TASKS)
+    assert all(step["seconds"] >= 0 for step in report)
+    assert not any(step["result"].startswith("failed") for step in report)
+    conn = get_db_connection()
+    assert conn.execute("SELECT COUNT(*) FROM sqlite_stat1").fetchone()[0] > 0
+    conn.close()
+
+
+def test_scheduler_runs_only_in_window_and_once_per_interval():
+    """Testing the scheduler waits for the window and does not repeat within the interval"""
+    now = [datetime(2024, 1, 1, 12, 0)]
+    scheduler = MaintenanceScheduler("23:00-04:00", tasks=("optimize",), clock=lambda: now[0])
+
+    assert scheduler.run_pending() is None
+    now[0] = datetime(2024, 1, 2, 1, 30)
+    assert scheduler.run_pending()[0]["task"] == "optimize"
+    now[0] += timedelta(hours=1)
+    assert scheduler.run_pending() is None
+    now[0] += timedelta(days=1)
+    assert scheduler.run_pending() is not None
+
+
+def test_schedulers_in_separate_workers_share_runs():
+    """Testing a second scheduler skips a run another worker already claimed"""
+    clock = lambda: datetime(2024, 1, 2, 3, 0)  # noqa: E731
+    first = MaintenanceScheduler(tasks=("optimize",), clock=clock)
+    second = MaintenanceScheduler(tasks=("optimize",), clock=clock)
+
+    assert first.run_pending() is not None
+    assert second.run_pending() is None
+
+
+def test_invalid_window_rejected():
+    """Testing a malformed window is an error"""
+    with pytest.raises(ValueError):
+        MaintenanceScheduler("2am-5am")
+
+
+def test_scheduler_is_opt_in_and_skipped_on_snapshot_nodes(tmp_path, monkeypatch):
+    """Testing create_app starts maintenance only when asked, and never on a snapshot node"""
+    started = []
+    monkeypatch.setattr(app_module, "start_maintenance_scheduler", started.append)
+    snapshot_path = str(tmp_path / "catalog.snap")
+    export_catalog_snapshot(snapshot_path)
+    base = {'TESTING': True, 'STATUS_CACHE_WARMUP': False}
+
+    app_module.create_app(base)
+    try:
+        app_module.create_app(dict(base, MAINTENANCE_SCHEDULER=True, REPOSITORY='snapshot',
+                                   CATALOG_SNAPSHOT=snapshot_path))
+    finally:
+        set_repository(SQLiteRepository())
+    assert started == []
+
+    app_module.create_app(dict(base, MAINTENANCE_SCHEDULER=True))
+    assert started == ['02:00-05:00']
@@ -0,0 +1,56 @@
+import json
+import os
+import pytest
+from datetime import datetime, timedelta
+from database import insert_borrow_record
+from services.notice_service import generate_overdue_notices, CHECKPOINT_FILE
+
+
+pytestmark = pytest.mark.usefixtures("fresh_db")
+
+
+def read_spool(output_dir):
+    names = sorted(n for n in os.listdir(output_dir) if n.startswith("notices-"))
+    return "".join(open(os.path.join(output_dir, n)).read() for n in names)
+
+
+def test_notices_cover_overdue_and_due_soon(tmp_path):
+    """Testing overdue fees and due-soon reminders are rendered per patron"""
+    now = datetime.now()
+    insert_borrow_record("111111", 1, now - timedelta(days=12), now + timedelta(days=2))
+    output_dir = str(tmp_path / "notices")
+
+    result = generate_overdue_notices(output_dir, as_of=now, batch_size=2)
+    text = read_spool(output_dir)
+
+    assert result == {"status": "Completed", "files": 2, "notices": 4, "resumed": False}
+    assert "patron 298734" in text and "fee $6.50" in text
+    assert "patron 298745" in text and "Total late fees: $15.00" in text
+    assert "patron 111111" in text and "Due soon:" in text
+    assert "patron 123456" not in text
+
+
+def test_notices_resume_from_checkpoint(tmp_path):
+    """Testing an interrupted run continues after the last checkpointed patron"""
+    now = datetime.now()
+    output_dir = str(tmp_path / "notices")
+    os.makedirs(output_dir)
+    with open(os.path.join(output_dir, CHECKPOINT_FILE), "w") as handle:
+        json.dump({"run_date": now.strftime("%Y-%m-%d"), "last_patron_id": "298745",
+                   "files": 1, "notices": 2, "completed": False}, handle)
+
+    result = generate_overdue_notices(output_dir, as_of=now)
+
+    assert result == {"status": "Completed", "files": 2, "notices": 3, "resumed": True}
+    assert "patron 345453" in read_spool(output_dir)
+    assert "patron 298734" not in read_spool(output_dir)
+
+
+def test_notices_render_in_process_pool(tmp_path):
+    """Testing rendering in worker processes gives the same output"""
+    now = datetime.now()
+
+    generate_overdue_notices(str(tmp_path / "inline"), as_of=now)
+    generate_overdue_notices(str(tmp_path / "pool"), as_of=now, workers=2)
+
+    assert read_spool(str(tmp_path / "pool")) == read_spool(str(tmp_path / "inline"))
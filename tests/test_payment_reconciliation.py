@@ -0,0 +1,116 @@
+import json
+import os
+import threading
+import time
+import pytest
+from datetime import datetime, timedelta
+from database import insert_fee_entry
+from services.payment_reconciliation import reconcile_payments, CHECKPOINT_FILE
+from services.rate_limit import TokenBucket
+
+
+pytestmark = pytest.mark.usefixtures("fresh_db")
+
+
+class FakeGateway:
+    """Gateway that knows a fixed set of transactions; counts concurrent calls."""
+
+    def __init__(self, known, delay=0.0):
+        self.known = known
+        self.delay = delay
+        self.calls = 0
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def verify_payment_status(self, transaction_id):
+        with self._lock:
+            self.calls += 1
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.delay)
+        with self._lock:
+            self.active -= 1
+        if transaction_id not in self.known:
+            return {"status": "not_found", "message": "Transaction not found"}
+        return {"transaction_id": transaction_id, "status": "completed", "amount": self.known[transaction_id]}
+
+
+def record_payments(count, start):
+    for i in range(count):
+        insert_fee_entry("298734", "payment", -2.00, start + timedelta(minutes=i),
+                         book_id=2, transaction_id=f"txn_298734_{i}")
+
+
+def read_reports(output_dir):
+    lines = []
+    for name in sorted(n for n in os.listdir(output_dir) if n.startswith("mismatches-")):
+        with open(os.path.join(output_dir, name)) as handle:
+            lines.extend(json.loads(line) for line in handle)
+    return lines
+
+
+def test_mismatches_are_reported(tmp_path):
+    """Testing missing and wrong-amount payments are written to the report"""
+    start = datetime(2026, 1, 1)
+    record_payments(5, start)
+    gateway = FakeGateway({"txn_298734_0": 2.00, "txn_298734_1": 2.00, "txn_298734_2": 3.00,
+                           "txn_298734_4": 2.00})
+    output_dir = str(tmp_path / "recon")
+
+    result = reconcile_payments(output_dir, start, start + timedelta(days=1), gateway, workers=4,
+                                rate=1000, burst=1000, chunk_size=2)
+
+    problems = {m["transaction_id"]: m["problem"] for m in read_reports(output_dir)}
+    assert result["verified"] == 5 and result["mismatches"] == 2
+    assert problems == {"txn_298734_2": "amount", "txn_298734_3": "missing_at_gateway"}
+
+
+def test_checks_run_concurrently(tmp_path):
+    """Testing gateway calls overlap up to the worker count"""
+    start = datetime(2026, 1, 1)
+    record_payments(8, start)
+    gateway = FakeGateway({f"txn_298734_{i}": 2.00 for i in range(8)}, delay=0.05)
+
+    reconcile_payments(str(tmp_path / "recon"), start, start + timedelta(days=1), gateway, workers=4,
+                       rate=1000, burst=1000)
+
+    assert gateway.peak > 1
+
+
+def test_run_resumes_after_last_checkpoint(tmp_path):
+    """Testing a rerun only verifies payments after the checkpoint"""
+    start = datetime(2026, 1, 1)
+    record_payments(4, start)
+    output_dir = str(tmp_path / "recon")
+    reconcile_payments(output_dir, start, start + timedelta(days=1), FakeGateway({}), chunk_size=2,
+                       rate=1000, burst=1000)
+    path = os.path.join(output_dir, CHECKPOINT_FILE)
+    with open(path) as handle:
+        checkpoint = json.load(handle)
+    # Pretend the run stopped after its first chunk
+    checkpoint.update(completed=False, chunks=1, verified=2, mismatches=2,
+                      last_created_at=(start + timedelta(minutes=1)).isoformat())
+    checkpoint["last_id"] -= 2
+    with open(path, "w") as handle:
+        json.dump(checkpoint, handle)
+    gateway = FakeGateway({})
+
+    result = reconcile_payments(output_dir, start, start + timedelta(days=1), gateway, chunk_size=2,
+                                rate=1000, burst=1000)
+
+    assert result["resumed"] is True
+    assert gateway.calls == 2
+    assert result["verified"] == 4 and result["mismatches"] == 4
+
+
+def test_token_bucket_limits_rate():
+    """Testing the bucket allows a burst, then refills at the configured rate"""
+    now = [0.0]
+    bucket = TokenBucket(rate=2, capacity=2, clock=lambda: now[0])
+
+    assert bucket.try_acquire() and bucket.try_acquire()
+    assert not bucket.try_acquire()
+    now[0] = 0.5
+    assert bucket.try_acquire()
+    assert not bucket.try_acquire()
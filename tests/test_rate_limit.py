@@ -0,0 +1,99 @@
+import pytest
+import database
+from app import create_app
+from services.rate_limit import KeyedRateLimiter, SQLiteBucketStore
+
+
+pytestmark = pytest.mark.usefixtures("fresh_db")
+
+
+def make_client(limits, **config):
+    app = create_app({'TESTING': True, 'STATUS_CACHE_WARMUP': False, 'RATE_LIMITS': limits, **config})
+    return app.test_client()
+
+
+def test_burst_then_rejected_with_retry_after():
+    """Testing requests past the burst are rejected with 429 and Retry-After"""
+    client = make_client({'api.search_books_api': (0.5, 2)})
+
+    assert client.get('/api/search?q=gatsby').status_code == 200
+    assert client.get('/api/search?q=gatsby').status_code == 200
+    response = client.get('/api/search?q=gatsby')
+
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '2'
+    assert 'error' in response.get_json()
+
+
+def test_patrons_have_separate_buckets():
+    """Testing one patron hitting the limit does not throttle another"""
+    client = make_client({'api.get_late_fee': (0.1, 1)})
+
+    assert client.get('/api/late_fee/123456/3').status_code == 200
+    assert client.get('/api/late_fee/123456/3').status_code == 429
+    assert client.get('/api/late_fee/345453/2').status_code == 200
+
+
+def test_client_walking_patron_ids_is_limited():
+    """Testing one client address is throttled however many patrons it names"""
+    client = make_client({'api.get_late_fee': (0.1, 1)}, CLIENT_RATE_LIMITS={'api.get_late_fee': (0.1, 3)})
+    statuses = [client.get(f'/api/late_fee/{patron_id}/3').status_code
+                for patron_id in ('100001', '100002', '100003', '100004')]
+
+    assert statuses == [200, 200, 200, 429]
+    other = client.get('/api/late_fee/100005/3', environ_base={'REMOTE_ADDR': '10.0.0.2'})
+    assert other.status_code == 200
+
+
+def test_unlisted_endpoints_are_not_limited():
+    """Testing endpoints without a configured limit are never throttled"""
+    client = make_client({})
+
+    for _ in range(10):
+        assert client.get('/api/search?q=gatsby').status_code == 200
+
+
+def test_rejection_happens_before_database_work(monkeypatch):
+    """Testing a throttled borrow is rejected without touching the database"""
+    client = make_client({'borrowing.borrow_book': (0.1, 1)})
+    client.post('/borrow', data={'patron_id': '111111', 'book_id': '1'})
+
+    def no_database():
+        raise AssertionError("database used for a throttled request")
+    monkeypatch.setattr(database, "get_db_connection", no_database)
+    response = client.post('/borrow', data={'patron_id': '111111', 'book_id': '1'})
+
+    assert response.status_code == 429
+
+
+def test_disabled_rate_limiting():
+    """Testing RATE_LIMIT_ENABLED=False turns throttling off"""
+    client = make_client({'api.search_books_api': (0.1, 1)}, RATE_LIMIT_ENABLED=False)
+
+    assert client.get('/api/search?q=gatsby').status_code == 200
+    assert client.get('/api/search?q=gatsby').status_code == 200
+
+
+def test_sqlite_store_is_shared_between_limiters(tmp_path):
+    """Testing limiters on the same SQLite file (separate workers) share buckets"""
+    path = str(tmp_path / "ratelimit.db")
+    first = KeyedRateLimiter(SQLiteBucketStore(path), clock=lambda: 1000.0)
+    second = KeyedRateLimiter(SQLiteBucketStore(path), clock=lambda: 1000.0)
+
+    assert first.hit('search|ip:1.2.3.4', 1.0, 2) == (True, 0.0)
+    assert second.hit('search|ip:1.2.3.4', 1.0, 2) == (True, 0.0)
+    allowed, retry_after = first.hit('search|ip:1.2.3.4', 1.0, 2)
+
+    assert not allowed
+    assert retry_after == pytest.approx(1.0)
+
+
+def test_buckets_refill_over_time():
+    """Testing a bucket refills at its rate"""
+    now = [0.0]
+    limiter = KeyedRateLimiter(clock=lambda: now[0])
+
+    assert limiter.hit('k', 2.0, 1)[0]
+    assert not limiter.hit('k', 2.0, 1)[0]
+    now[0] = 0.5
+    assert limiter.hit('k', 2.0, 1)[0]
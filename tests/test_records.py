@@ -0,0 +1,37 @@
+import pytest
+from flask import Flask, jsonify
+from database import get_book_by_id, get_patron_borrowed_books
+from models import Book, Loan
+
+
+pytestmark = pytest.mark.usefixtures("fresh_db")
+
+
+def test_book_record_reads_like_a_row_dict():
+    """Testing Book supports the dict access the services and templates use"""
+    book = get_book_by_id(1)
+
+    assert isinstance(book, Book)
+    assert book["title"] == book.title == "The Great Gatsby"
+    assert book.get("missing", 0) == 0
+    assert "available_copies" in book
+    assert dict(book)["total_copies"] == 3
+    with pytest.raises(KeyError):
+        book["missing"]
+
+
+def test_book_record_has_no_per_instance_dict():
+    """Testing records are slotted"""
+    assert not hasattr(get_book_by_id(1), "__dict__")
+
+
+def test_loans_are_records_and_serialize():
+    """Testing borrowed books come back as Loan records that jsonify accepts"""
+    loans = get_patron_borrowed_books("298734")
+
+    assert len(loans) == 1 and isinstance(loans[0], Loan)
+    assert loans[0]["is_overdue"]
+    with Flask(__name__).app_context():
+        payload = jsonify(loans).get_json()
+    assert payload[0]["book_id"] == 2
+    assert payload[0]["title"] == "To Kill a Mockingbird"
@@ -0,0 +1,141 @@
+import threading
+from datetime import datetime
+from unittest.mock import Mock
+
+import pytest
+from app import create_app
+import repositories
+from repositories import InMemoryRepository, SQLiteRepository, get_repository, set_repository, use_repository
+from services.library_service import (
+    borrow_book_by_patron, return_book_by_patron, borrow_books_batch, calculate_late_fee_for_book,
+    calculate_late_fees_batch, get_patron_status_report, pay_late_fees, refund_late_fee_payment,
+    search_books_in_catalog, search_books_filtered, add_book_to_catalog
+)
+from services.payment_service import PaymentGateway
+
+
+pytestmark = pytest.mark.usefixtures("fresh_db")
+
+
+@pytest.fixture(params=["sqlite", "memory"])
+def repository(request):
+    """Run the test against each backend, both holding the sample data."""
+    if request.param == "sqlite":
+        repository = SQLiteRepository()
+    else:
+        repository = InMemoryRepository()
+        repository.add_sample_data()
+    with use_repository(repository):
+        yield repository
+
+
+def test_borrow_and_return_cycle(repository):
+    """Testing a borrow then return updates loans and availability"""
+    assert borrow_book_by_patron("111111", 1)[0]
+    assert repository.get_book_by_id(1).available_copies == 2
+    assert [loan.book_id for loan in repository.get_patron_borrowed_books("111111")] == [1]
+
+    success, message = return_book_by_patron("111111", 1)
+    assert success and "on time" in message
+    assert repository.get_book_by_id(1).available_copies == 3
+    assert repository.get_patron_borrow_count("111111") == 0
+
+
+def test_batch_borrow_respects_availability(repository):
+    """Testing a batch only takes copies that are on the shelf"""
+    success, _, results = borrow_books_batch("111111", [1, 3, 99])
+
+    assert success
+    assert [result["success"] for result in results] == [True, False, False]
+
+
+def test_late_fees_and_status_report(repository):
+    """Testing fee rules and the status report agree across backends"""
+    assert calculate_late_fee_for_book("298734", 2)["fee_amount"] == 6.50
+    assert calculate_late_fees_batch(patron_ids=["298745"])["fees"] == {"298745": {"2": [15.0, 35]}}
+
+    report = get_patron_status_report("298745")
+    assert report["num_currently_borrowed"] == 1
+    assert report["total_late_fees"] == 15.00
+
+
+def test_payment_and_refund_update_the_ledger(repository):
+    """Testing a payment clears the fee and a refund puts part of it back"""
+    gateway = Mock(spec=PaymentGateway)
+    gateway.process_payment.return_value = (True, "txn_298734_1", "ok")
+    gateway.refund_payment.return_value = (True, "refunded")
+
+    assert pay_late_fees("298734", 2, gateway)[0]
+    assert calculate_late_fee_for_book("298734", 2)["fee_amount"] == 0
+    assert repository.get_patron_balance("298734") == -6.50
+
+    assert refund_late_fee_payment("txn_298734_1", 2.00, gateway)[0]
+    assert calculate_late_fee_for_book("298734", 2)["fee_amount"] == 2.00
+    assert repository.get_fee_entry_by_transaction("txn_298734_1")["amount"] == -6.50
+
+
+def test_search(repository):
+    """Testing field and filtered searches return the same books"""
+    assert [book.title for book in search_books_in_catalog("mock", "title")] == ["To Kill a Mockingbird"]
+    assert [book.id for book in search_books_in_catalog("9780451524935", "isbn")] == [3]
+
+    page = search_books_filtered(title="the", limit=1)
+    assert [book.title for book in page["results"]] == ["The Great Gatsby"]
+    assert page["next_cursor"] is None and page["total_estimate"] == 1
+    assert search_books_filtered(author_prefix="geo", available_only=True)["results"] == []
+
+
+def test_add_book_rejects_duplicate_isbn(repository):
+    """Testing the catalog keeps ISBNs unique"""
+    assert add_book_to_catalog("New", "Author", "1234567890123", 2)[0]
+    assert not add_book_to_catalog("Other", "Author", "1234567890123", 2)[0]
+
+
+def test_memory_stores_are_isolated():
+    """Testing separate in-memory stores used in parallel do not share state"""
+    errors = []
+
+    def run():
+        try:
+            with use_repository(InMemoryRepository()) as repository:
+                repository.add_sample_data()
+                for _ in range(3):
+                    assert borrow_book_by_patron("111111", 1)[0]
+                assert repository.get_book_by_id(1).available_copies == 0
+        except AssertionError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert isinstance(get_repository(), SQLiteRepository)
+
+
+def test_create_app_selects_memory_backend():
+    """Testing REPOSITORY='memory' serves the API from the in-memory store"""
+    app = create_app({'TESTING': True, 'STATUS_CACHE_WARMUP': False, 'REPOSITORY': 'memory'})
+    try:
+        assert isinstance(get_repository(), InMemoryRepository)
+        response = app.test_client().get('/api/late_fee/298745/2')
+        assert response.get_json()["fee_amount"] == 15.00
+    finally:
+        set_repository(SQLiteRepository())
+
+
+def test_balance_and_async_api_follow_the_memory_backend():
+    """Testing the balance endpoint and the async API read the configured store, not library.db"""
+    app = create_app({'TESTING': True, 'STATUS_CACHE_WARMUP': False, 'REPOSITORY': 'memory'})
+    try:
+        client = app.test_client()
+        repositories.insert_fee_entry("999999", "accrual", 4.25, datetime.now())
+        repositories.insert_book("Memory Only", "Author", "4444444444444", 1, 1)
+        book_id = repositories.get_book_by_isbn("4444444444444").id
+
+        assert client.get('/api/patrons/999999/balance').get_json()["balance"] == 4.25
+        assert client.get(f'/api/async/books/{book_id}').get_json()["title"] == "Memory Only"
+    finally:
+        set_repository(SQLiteRepository())
@@ -30,4 +30,19 @@ def test_search_invalid_entry():
     results = search_books_in_catalog("Oppenheimer", "movie")
 
     assert isinstance(results, list)
-    assert results == []
\ No newline at end of file
+    assert results == []
+
+def test_fuzzy_search_misspelled_author():
+    """Testing a misspelled author still finds the book"""
+    results = search_books_in_catalog("Fitzgerld", "fuzzy")
+
+    assert isinstance(results, list)
+    assert results[0]["author"] == "F. Scott Fitzgerald"
+    assert 0 < results[0]["score"] <= 1
+
+
+def test_fuzzy_search_no_close_match():
+    """Testing a fuzzy search with nothing similar returns no results"""
+    results = search_books_in_catalog("Oppenheimer", "fuzzy")
+
+    assert results == []
@@ -0,0 +1,47 @@
+import pytest
+from database import insert_book
+from services.library_service import search_books_filtered
+
+
+pytestmark = pytest.mark.usefixtures("fresh_db")
+
+
+def test_combined_title_and_author():
+    """Testing title and author filters are combined with AND"""
+    page = search_books_filtered(title="the", author="fitz")
+
+    assert [book["title"] for book in page["results"]] == ["The Great Gatsby"]
+    assert page["total_estimate"] == 1
+    assert page["total_is_exact"] is True
+
+
+def test_author_prefix_and_available_only():
+    """Testing author prefix matching with the availability filter"""
+    assert [b["title"] for b in search_books_filtered(author_prefix="GEO")["results"]] == ["1984"]
+    assert search_books_filtered(author_prefix="geo", available_only=True)["results"] == []
+
+
+def test_keyset_pagination_walks_all_pages():
+    """Testing the cursor returns every match exactly once"""
+    for i in range(5):
+        insert_book(f"The Sequel {i}", "Test Author", f"99999999999{i:02d}", 1, 1)
+
+    titles = []
+    cursor = None
+    while True:
+        page = search_books_filtered(title="the", limit=2, cursor=cursor)
+        titles.extend(book["title"] for book in page["results"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert page["total_estimate"] == 6
+    assert titles == sorted(titles)
+    assert len(titles) == len(set(titles)) == 6
+
+
+def test_invalid_filters():
+    """Testing missing filters and malformed cursors are rejected"""
+    assert "error" in search_books_filtered()
+    assert "error" in search_books_filtered(title="the", cursor="not-a-cursor")
+    assert "error" in search_books_filtered(title="the", limit=0)
@@ -0,0 +1,93 @@
+import pytest
+import threading
+from datetime import date, timedelta
+from database import get_patron_loan_version
+from services.status_cache import StatusReportCache, status_report_cache
+from services.library_service import (
+    get_patron_status_report, borrow_book_by_patron, warm_patron_status_cache
+)
+
+
+pytestmark = pytest.mark.usefixtures("fresh_db")
+
+
+def test_second_report_is_served_from_cache():
+    """Testing a repeated report is a cache hit with the same content"""
+    first = get_patron_status_report("298734")
+    hits = status_report_cache.hits
+
+    second = get_patron_status_report("298734")
+
+    assert status_report_cache.hits == hits + 1
+    assert second == first
+    second["currently_borrowed"].clear()
+    assert get_patron_status_report("298734")["num_currently_borrowed"] == 1
+
+
+def test_borrow_bumps_version_and_refreshes_report():
+    """Testing a borrow changes the loan version so the next report is rebuilt"""
+    before = get_patron_status_report("298734")
+    version = get_patron_loan_version("298734")
+
+    success, _ = borrow_book_by_patron("298734", 1)
+    report = get_patron_status_report("298734")
+
+    assert success
+    assert get_patron_loan_version("298734") == version + 1
+    assert report["num_currently_borrowed"] == before["num_currently_borrowed"] + 1
+
+
+def test_entry_from_previous_day_is_a_miss():
+    """Testing a report cached on an earlier day is not reused"""
+    cache = StatusReportCache()
+    today = date.today()
+    cache.put("298734", (today - timedelta(days=1)).isoformat(), 1, {"patron_id": "298734"})
+
+    assert cache.get("298734", today.isoformat(), 1) is None
+    assert cache.misses == 1
+
+
+def test_cache_evicts_least_recently_used():
+    """Testing the cache stays within its size bound"""
+    cache = StatusReportCache(max_entries=2)
+    cache.put("111111", "2025-01-01", 0, {})
+    cache.put("222222", "2025-01-01", 0, {})
+    cache.get("111111", "2025-01-01", 0)
+    cache.put("333333", "2025-01-01", 0, {})
+
+    assert len(cache) == 2
+    assert cache.get("222222", "2025-01-01", 0) is None
+    assert cache.get("111111", "2025-01-01", 0) == {}
+
+
+def test_warm_up_caches_patrons_with_open_loans():
+    """Testing warm-up preloads a report for every patron with open loans"""
+    warmed = warm_patron_status_cache()
+
+    assert warmed == 4
+    assert len(status_report_cache) == 4
+    hits = status_report_cache.hits
+    get_patron_status_report("123456")
+    assert status_report_cache.hits == hits + 1
+
+
+def test_app_warms_the_cache_only_when_asked(monkeypatch):
+    """Testing create_app starts the warm-up thread only when STATUS_CACHE_WARMUP is set"""
+    import app as app_module
+    warmed = []
+    monkeypatch.setattr(app_module, "warm_patron_status_cache", lambda: warmed.append(True))
+
+    app_module.create_app({'TESTING': True})
+    assert warmed == []
+
+    app_module.create_app({'TESTING': True, 'STATUS_CACHE_WARMUP': True})
+    for thread in threading.enumerate():
+        if thread.name == 'status-cache-warmup':
+            thread.join()
+    assert warmed == [True]
+
+
+def test_invalid_patron_is_not_cached():
+    """Testing an invalid patron ID returns an empty report without caching"""
+    assert get_patron_status_report("12ab") == {}
+    assert len(status_report_cache) == 0
@@ -0,0 +1,122 @@
+import gc
+import threading
+import weakref
+
+import pytest
+import database
+from repositories import InMemoryRepository, SQLiteRepository, get_repository, use_repository
+from services.library_service import add_book_to_catalog
+from services.search_index import PrefixIndex, TrigramIndex, build_search_indexes, suggest_books
+
+
+@pytest.fixture(autouse=True)
+def search_indexes(fresh_db):
+    """Rebuild the indexes from the fresh sample database."""
+    build_search_indexes()
+
+
+def test_prefix_index_matches_leading_and_inner_words():
+    """Testing a prefix matches the start of any word in a value"""
+    index = PrefixIndex()
+    index.add("The Great Gatsby", 1)
+    index.add("Great Expectations", 2)
+
+    values = [s["value"] for s in index.search("great")]
+
+    assert values == ["Great Expectations", "The Great Gatsby"]
+    assert index.search("gats") == [{"book_id": 1, "value": "The Great Gatsby"}]
+
+
+def test_leading_matches_are_not_crowded_out():
+    """Testing a value starting with the prefix ranks first even when the word is common inside values"""
+    index = PrefixIndex()
+    index.bulk_load([(f"A Tale {number:02d}", number) for number in range(90)])
+    index.add("Tale of Two Cities", 90)
+
+    results = index.search("tale", 5)
+
+    assert results[0] == {"book_id": 90, "value": "Tale of Two Cities"}
+    assert len(results) == 5
+
+
+def test_suggest_by_author():
+    """Testing author suggestions are case-insensitive"""
+    results = suggest_books("ORW", "author")
+
+    assert [s["value"] for s in results] == ["George Orwell"]
+
+
+def test_suggest_invalid_type():
+    """Testing an unknown suggestion type returns nothing"""
+    assert suggest_books("gatsby", "isbn") == []
+
+
+def test_suggest_includes_newly_added_book():
+    """Testing the index is updated when a book is added"""
+    success, _ = add_book_to_catalog("Gatekeeper", "Test Author", "1212121212121", 1)
+
+    results = suggest_books("gat", "title")
+
+    assert success is True
+    assert "Gatekeeper" in [s["value"] for s in results]
+
+
+def test_books_added_to_other_stores_stay_out():
+    """Testing a private store's inserts do not reach the indexes of the app's catalog"""
+    with use_repository(InMemoryRepository()):
+        add_book_to_catalog("Gatehouse", "Test Author", "1313131313131", 1)
+
+    assert "Gatehouse" not in [s["value"] for s in suggest_books("gat", "title")]
+
+
+def test_rebuilding_indexes_does_not_pile_up_listeners():
+    """Testing repeated builds register one SQLite listener and let other stores be freed"""
+    listeners = len(database._book_insert_listeners)
+    for _ in range(30):
+        build_search_indexes(SQLiteRepository())
+    memory = InMemoryRepository()
+    build_search_indexes(memory)
+    store = weakref.ref(memory)
+    build_search_indexes(get_repository())
+    del memory
+    gc.collect()
+
+    assert len(database._book_insert_listeners) == listeners
+    assert store() is None
+
+
+def test_trigram_index_ranks_closest_word_first():
+    """Testing trigram similarity tolerates a dropped letter"""
+    index = TrigramIndex()
+    index.add("George Orwell", 3)
+    index.add("Harper Lee", 2)
+
+    results = index.search("Orwel")
+
+    assert [book_id for book_id, _ in results] == [3]
+    assert results[0][1] >= 0.7
+
+
+def test_trigram_search_while_books_are_added():
+    """Testing a search that overlaps an insert of the same word does not fail"""
+    index = TrigramIndex()
+    index.add("alpha", 0)
+    index.add("alpha", 1)
+    adders = []
+
+    class AddDuringIteration(set):
+        def __iter__(self):
+            books = super().__iter__()
+            yield next(books)
+            if not adders:
+                # Another thread indexes a book while this set is half iterated
+                adders.append(threading.Thread(target=index.add, args=("alpha", 2)))
+                adders[0].start()
+                adders[0].join(0.2)
+            yield from books
+
+    index._word_books["alpha"] = AddDuringIteration(index._word_books["alpha"])
+
+    assert sorted(book_id for book_id, _ in index.search("alpha")) == [0, 1]
+    adders[0].join()
+    assert sorted(book_id for book_id, _ in index.search("alpha")) == [0, 1, 2]